@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark del arranque de la biblioteca.
+
+Crea una biblioteca sintetica (ficheros vacios) con su indice y su cache
+de tags ya llenos, como tras un arranque anterior, y mide lo que hace
+ControlReproduccion al arrancar: abrir el indice y leer las cabeceras de
+las playlists, y abrir la cache de tags. Para comparar, lo que costaba
+leer ademas todas las pistas (playlists(tabla)).
+
+Uso (no necesita el hardware):
+    python3 bench/bench_boot.py [pistas]
+"""
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.library import LibraryIndex  # noqa: E402
+from modules.metadata import MetadataCache  # noqa: E402
+from modules.track_table import TrackTable  # noqa: E402
+
+POR_DISCO = 25
+
+
+def sample_library(raiz, cache, pistas):
+    ficheros = []
+    for d in range(pistas // POR_DISCO):
+        carpeta = os.path.join(raiz, f"Artista {d // 8:04d}", f"Disco {d:05d}")
+        os.makedirs(carpeta)
+        for n in range(POR_DISCO):
+            ruta = os.path.join(carpeta, f"{n:02d} - Cancion numero {n} del disco {d}.mp3")
+            open(ruta, "w").close()
+            ficheros.append((ruta, d, n))
+
+    indice = LibraryIndex(raiz, os.path.join(cache, "library.sqlite3"))
+    indice.rescan()
+    indice.close()
+
+    tags = MetadataCache(os.path.join(cache, "metadata.sqlite3"))
+    tags.open()
+    tags.guardar([
+        (ruta, 0, 0, {"title": f"Cancion {n}", "artist": f"Artista {d // 8}", "album": f"Disco {d}", "track": n})
+        for ruta, d, n in ficheros
+    ])
+    tags.close()
+
+
+def measure(fn):
+    gc.collect()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = fn()
+    ms = (time.perf_counter() - inicio) * 1000
+    actual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, ms, actual
+
+
+def main():
+    pistas = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    tmp = tempfile.mkdtemp()
+    raiz, cache = os.path.join(tmp, "main-mix"), os.path.join(tmp, "cache")
+    try:
+        sample_library(raiz, cache, pistas)
+
+        def cabeceras():
+            indice = LibraryIndex(raiz, os.path.join(cache, "library.sqlite3"))
+            return indice, indice.headers()
+
+        def tags():
+            metadata = MetadataCache(os.path.join(cache, "metadata.sqlite3"))
+            metadata.open()
+            return metadata
+
+        (indice, headers), ms_cabeceras, mem_cabeceras = measure(cabeceras)
+        metadata, ms_tags, mem_tags = measure(tags)
+        _, ms_todo, mem_todo = measure(lambda: indice.playlists(TrackTable()))
+
+        print(f"{'tracks / playlists':<32} {pistas:10d} {len(headers):6d}")
+        print(f"{'index open + headers()':<32} {ms_cabeceras:10.1f} ms {mem_cabeceras / 1e6:8.2f} MB")
+        print(f"{'MetadataCache open()':<32} {ms_tags:10.1f} ms {mem_tags / 1e6:8.2f} MB")
+        print(f"{'boot total':<32} {ms_cabeceras + ms_tags:10.1f} ms {(mem_cabeceras + mem_tags) / 1e6:8.2f} MB")
+        print(f"{'playlists(tabla) (eager)':<32} {ms_todo:10.1f} ms {mem_todo / 1e6:8.2f} MB")
+        indice.close()
+        metadata.close()
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Benchmarks del render del LCD sobre el SPI simulado (stream/sim).
+
+Para cada pantalla mide frames por segundo, bytes enviados por frame (y el
+tiempo que ocuparian en el bus real a 32 MHz) y memoria reservada por frame.
+Aparte desglosa el coste por etapa: layout de texto, dibujo con Pillow,
+conversion a RGB565, diff de teselas / claves de cache y escritura SPI.
+
+Uso:
+    python3 bench/bench_lcd.py [--frames N] [--out resultados.json]
+                               [--thresholds bench/thresholds.json]
+
+Imprime (o guarda) JSON. Con --thresholds compara cada metrica con su
+limite "max_<metrica>" y sale con codigo 1 si alguna lo supera. Bytes,
+escrituras y memoria no dependen de la maquina; los limites de tiempo de
+thresholds.json son para un PC de desarrollo con el simulador.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sim  # noqa: E402
+
+BOARD = sim.install()
+BOARD.panel.decode = False  # el panel virtual no cuenta en las mediciones
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+from modules import interface  # noqa: E402
+from modules.interface import InterfazLCD  # noqa: E402
+from modules.framebuffer import RGB565Converter, dirty_rects  # noqa: E402
+from modules.snake_game import SnakeGame  # noqa: E402
+from modules.text_layout import get_layout, FONT_BOLD, FONT_MENU  # noqa: E402
+
+SPI_HZ = 32000000
+THRESHOLDS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "thresholds.json")
+
+TITULO = "Chopin Mazurka Op. 6 No. 2 in C-sharp minor"
+OPCIONES = [f"Playlist {i:02d}" for i in range(40)]
+OPCION_LARGA = "A very long playlist name that does not fit on the screen at all"
+
+
+# --- escenarios: setup(lcd) devuelve step(i), que produce un frame ---
+
+def mp3_info(lcd):
+    def step(i):
+        lcd.display_mp3_info(TITULO, i, 600, 40)
+    return step
+
+
+def mp3_track_change(lcd):
+    def step(i):
+        lcd.display_mp3_info(f"{TITULO} {i}", 0, 600, 40)
+    return step
+
+
+def menu_static(lcd):
+    loop = asyncio.new_event_loop()
+
+    def step(i):
+        lcd.menu_cache.clear()
+        loop.run_until_complete(lcd.display_menu(OPCIONES, i % len(OPCIONES), titulo="PLAYLIST"))
+    return step
+
+
+def menu_cached(lcd):
+    # moverse arriba y abajo entre paginas ya convertidas
+    loop = asyncio.new_event_loop()
+    for i in range(8):
+        loop.run_until_complete(lcd.display_menu(OPCIONES, i, titulo="PLAYLIST"))
+
+    def step(i):
+        loop.run_until_complete(lcd.display_menu(OPCIONES, i % 8, titulo="PLAYLIST"))
+    return step
+
+
+def menu_scroll(lcd):
+    # cada "frame" es una pasada completa de scroll de la fila, sin las esperas entre pasos
+    interface.MENU_SCROLL_PAUSE = 0
+    interface.MENU_SCROLL_FPS = 1e9
+    blit = lcd.blit_region
+
+    def blit_y_esperar(*args, **kwargs):
+        fut = blit(*args, **kwargs)
+        lcd.display.wait_idle()
+        return fut
+
+    lcd.blit_region = blit_y_esperar
+    loop = asyncio.new_event_loop()
+    opciones = OPCIONES[:3] + [OPCION_LARGA]
+
+    def step(i):
+        loop.run_until_complete(lcd.display_menu(opciones, 3, titulo="PLAYLIST"))
+    return step
+
+
+def chat_feed(lcd):
+    mensajes = [
+        {"dir": "in" if n % 2 else "out", "text": f"Message number {n} with some words to wrap on the lcd"}
+        for n in range(30)
+    ]
+    blocks = lcd.build_chat_blocks(mensajes, "alice")
+
+    def step(i):
+        lcd.display_image(lcd.draw_chat_feed(blocks, i % max(1, len(blocks) - 10)))
+    return step
+
+
+def battery_icon(lcd):
+    lcd.display_image(lcd.draw_text_on_lcd("STREAM 1/7"))
+    lcd.display.wait_idle()
+
+    def step(i):
+        lcd.ultimo_nivel_bateria = 20 + (i % 2) * 60
+        lcd.update_battery_icon_only()
+    return step
+
+
+def snake(lcd):
+    game = SnakeGame(lcd)
+    game.snake = [(5, y) for y in range(8, 3, -1)]
+    vueltas = [(1, 0), (0, 1), (-1, 0), (0, -1)]
+
+    def step(i):
+        if game.game_over:
+            game.reset_game()
+        if i % 6 == 0:
+            game.change_direction(vueltas[(i // 6) % 4])
+        game.update()
+        game.draw()
+    return step
+
+
+SCENARIOS = {
+    "mp3_info": mp3_info,
+    "mp3_track_change": mp3_track_change,
+    "menu_static": menu_static,
+    "menu_cached": menu_cached,
+    "menu_scroll": menu_scroll,
+    "chat_feed": chat_feed,
+    "battery_icon": battery_icon,
+    "snake": snake,
+}
+
+
+def run_scenario(lcd, name, frames, warmup=5):
+    step = SCENARIOS[name](lcd)
+    panel = BOARD.panel
+
+    for i in range(warmup):
+        step(i)
+        lcd.display.wait_idle()
+
+    # tiempo
+    bytes0, writes0 = panel.bytes, panel.writes
+    rendered0 = lcd.display.frames_rendered
+    inicio = time.perf_counter()
+    for i in range(warmup, warmup + frames):
+        step(i)
+        lcd.display.wait_idle()
+    segundos = time.perf_counter() - inicio
+    enviados = panel.bytes - bytes0
+    escrituras = panel.writes - writes0
+    rendered = lcd.display.frames_rendered - rendered0
+
+    # memoria, en una pasada aparte (tracemalloc ralentiza)
+    gc.collect()
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    for i in range(warmup + frames, warmup + 2 * frames):
+        step(i)
+        lcd.display.wait_idle()
+    actual, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "frames": frames,
+        "fps": frames / segundos,
+        "ms_per_frame": segundos * 1000 / frames,
+        "bytes_per_frame": enviados / frames,
+        "spi_writes_per_frame": escrituras / frames,
+        "wire_ms_per_frame": enviados * 8 / SPI_HZ * 1000 / frames,
+        "renders_per_frame": rendered / frames,
+        "alloc_peak_kb": (pico - base) / 1024,
+        "retained_kb_per_frame": (actual - base) / 1024 / frames,
+    }
+
+
+def _per_call(fn, n):
+    fn()
+    inicio = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - inicio) * 1e6 / n
+
+
+def run_stages(lcd, n=200):
+    """Microsegundos por llamada de cada etapa, con los datos de mp3_info."""
+    layout = get_layout(FONT_BOLD, 19)
+    menu_layout = get_layout(FONT_MENU, 17)
+    converter = RGB565Converter(lcd.width, lcd.height)
+
+    img = lcd.draw_text_on_lcd(TITULO, "1:00 / 10:00", 20, 40)
+    img2 = lcd.draw_text_on_lcd(TITULO, "1:01 / 10:00", 20, 40)
+    a = converter.convert(img, converter.new_buffer())
+    b = converter.convert(img2, converter.new_buffer())
+    buf = converter.new_buffer()
+    visibles = tuple(OPCIONES[:10])
+
+    def draw_mp3():
+        lienzo = Image.new("RGB", (lcd.width, lcd.height), "black")
+        lcd.draw_title_block(ImageDraw.Draw(lienzo), TITULO, layout)
+
+    def spi():
+        lcd.set_window(0, 0, lcd.width - 1, lcd.height - 1)
+        lcd.transport.write(a)
+
+    return {
+        "layout_wrap_us": _per_call(lambda: layout.wrap(TITULO, 220), n),
+        "layout_truncate_us": _per_call(lambda: menu_layout.truncate(OPCION_LARGA, 230), n),
+        "draw_mp3_us": _per_call(draw_mp3, n),
+        "draw_full_screen_us": _per_call(lambda: lcd.draw_text_on_lcd(TITULO, "1:00 / 10:00", 20, 40), n),
+        "convert_rgb565_us": _per_call(lambda: converter.convert(img, buf), n),
+        "diff_tiles_us": _per_call(lambda: dirty_rects(a, b), n),
+        "cache_key_us": _per_call(lambda: hash(("PLAYLIST", visibles, 3, FONT_MENU, 17)), n),
+        "spi_write_full_us": _per_call(spi, n),
+        "spi_wire_full_ms": a.nbytes * 8 / SPI_HZ * 1000,
+    }
+
+
+def check(results, thresholds):
+    fallos = []
+    for seccion, limites in thresholds.items():
+        valores = results.get(seccion, {})
+        for clave, limite in limites.items():
+            metrica = clave[len("max_"):]
+            if metrica in valores and valores[metrica] > limite:
+                fallos.append(f"{seccion}.{metrica} = {valores[metrica]:.3f} > {limite}")
+    return fallos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--only", nargs="*", choices=list(SCENARIOS), help="escenarios a medir")
+    parser.add_argument("--out", help="fichero JSON de salida (por defecto stdout)")
+    parser.add_argument("--thresholds", nargs="?", const=THRESHOLDS, help="limites de regresion (JSON)")
+    args = parser.parse_args()
+
+    lcd = InterfazLCD()
+    results = {"scenarios": {}, "stages": {}}
+    for name in args.only or SCENARIOS:
+        lcd.menu_cache.clear()
+        results["scenarios"][name] = run_scenario(lcd, name, args.frames)
+    results["stages"] = run_stages(lcd)
+    lcd.display.stop()
+
+    salida = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(salida + "\n")
+    else:
+        print(salida)
+
+    if args.thresholds:
+        with open(args.thresholds) as f:
+            thresholds = json.load(f)
+        planos = dict(results["scenarios"], stages=results["stages"])
+        fallos = check(planos, thresholds)
+        for fallo in fallos:
+            print(f"REGRESION: {fallo}", file=sys.stderr)
+        if fallos:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
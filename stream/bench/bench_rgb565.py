@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de la conversion RGB888 -> RGB565 del LCD.
+
+Compara el camino antiguo de display_image (rotate + resize + convert + copy
++ temporales numpy + byteswap + tobytes) con RGB565Converter, que escribe
+sobre buffers reservados y deja la rotacion al MADCTL del panel.
+
+Uso (no necesita el hardware, solo Pillow y numpy):
+    python3 bench/bench_rgb565.py [segundos]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.framebuffer import RGB565Converter  # noqa: E402
+
+
+def legacy_convert(img):
+    img = img.rotate(180, expand=False)
+    img = img.resize((240, 240)).convert("RGB")
+    copia = img.copy()  # noqa: F841  (current_image)
+    img_data = np.array(img, dtype=np.uint16)
+    r = (img_data[:, :, 0] >> 3) << 11
+    g = (img_data[:, :, 1] >> 2) << 5
+    b = (img_data[:, :, 2] >> 3)
+    return (r | g | b).astype(np.uint16).byteswap().tobytes()
+
+
+def sample_image():
+    img = Image.new("RGB", (240, 240), "black")
+    draw = ImageDraw.Draw(img)
+    for i in range(0, 120, 8):
+        draw.rectangle((i, i, 239 - i, 239 - i), outline=(i * 2, 255 - i * 2, i))
+    draw.text((40, 100), "radiobit", fill="lightgrey")
+    return img
+
+
+def run(nombre, fn, segundos):
+    frames = 0
+    inicio = time.perf_counter()
+    while time.perf_counter() - inicio < segundos:
+        fn()
+        frames += 1
+    fps = frames / (time.perf_counter() - inicio)
+    print(f"{nombre:<28} {fps:8.1f} frames/s")
+    return fps
+
+
+def main():
+    segundos = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+    img = sample_image()
+    conv = RGB565Converter()
+    out = conv.new_buffer()
+
+    # mismo resultado que el camino antiguo una vez rotado en el panel
+    esperado = np.frombuffer(legacy_convert(img), dtype=np.uint16).reshape(240, 240)
+    assert np.array_equal(esperado[::-1, ::-1], conv.convert(img, out))
+
+    antes = run("legacy display_image", lambda: legacy_convert(img), segundos)
+    despues = run("RGB565Converter", lambda: conv.convert(img, out), segundos)
+    print(f"{'speedup':<28} {despues / antes:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de la representacion de playlists y cola.
+
+Compara listas de rutas (lo que guardaba ControlReproduccion) con
+TrackTable + arrays de ids: memoria que ocupa la biblioteca entera y coste
+de volver a encontrar la pista actual en la cola por su ruta.
+
+Uso (no necesita el hardware, solo numpy):
+    python3 bench/bench_tracks.py [pistas]
+"""
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.track_table import TrackTable, posicion  # noqa: E402
+
+RAIZ = "/home/radiobit/stream/data/main-mix"
+POR_DISCO = 12
+
+
+def sample_library(pistas):
+    # rutas nuevas en cada llamada, como si vinieran de SQLite
+    return [
+        (
+            f"{RAIZ}/Artista {d // 8:04d}/Disco {d:05d}/",
+            [f"{RAIZ}/Artista {d // 8:04d}/Disco {d:05d}/{n:02d} - Cancion numero {n} del disco {d}.flac"
+             for n in range(POR_DISCO)],
+        )
+        for d in range(pistas // POR_DISCO)
+    ]
+
+
+def memory(build):
+    gc.collect()
+    tracemalloc.start()
+    resultado = build()
+    actual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, actual
+
+
+def per_call(fn, n=200):
+    fn()
+    inicio = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - inicio) * 1e6 / n
+
+
+def main():
+    pistas = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+    listas, antes = memory(lambda: sample_library(pistas))
+
+    def compactas():
+        tabla = TrackTable()
+        playlists = [(ruta, tabla.ids(rutas)) for ruta, rutas in sample_library(pistas)]
+        tabla.compactar()
+        return tabla, playlists
+
+    (tabla, playlists), despues = memory(compactas)
+    print(f"{'tracks':<28} {len(tabla):10d}")
+    print(f"{'list of paths':<28} {antes / 1e6:10.2f} MB")
+    print(f"{'TrackTable + id arrays':<28} {despues / 1e6:10.2f} MB")
+
+    # la cola es toda la biblioteca y la pista actual esta al final
+    cola_rutas = [ruta for _, rutas in listas for ruta in rutas]
+    cola_ids = tabla.ids(cola_rutas)
+    ruta = "".join(cola_rutas[-1])  # otro objeto str, como el path que llega de mpv
+    lineal = per_call(lambda: cola_rutas.index(ruta))
+    indice = per_call(lambda: posicion(cola_ids, tabla.buscar(ruta)))
+    print(f"{'queue.index(path)':<28} {lineal:10.1f} us")
+    print(f"{'posicion(ids, buscar(path))':<28} {indice:10.1f} us")
+    print(f"{'buscar(path)':<28} {per_call(lambda: tabla.buscar(ruta), 10000):10.2f} us")
+    print(f"{'ruta(id)':<28} {per_call(lambda: tabla.ruta(cola_ids[-1]), 10000):10.2f} us")
+    assert tabla.ruta(tabla.buscar(ruta)) == ruta
+
+
+if __name__ == "__main__":
+    main()
@@ -3,214 +3,158 @@ import time
 import asyncio
 import signal
 import RPi.GPIO as GPIO
+from modules.input_events import InputManager
+from modules.navigation import Movimiento, nivel_repeticion
 from modules.playback import ControlReproduccion
 from modules.interface import InterfazLCD
-
-# configuracion de pines
-KEY1_PIN = 21
-KEY2_PIN = 20
-KEY3_PIN = 16
-JOYSTICK_UP_PIN = 19
-JOYSTICK_DOWN_PIN = 6
-JOYSTICK_LEFT_PIN = 5
-JOYSTICK_RIGHT_PIN = 26
-JOYSTICK_PRESS_PIN = 13
+from modules.paths import STREAMS_FILE, STREAM_IMAGES_DIR, MP3_DIR
 
 # rutas
-streams_file_path = "/home/radiobit/stream/data/streams.json"
-images_directory = "/home/radiobit/stream/data/stream-images/"
-mp3_directory = "/home/radiobit/stream/data/main-mix/"
+streams_file_path = STREAMS_FILE
+images_directory = os.path.join(STREAM_IMAGES_DIR, "")
+mp3_directory = os.path.join(MP3_DIR, "")
 
 # iniciar modulos
 interfaz_lcd = InterfazLCD()
-control_reproduccion = ControlReproduccion(streams_file_path, images_directory, mp3_directory, interfaz_lcd)
-
+entrada = InputManager()
+control_reproduccion = ControlReproduccion(streams_file_path, images_directory, mp3_directory, interfaz_lcd, entrada)
 
-debounce_time = 0.3
-long_press_time = 0.3
-fast_forward_active = False
 
-in_menu = False  # <--- flag para controlar el joystick dentro del menu
+MENU_TIMEOUT = 16  # segundos sin pulsar para salir del menu
 
+# joystick dentro de los menus
+MENU_DIRECCIONES = {"right": "arriba", "left": "abajo", "up": "extra", "down": "volver"}
 
-def setup_gpio():
-    GPIO.setmode(GPIO.BCM)
-    GPIO.setwarnings(False)
-    for pin in [KEY1_PIN, KEY2_PIN, KEY3_PIN,
-                JOYSTICK_UP_PIN, JOYSTICK_DOWN_PIN,
-                JOYSTICK_LEFT_PIN, JOYSTICK_RIGHT_PIN,
-                JOYSTICK_PRESS_PIN]:
-        GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
 
+# botones que se repiten mientras se mantienen pulsados, y su sentido en las listas
+REPETIBLES = {"right": -1, "left": 1}
 
-async def handle_joystick_action(pin, action_short, action_long):
-    global fast_forward_active
-    press_time = asyncio.get_event_loop().time()
-
-    while not GPIO.input(pin):
-        if asyncio.get_event_loop().time() - press_time >= long_press_time:
-            fast_forward_active = True
-            await action_long()
-            return
-        await asyncio.sleep(0.05)
 
-    if not fast_forward_active:
-        await action_short()
-    fast_forward_active = False
+def es_repeticion(evento):
+    return evento.button in REPETIBLES and evento.kind in ("press", "long", "repeat")
 
 
-async def leer_entrada_menu():
-    timeout = 16  # segundos  // menu timeout
-    tiempo_inicio = asyncio.get_event_loop().time()
+async def leer_entrada_menu(navegar=False):
+    """
+    Siguiente accion de menu. Con navegar=True las direcciones repetibles se
+    devuelven como Movimiento: el salto crece cuanto mas tiempo se mantiene
+    pulsado y se juntan todas las que esten ya en cola, asi el menu solo
+    dibuja la posicion final de la rafaga.
+    """
+    loop = asyncio.get_running_loop()
+    limite = loop.time() + MENU_TIMEOUT
     while True:
-        ahora = asyncio.get_event_loop().time()
-        if not GPIO.input(JOYSTICK_RIGHT_PIN):
-            interfaz_lcd.update_activity()
-            await asyncio.sleep(0.2)
-            return "arriba"
-        if not GPIO.input(JOYSTICK_LEFT_PIN):
-            interfaz_lcd.update_activity()
-            await asyncio.sleep(0.2)
-            return "abajo"
-        if not GPIO.input(JOYSTICK_PRESS_PIN):
+        evento = await entrada.get(limite - loop.time())
+        if evento is None:
+            return None  # Inactividad
+
+        if evento.kind == "press":
             interfaz_lcd.update_activity()
-            press_start = asyncio.get_event_loop().time()
 
-            while not GPIO.input(JOYSTICK_PRESS_PIN):
-                if asyncio.get_event_loop().time() - press_start > 0.6:
-                    await asyncio.sleep(0.2)
-                    return "enter_long"
-                await asyncio.sleep(0.05)
+        if es_repeticion(evento):
+            if not navegar:
+                return MENU_DIRECCIONES[evento.button]
+            pasos = [(REPETIBLES[evento.button], nivel_repeticion(evento.held))]
+            pendientes = entrada.take_while(lambda e: es_repeticion(e) or e.kind == "release")
+            pasos += [(REPETIBLES[e.button], nivel_repeticion(e.held)) for e in pendientes if e.kind != "release"]
+            return Movimiento(pasos)
+
+        if evento.button in MENU_DIRECCIONES:
+            if evento.kind == "press":
+                return MENU_DIRECCIONES[evento.button]
+        elif evento.button == "press":
+            if evento.kind == "short":
+                return "enter"
+            if evento.kind == "long":
+                return "enter_long"
+
+
+async def abrir_menu(menu, *args):
+    # lo pulsado antes de abrir el menu no debe llegar al menu
+    entrada.clear()
+    await menu(leer_entrada_menu, *args)
+    entrada.clear()
+
+
+def cambiar(delta):
+    if control_reproduccion.mode == "mp3":
+        return control_reproduccion.transition("NEXT_MP3" if delta > 0 else "PREV_MP3")
+    siguiente = (control_reproduccion.current_stream + delta) % len(control_reproduccion.streams)
+    return control_reproduccion.transition("PLAY_STREAM", siguiente)
+
+
+async def handle_event(evento, ignorar):
+    boton, kind = evento.button, evento.kind
+
+    if kind == "press":
+        # KEY1-3 con la pantalla apagada solo la encienden
+        if boton in ("key1", "key2", "key3") and not interfaz_lcd.backlight_on:
+            ignorar.add(boton)
+        interfaz_lcd.update_activity()
+    elif kind == "release":
+        ignorar.discard(boton)
+        return
+
+    if boton in ignorar:
+        return
+
+    if boton == "key1" and kind == "press":
+        await control_reproduccion.toggle_mode()
+
+    elif boton == "key2" and kind == "press":
+        if control_reproduccion.mode in ("mp3", "idle"):
+            await abrir_menu(control_reproduccion.seleccionar_playlist)
+
+    elif boton == "key3":
+        if kind == "long":
+            await abrir_menu(control_reproduccion.menu_system)
+        elif kind == "short" and control_reproduccion.mode == "mp3":
+            await abrir_menu(
+                control_reproduccion.seleccionar_pista,
+                control_reproduccion.current_playlist,
+                control_reproduccion.playback_queue,
+            )
 
+    elif boton == "press" and kind == "press":
+        await control_reproduccion.toggle_pause()
 
-            await asyncio.sleep(0.2)
-            return "enter"
-        if not GPIO.input(JOYSTICK_UP_PIN):
-            interfaz_lcd.update_activity()
-            await asyncio.sleep(0.2)
-            return "extra"
-        if not GPIO.input(JOYSTICK_DOWN_PIN):
-            interfaz_lcd.update_activity()
-            await asyncio.sleep(0.2)
-            return "volver"
-        if ahora - tiempo_inicio > timeout:
-            return None  # Inactividad
+    elif boton in ("up", "down"):
+        if control_reproduccion.mode == "idle":
+            return
+        delta = 1 if boton == "up" else -1
+        if kind == "short":
+            await cambiar(delta)
+        elif kind in ("long", "repeat"):
+            await control_reproduccion.seek(10 * delta)
 
-        await asyncio.sleep(0.05)
+    elif boton in ("left", "right") and kind in ("press", "long", "repeat"):
+        await control_reproduccion.change_volume("up" if boton == "right" else "down")
 
 
 async def main_loop():
-    global in_menu
     await control_reproduccion.iniciar()
 
-    button3_press_time = None
-    long_press_duration = 1
-
+    ignorar = set()  # botones cuya pulsacion actual solo ha despertado la pantalla
     while True:
-        current_time = asyncio.get_event_loop().time()
-
-        if not GPIO.input(KEY1_PIN):
-            if not interfaz_lcd.backlight_on:
-                interfaz_lcd.update_activity()
-                await asyncio.sleep(debounce_time)
-            else:
-                interfaz_lcd.update_activity()
-                await asyncio.sleep(debounce_time)
-                await control_reproduccion.toggle_mode()
-
-        if not GPIO.input(KEY2_PIN):
-            if not interfaz_lcd.backlight_on:
-                interfaz_lcd.update_activity()
-                await asyncio.sleep(debounce_time)
-            else:
-                interfaz_lcd.update_activity()
-                await asyncio.sleep(debounce_time)
-                if control_reproduccion.mode in ("mp3", "idle"):
-                    in_menu = True
-                    await control_reproduccion.seleccionar_playlist(leer_entrada_menu)
-                    in_menu = False
-
-
-        if not GPIO.input(KEY3_PIN):
-            if not interfaz_lcd.backlight_on:
-                interfaz_lcd.update_activity()  # enciende retroiluminación
-                await asyncio.sleep(debounce_time)
-            else:
-                interfaz_lcd.update_activity()
-                if button3_press_time is None:
-                    button3_press_time = current_time
-                else:
-                    press_duration = current_time - button3_press_time
-                    if press_duration >= long_press_duration:
-                        await control_reproduccion.menu_system(leer_entrada_menu)
-
-
-        else:
-            if button3_press_time is not None:
-                press_duration = current_time - button3_press_time
-                if press_duration < long_press_duration:
-                    if control_reproduccion.mode == "mp3":
-                        in_menu = True
-                        playlist_index = control_reproduccion.current_playlist
-                        playlist_tracks = control_reproduccion.playback_queue
-                        await control_reproduccion.seleccionar_pista(leer_entrada_menu, playlist_index, playlist_tracks)
-                        in_menu = False
-                button3_press_time = None
-
-        if not in_menu and not GPIO.input(JOYSTICK_PRESS_PIN):
-            interfaz_lcd.update_activity()
-            await asyncio.sleep(debounce_time)
-            await control_reproduccion.toggle_pause()
-
-        if not in_menu and not GPIO.input(JOYSTICK_UP_PIN):
-            interfaz_lcd.update_activity()
-            
-            if control_reproduccion.mode == "idle":
-                await asyncio.sleep(debounce_time)
-                continue
-            
-            await handle_joystick_action(
-                JOYSTICK_UP_PIN,
-                lambda: control_reproduccion.transition("NEXT_MP3") if control_reproduccion.mode == "mp3"
-                    else control_reproduccion.transition("PLAY_STREAM", (control_reproduccion.current_stream + 1) % len(control_reproduccion.streams)),
-                lambda: control_reproduccion.seek(10)
-            )
-
-        if not in_menu and not GPIO.input(JOYSTICK_DOWN_PIN):
-            interfaz_lcd.update_activity()
-            
-            if control_reproduccion.mode == "idle":
-                await asyncio.sleep(debounce_time)
-                continue
-            
-            await handle_joystick_action(
-                JOYSTICK_DOWN_PIN,
-                lambda: control_reproduccion.transition("PREV_MP3") if control_reproduccion.mode == "mp3"
-                    else control_reproduccion.transition("PLAY_STREAM", (control_reproduccion.current_stream - 1) % len(control_reproduccion.streams)),
-                lambda: control_reproduccion.seek(-10)
-            )
-
-        if not in_menu and not GPIO.input(JOYSTICK_LEFT_PIN):
-            interfaz_lcd.update_activity()
-            await asyncio.sleep(debounce_time)
-            await control_reproduccion.change_volume("down")
-
-        if not in_menu and not GPIO.input(JOYSTICK_RIGHT_PIN):
-            interfaz_lcd.update_activity()
-            await asyncio.sleep(debounce_time)
-            await control_reproduccion.change_volume("up")
-
-        await asyncio.sleep(0.05)
+        evento = await entrada.get()
+        await handle_event(evento, ignorar)
 
 
 async def main():
-    setup_gpio()
+    entrada.start()
+
+    # RADIOBIT_RECORD=fichero graba las pulsaciones para reproducirlas en el simulador
+    grabacion = None
+    if os.environ.get("RADIOBIT_RECORD"):
+        from sim.timeline import TimelineRecorder
+        grabacion = TimelineRecorder(entrada, os.environ["RADIOBIT_RECORD"])
 
     loop = asyncio.get_running_loop()
     stop_event = asyncio.Event()
 
-    # iniciar monitorizacion de inactividad
+    # iniciar monitorizacion de inactividad y bateria
     interfaz_lcd.start_inactivity_monitor()
+    interfaz_lcd.start_battery_monitor()
 
     for sig in (signal.SIGINT, signal.SIGTERM):
         loop.add_signal_handler(sig, stop_event.set)
@@ -225,6 +169,9 @@ async def main():
         pass
     finally:
         await control_reproduccion.close()
+        entrada.close()
+        if grabacion is not None:
+            grabacion.close()
         GPIO.cleanup()
 
 if __name__ == "__main__":
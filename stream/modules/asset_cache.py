@@ -0,0 +1,113 @@
+import hashlib
+import os
+import threading
+
+import numpy as np
+from PIL import Image
+
+from modules.framebuffer import RGB565Converter
+from modules import paths
+
+
+CACHE_DIR = os.path.join(paths.CACHE_DIR, "lcd")
+DEFAULT_ROTATION = 180
+
+
+class AssetCache:
+    """
+    Cache en disco de imagenes ya convertidas a RGB565 (listas para el SPI).
+
+    Cada fichero se nombra con el hash de la ruta de origen + mtime +
+    orientacion del panel, asi un cambio en la imagen o en la rotacion genera
+    una entrada nueva y la vieja se borra. El reproductor las abre con mmap,
+    sin decodificar el PNG en cada cambio de emisora.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, width=240, height=240, rotation=DEFAULT_ROTATION):
+        self.cache_dir = cache_dir
+        self.width = width
+        self.height = height
+        self.rotation = rotation
+        self.converter = RGB565Converter(width, height)
+        self._lock = threading.Lock()  # build() comparte el buffer del converter (la web la llama desde varios hilos)
+        self._mapped = {}  # ruta cache -> memmap abierto
+        self.hits = 0
+        self.misses = 0
+
+
+    def _prefix(self, src):
+        return hashlib.sha1(os.path.abspath(src).encode()).hexdigest()[:16]
+
+
+    def cache_path(self, src):
+        mtime = os.stat(src).st_mtime_ns
+        nombre = f"{self._prefix(src)}-{mtime}-r{self.rotation}-{self.width}x{self.height}.rgb565"
+        return os.path.join(self.cache_dir, nombre)
+
+
+    def get(self, src):
+        """
+        Devuelve el framebuffer RGB565 de src como memmap de solo lectura,
+        generandolo si no existe todavia.
+        """
+        ruta = self.cache_path(src)
+        buf = self._mapped.get(ruta)
+        if buf is not None:
+            self.hits += 1
+            return buf
+
+        if os.path.exists(ruta):
+            self.hits += 1
+        else:
+            self.misses += 1
+            self.build(src, ruta)
+
+        # soltar mapeos de versiones anteriores de la misma imagen
+        prefijo = os.path.join(self.cache_dir, self._prefix(src) + "-")
+        for viejo in [r for r in self._mapped if r.startswith(prefijo)]:
+            del self._mapped[viejo]
+
+        buf = np.memmap(ruta, dtype=np.uint16, mode="r", shape=(self.height, self.width))
+        self._mapped[ruta] = buf
+        return buf
+
+
+    def build(self, src, ruta=None):
+        ruta = ruta or self.cache_path(src)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        with self._lock:
+            with Image.open(src) as img:
+                frame = self.converter.convert(img, self.converter.new_buffer())
+
+            # escritura atomica: el reproductor nunca ve un fichero a medias
+            tmp = f"{ruta}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(frame.tobytes())
+            os.replace(tmp, ruta)
+
+            self._prune(src, keep=ruta)
+        return ruta
+
+
+    def warm(self, paths):
+        """Genera (si falta) la entrada de cada imagen. Ignora las que fallen."""
+        for src in paths:
+            try:
+                if not os.path.exists(self.cache_path(src)):
+                    self.build(src)
+            except (OSError, ValueError) as e:
+                print(f"Error caching {src}: {e}")
+
+
+    def _prune(self, src, keep):
+        # borra entradas antiguas de la misma imagen (otro mtime u orientacion)
+        prefijo = self._prefix(src) + "-"
+        for nombre in os.listdir(self.cache_dir):
+            ruta = os.path.join(self.cache_dir, nombre)
+            if nombre.startswith(prefijo) and ruta != keep and not nombre.endswith(".tmp"):
+                self._mapped.pop(ruta, None)
+                try:
+                    os.remove(ruta)
+                except OSError:
+                    pass
@@ -0,0 +1,111 @@
+import RPi.GPIO as GPIO
+
+try:
+    import pigpio
+except ImportError:
+    pigpio = None
+
+
+class Backlight:
+    """
+    Retroiluminacion del LCD con tres estados: "on", "dim" y "off".
+
+    Brillo 0 y 100 son siempre un simple nivel alto/bajo del GPIO. Solo
+    mientras la pantalla esta atenuada hay PWM: el del DMA del SoC si el
+    demonio pigpiod esta disponible (sin hilo de CPU), si no el PWM por
+    software de RPi.GPIO.
+    """
+
+    def __init__(self, pin, frequency=1000, dim_level=15):
+        self.pin = pin
+        self.frequency = frequency
+        self.dim_level = dim_level
+        self.level = None
+        self.state = None
+        self._listeners = []
+
+        self._pi = None
+        self._pwm = None  # PWM software de RPi.GPIO, solo si hace falta
+        self._pwm_running = False
+
+        if pigpio is not None:
+            pi = pigpio.pi()
+            if pi.connected:
+                self._pi = pi
+                self._pi.set_PWM_frequency(pin, frequency)
+                self._pi.set_PWM_range(pin, 100)
+
+        if self._pi is None:
+            GPIO.setup(pin, GPIO.OUT)
+
+        self.on()
+
+
+    @property
+    def backend(self):
+        return "pigpio" if self._pi is not None else "gpio"
+
+
+    def add_listener(self, fn):
+        """fn(state, level) se llama cada vez que cambia el estado."""
+        self._listeners.append(fn)
+
+
+    def on(self):
+        self._set_state("on", 100)
+
+
+    def dim(self):
+        self._set_state("dim", self.dim_level)
+
+
+    def off(self):
+        self._set_state("off", 0)
+
+
+    def _set_state(self, state, level):
+        if state == self.state and level == self.level:
+            return
+        self.set_level(level)
+        self.state = state
+        for fn in self._listeners:
+            fn(state, level)
+
+
+    def set_level(self, level):
+        level = max(0, min(int(level), 100))
+        if level == self.level:
+            return
+        self.level = level
+
+        if self._pi is not None:
+            if level in (0, 100):
+                self._pi.write(self.pin, 1 if level else 0)  # para el PWM de ese pin
+            else:
+                self._pi.set_PWM_dutycycle(self.pin, level)
+            return
+
+        if level in (0, 100):
+            # brillo fijo: sin hilo de PWM
+            if self._pwm_running:
+                self._pwm.stop()
+                self._pwm_running = False
+            GPIO.output(self.pin, GPIO.HIGH if level else GPIO.LOW)
+            return
+
+        if self._pwm is None:
+            self._pwm = GPIO.PWM(self.pin, self.frequency)
+        if self._pwm_running:
+            self._pwm.ChangeDutyCycle(level)
+        else:
+            self._pwm.start(level)
+            self._pwm_running = True
+
+
+    def close(self):
+        if self._pwm_running:
+            self._pwm.stop()
+            self._pwm_running = False
+        if self._pi is not None:
+            self._pi.write(self.pin, 0)
+            self._pi.stop()
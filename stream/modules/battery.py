@@ -0,0 +1,104 @@
+import asyncio
+import time
+from collections import deque
+
+
+class BatteryMonitor:
+    """
+    Muestreo de la PiSugar en segundo plano.
+
+    La lectura I2C se hace en un hilo (asyncio.to_thread) cada `interval`
+    segundos; el nivel se suaviza con una media exponencial y la autonomia se
+    estima con la pendiente de las ultimas muestras. El render solo lee los
+    valores ya calculados y nunca espera al I2C.
+    """
+
+    def __init__(self, pisugar, interval=10, alpha=0.3, history=30):
+        self.pisugar = pisugar
+        self.interval = interval
+        self.alpha = alpha
+
+        self.raw = None
+        self.level = None       # nivel suavizado (0-100)
+        self.charging = None
+        self.runtime = None     # segundos estimados hasta vaciarse, None si no se sabe
+        self.errors = 0
+
+        self._history = deque(maxlen=history)  # (tiempo, nivel suavizado)
+        self._listeners = []
+        self._task = None
+
+
+    def add_listener(self, fn):
+        """fn(monitor) se llama en el loop tras cada muestra."""
+        self._listeners.append(fn)
+
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+
+    async def run(self):
+        while True:
+            muestra = await asyncio.to_thread(self._sample)
+            if muestra is not None:
+                self._update(*muestra)
+                for fn in self._listeners:
+                    fn(self)
+            await asyncio.sleep(self.interval)
+
+
+    def _sample(self):
+        # corre fuera del loop: lecturas I2C
+        try:
+            nivel = float(self.pisugar.get_battery_level())
+        except Exception:
+            self.errors += 1
+            return None
+
+        cargando = None
+        try:
+            cargando = bool(self.pisugar.get_battery_charging_status())
+        except Exception:
+            pass
+
+        return time.monotonic(), nivel, cargando
+
+
+    def _update(self, ahora, nivel, cargando):
+        nivel = max(0.0, min(nivel, 100.0))
+        self.raw = nivel
+
+        # al enchufar/desenchufar el nivel salta: se reinicia el suavizado
+        if self.level is None or cargando != self.charging:
+            self.level = nivel
+            self._history.clear()
+        else:
+            self.level += self.alpha * (nivel - self.level)
+
+        self.charging = cargando
+        self._history.append((ahora, self.level))
+        self.runtime = self._estimate_runtime()
+
+
+    def _estimate_runtime(self):
+        if self.charging or len(self._history) < 3:
+            return None
+
+        # pendiente por minimos cuadrados (%/s)
+        n = len(self._history)
+        t0 = self._history[0][0]
+        ts = [t - t0 for t, _ in self._history]
+        ls = [lv for _, lv in self._history]
+        t_media = sum(ts) / n
+        l_media = sum(ls) / n
+        den = sum((t - t_media) ** 2 for t in ts)
+        if den == 0:
+            return None
+        pendiente = sum((t - t_media) * (lv - l_media) for t, lv in zip(ts, ls)) / den
+
+        if pendiente >= 0:
+            return None
+        return self.level / -pendiente
@@ -0,0 +1,193 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+
+class DisplayService:
+    """
+    Hilo dedicado que es el unico dueño del SPI del LCD.
+
+    Los frames entran por un buzon de una sola plaza: si llega un frame nuevo
+    antes de que el hilo haya enviado el anterior, el anterior se descarta
+    (gana el ultimo). Asi la latencia entrada -> pixel queda acotada a como
+    mucho dos frames aunque el menu se mueva muy rapido.
+
+    Ademas del frame completo el buzon admite parches (zonas pequeñas de
+    pantalla) identificados por una clave; un parche nuevo con la misma clave
+    sustituye al pendiente y un frame completo descarta los parches previos.
+
+    Los comandos (call) no se descartan y respetan el orden de llegada con
+    los frames: si al encolar uno hay algo en el buzon, se lo lleva y se
+    envia justo antes de ejecutarlo.
+    """
+
+    def __init__(self, render, render_patch=None, name="lcd-render"):
+        self._render = render  # funcion que envia un frame al panel (corre en el hilo)
+        self._render_patch = render_patch
+        self._cond = threading.Condition()
+        self._frame = None
+        self._patches = {}  # clave -> parche pendiente, en orden de llegada
+        self._frame_time = 0
+        self._waiters = []  # futures pendientes del frame del buzon
+        self._jobs = deque()  # (fn, args, future, buzon anterior o None), estos nunca se descartan
+        self._running = True
+        self._busy = False
+
+        # contadores
+        self.frames_rendered = 0
+        self.frames_dropped = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+
+    def submit(self, frame):
+        """
+        Deja un frame en el buzon sin bloquear. Devuelve un Future que se
+        completa cuando ese frame (o uno posterior que lo sustituya) esta en
+        pantalla.
+        """
+        fut = Future()
+        with self._cond:
+            if self._frame is not None or self._patches:
+                self.frames_dropped += 1
+            else:
+                self._frame_time = time.monotonic()
+            self._frame = frame
+            self._patches.clear()
+            self._waiters.append(fut)
+            self._cond.notify_all()
+        return fut
+
+
+    def submit_patch(self, key, patch):
+        """
+        Deja un parche en el buzon sin bloquear. Se envia despues del frame
+        pendiente (si lo hay). Devuelve un Future como submit.
+        """
+        fut = Future()
+        with self._cond:
+            if key in self._patches:
+                self.frames_dropped += 1
+                del self._patches[key]
+            elif self._frame is None and not self._patches:
+                self._frame_time = time.monotonic()
+            self._patches[key] = patch
+            self._waiters.append(fut)
+            self._cond.notify_all()
+        return fut
+
+
+    async def show(self, frame):
+        """Version awaitable de submit: vuelve cuando el frame esta en pantalla."""
+        return await asyncio.wrap_future(self.submit(frame))
+
+
+    def call(self, fn, *args):
+        """
+        Ejecuta fn(*args) en el hilo del display, en orden con el resto de
+        comandos: despues de los frames enviados antes y antes de los
+        siguientes. Util para comandos al panel.
+        """
+        fut = Future()
+        with self._cond:
+            self._jobs.append((fn, args, fut, self._vaciar_buzon()))
+            self._cond.notify_all()
+        return fut
+
+
+    def _vaciar_buzon(self):
+        # con el lock: lo pendiente del buzon, o None si esta vacio
+        if self._frame is None and not self._patches:
+            return None
+        buzon = (self._frame, list(self._patches.values()), self._waiters, self._frame_time)
+        self._frame = None
+        self._patches.clear()
+        self._waiters = []
+        return buzon
+
+
+    def wait_idle(self, timeout=None):
+        """
+        Bloquea hasta que no quede nada pendiente ni en curso. Para medir y
+        para pruebas; la aplicacion usa los Future.
+        """
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: not (self._busy or self._jobs or self._frame is not None or self._patches),
+                timeout,
+            )
+
+
+    def stop(self, timeout=1.0):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if threading.current_thread() is not self._thread:
+            self._thread.join(timeout)
+
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._jobs and self._frame is None and not self._patches:
+                    self._cond.wait()
+
+                if not self._running:
+                    pendientes = list(self._waiters)
+                    for _, _, fut, buzon in self._jobs:
+                        pendientes.append(fut)
+                        if buzon is not None:
+                            pendientes.extend(buzon[2])
+                    self._waiters = []
+                    self._jobs.clear()
+                    break
+
+                self._busy = True
+                if self._jobs:
+                    fn, args, fut, buzon = self._jobs.popleft()
+                else:
+                    fn = None
+                    buzon = self._vaciar_buzon()
+
+            # lo que estaba en el buzon al encolar el comando va antes que el
+            if buzon is not None:
+                self._enviar(*buzon)
+            if fn is not None:
+                try:
+                    fut.set_result(fn(*args))
+                except Exception as e:
+                    fut.set_exception(e)
+            self._set_idle()
+
+        for fut in pendientes:
+            fut.cancel()
+
+
+    def _enviar(self, frame, patches, waiters, enviado):
+        try:
+            if frame is not None:
+                self._render(frame)
+            for patch in patches:
+                self._render_patch(patch)
+        except Exception as e:
+            print(f"Error rendering frame: {e}")
+            for fut in waiters:
+                fut.set_exception(e)
+            return
+
+        self.frames_rendered += 1
+        self.last_latency = time.monotonic() - enviado
+        self.max_latency = max(self.max_latency, self.last_latency)
+        for fut in waiters:
+            fut.set_result(True)
+
+
+    def _set_idle(self):
+        with self._cond:
+            self._busy = False
+            self._cond.notify_all()
@@ -0,0 +1,147 @@
+import numpy as np
+from PIL import Image
+
+
+# tamaño de tesela para comparar frames (240 es multiplo de 16)
+TILE_SIZE = 16
+
+# si cambia mas de esta fraccion de pantalla se envia el frame completo
+FULL_FRAME_RATIO = 0.6
+
+
+class RGB565Converter:
+    """
+    Convierte imagenes PIL a RGB565 big-endian (el orden que espera el
+    ST7789) escribiendo sobre buffers numpy reservados de antemano.
+    La unica copia por frame es la lectura de los pixeles de la imagen.
+    """
+
+    def __init__(self, width=240, height=240):
+        self.width = width
+        self.height = height
+        self._tmp = np.empty((height, width), dtype=np.uint16)
+
+    def new_buffer(self):
+        return np.zeros((self.height, self.width), dtype=np.uint16)
+
+    def convert(self, img, out):
+        if img.size != (self.width, self.height):
+            img = img.resize((self.width, self.height))
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+
+        rgb = np.asarray(img)
+        tmp = self._tmp
+
+        # r: (r >> 3) << 11  ==  (r & 0xF8) << 8
+        np.copyto(out, rgb[:, :, 0])
+        out &= 0xF8
+        out <<= 8
+
+        # g: (g >> 2) << 5  ==  (g & 0xFC) << 3
+        np.copyto(tmp, rgb[:, :, 1])
+        tmp &= 0xFC
+        tmp <<= 3
+        out |= tmp
+
+        # b: b >> 3
+        np.copyto(tmp, rgb[:, :, 2])
+        tmp >>= 3
+        out |= tmp
+
+        out.byteswap(inplace=True)
+        return out
+
+
+def to_rgb565(img):
+    """Convierte una imagen pequeña (parches, iconos) a RGB565 big-endian."""
+    rgb = np.asarray(img.convert("RGB"), dtype=np.uint16)
+    out = ((rgb[:, :, 0] & 0xF8) << 8) | ((rgb[:, :, 1] & 0xFC) << 3) | (rgb[:, :, 2] >> 3)
+    return out.astype(np.uint16).byteswap()
+
+
+def rgb565_to_image(buf):
+    """Inversa de to_rgb565, para dibujar con PIL encima de un framebuffer."""
+    v = buf.byteswap()
+    rgb = np.empty(buf.shape + (3,), dtype=np.uint8)
+    rgb[:, :, 0] = (v >> 8) & 0xF8
+    rgb[:, :, 1] = (v >> 3) & 0xFC
+    rgb[:, :, 2] = (v << 3) & 0xF8
+    return Image.fromarray(rgb, "RGB")
+
+
+def changed_tiles(prev, cur, tile=TILE_SIZE):
+    """
+    Devuelve una matriz booleana (filas x columnas de teselas) con las
+    teselas que difieren entre dos framebuffers RGB565 del mismo tamaño.
+    """
+    h, w = cur.shape
+    rows, cols = h // tile, w // tile
+    diff = prev != cur
+    return diff.reshape(rows, tile, cols, tile).any(axis=(1, 3))
+
+
+def merge_tiles(mask, tile=TILE_SIZE):
+    """
+    Agrupa teselas cambiadas en rectangulos (x0, y0, x1, y1), extremos incluidos.
+    Primero une teselas contiguas de una fila y luego une filas consecutivas
+    con el mismo tramo horizontal.
+    """
+    rects = []
+    abiertos = {}  # (col_ini, col_fin) -> [fila_ini, fila_fin]
+
+    for fila in range(mask.shape[0]):
+        tramos = []
+        col = 0
+        cols = mask.shape[1]
+        while col < cols:
+            if mask[fila, col]:
+                ini = col
+                while col < cols and mask[fila, col]:
+                    col += 1
+                tramos.append((ini, col - 1))
+            else:
+                col += 1
+
+        siguientes = {}
+        for tramo in tramos:
+            if tramo in abiertos:
+                abiertos[tramo][1] = fila
+                siguientes[tramo] = abiertos.pop(tramo)
+            else:
+                siguientes[tramo] = [fila, fila]
+
+        # los tramos que no continuan en esta fila quedan cerrados
+        for (c0, c1), (f0, f1) in abiertos.items():
+            rects.append((c0, f0, c1, f1))
+        abiertos = siguientes
+
+    for (c0, c1), (f0, f1) in abiertos.items():
+        rects.append((c0, f0, c1, f1))
+
+    return [
+        (c0 * tile, f0 * tile, (c1 + 1) * tile - 1, (f1 + 1) * tile - 1)
+        for c0, f0, c1, f1 in rects
+    ]
+
+
+def dirty_rects(prev, cur, tile=TILE_SIZE, full_ratio=FULL_FRAME_RATIO):
+    """
+    Compara el nuevo framebuffer con el ultimo enviado y devuelve la lista de
+    rectangulos a enviar. Lista vacia si no hay cambios; un unico rectangulo
+    de pantalla completa si no hay frame previo o cambia casi todo.
+    """
+    h, w = cur.shape
+    full = [(0, 0, w - 1, h - 1)]
+
+    if prev is None or prev.shape != cur.shape:
+        return full
+
+    mask = changed_tiles(prev, cur, tile)
+    cambiadas = int(mask.sum())
+    if cambiadas == 0:
+        return []
+    if cambiadas >= mask.size * full_ratio:
+        return full
+
+    return merge_tiles(mask, tile)
@@ -0,0 +1,213 @@
+import asyncio
+import time
+from collections import deque, namedtuple
+
+import RPi.GPIO as GPIO
+
+
+# pin BCM, segundos hasta "long" (None: sin pulsacion larga), intervalo de "repeat" tras el "long"
+ButtonConfig = namedtuple("ButtonConfig", "pin long_press repeat", defaults=(None, None))
+
+BOTONES = {
+    "key1": ButtonConfig(21),
+    "key2": ButtonConfig(20),
+    "key3": ButtonConfig(16, long_press=1.0),
+    "up": ButtonConfig(19, long_press=0.3, repeat=0.3),
+    "down": ButtonConfig(6, long_press=0.3, repeat=0.3),
+    "left": ButtonConfig(5, long_press=0.4, repeat=0.2),
+    "right": ButtonConfig(26, long_press=0.4, repeat=0.2),
+    "press": ButtonConfig(13, long_press=0.6),
+}
+
+# kind: "press" al pulsar, "release" al soltar, "short" al soltar antes del
+# long_press, "long" al cumplirse long_press y "repeat" mientras siga pulsado.
+# t es el instante (time.monotonic) del flanco que lo origina y held los
+# segundos que lleva pulsado.
+ButtonEvent = namedtuple("ButtonEvent", "button kind t held")
+
+
+class InputManager:
+    """
+    Entrada de botones por interrupciones.
+
+    RPi.GPIO detecta los flancos en su hilo; el callback solo lee el nivel,
+    lo marca con la hora y lo pasa al loop. En el loop se filtran los rebotes
+    (el primer flanco cuenta al momento y se vuelve a leer el pin al acabar la
+    ventana de rebote) y se generan los eventos press/short/long/repeat en una
+    cola. Sin pulsaciones no hay ningun despertar periodico.
+    """
+
+    def __init__(self, buttons=BOTONES, debounce=0.02):
+        self.buttons = dict(buttons)
+        self.debounce = debounce
+        self._events = deque()
+        self._ready = asyncio.Event()
+        self.loop = None
+
+        self._pressed = {name: False for name in self.buttons}
+        self._down_at = {}
+        self._last_edge = {name: 0.0 for name in self.buttons}
+        self._timers = {}
+        self._settle = {}
+        self._listeners = []
+
+        # contadores
+        self.edges = 0
+        self.bounces = 0
+        self.events = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+
+
+    def start(self):
+        """Configura los pines y activa la deteccion de flancos (desde el loop)."""
+        self.loop = asyncio.get_running_loop()
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setwarnings(False)
+        for name, cfg in self.buttons.items():
+            GPIO.setup(cfg.pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+            self._pressed[name] = not GPIO.input(cfg.pin)
+            GPIO.add_event_detect(cfg.pin, GPIO.BOTH, callback=self._make_callback(name))
+
+
+    def close(self):
+        for cfg in self.buttons.values():
+            try:
+                GPIO.remove_event_detect(cfg.pin)
+            except (RuntimeError, ValueError):
+                pass
+        for handle in list(self._timers.values()) + list(self._settle.values()):
+            handle.cancel()
+        self._timers.clear()
+        self._settle.clear()
+
+
+    def _make_callback(self, name):
+        pin = self.buttons[name].pin
+
+        def callback(_channel):
+            # hilo de RPi.GPIO: solo leer y marcar la hora
+            pressed = not GPIO.input(pin)
+            self.loop.call_soon_threadsafe(self._on_edge, name, pressed, time.monotonic())
+
+        return callback
+
+
+    # --- eventos ---
+
+    async def get(self, timeout=None):
+        """Siguiente evento, o None si pasa `timeout` segundos sin ninguno."""
+        while not self._events:
+            self._ready.clear()
+            if timeout is None:
+                await self._ready.wait()
+                continue
+            if timeout <= 0:
+                return None
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self._events.popleft()
+
+
+    def get_nowait(self):
+        return self._events.popleft() if self._events else None
+
+
+    def take_while(self, pred):
+        """Saca los eventos pendientes del principio de la cola mientras pred(evento)."""
+        eventos = []
+        while self._events and pred(self._events[0]):
+            eventos.append(self._events.popleft())
+        return eventos
+
+
+    def drain(self):
+        """Devuelve y vacia los eventos pendientes."""
+        eventos = list(self._events)
+        self._events.clear()
+        return eventos
+
+
+    def clear(self):
+        self._events.clear()
+
+
+    def add_listener(self, fn):
+        """fn(boton, pulsado, t) se llama en el loop con cada cambio ya sin rebotes."""
+        self._listeners.append(fn)
+
+
+    def is_pressed(self, name):
+        return self._pressed[name]
+
+
+    # --- loop: rebotes y temporizadores ---
+
+    def _on_edge(self, name, pressed, t):
+        self.edges += 1
+        if t - self._last_edge[name] < self.debounce:
+            # rebote: el estado final se comprueba al cerrar la ventana
+            self.bounces += 1
+            return
+        self._transition(name, pressed, t)
+
+
+    def _settle_check(self, name):
+        self._settle.pop(name, None)
+        pressed = not GPIO.input(self.buttons[name].pin)
+        self._transition(name, pressed, time.monotonic())
+
+
+    def _transition(self, name, pressed, t):
+        if pressed == self._pressed[name]:
+            return
+        self._pressed[name] = pressed
+        self._last_edge[name] = t
+        for fn in self._listeners:
+            fn(name, pressed, t)
+
+        if name not in self._settle:
+            self._settle[name] = self.loop.call_later(self.debounce, self._settle_check, name)
+
+        cfg = self.buttons[name]
+        if pressed:
+            self._down_at[name] = t
+            self._post(name, "press", t)
+            if cfg.long_press is not None:
+                self._schedule(name, cfg.long_press, "long")
+            return
+
+        handle = self._timers.pop(name, None)
+        if handle is not None:
+            handle.cancel()
+        down_at = self._down_at.get(name, t)
+        if cfg.long_press is not None and t - down_at < cfg.long_press:
+            self._post(name, "short", t)
+        self._post(name, "release", t)
+        self._down_at.pop(name, None)
+
+
+    def _schedule(self, name, delay, kind):
+        self._timers[name] = self.loop.call_later(delay, self._on_hold, name, kind)
+
+
+    def _on_hold(self, name, kind):
+        self._timers.pop(name, None)
+        if not self._pressed[name]:
+            return
+        self._post(name, kind, time.monotonic())
+        repeat = self.buttons[name].repeat
+        if repeat is not None:
+            self._schedule(name, repeat, "repeat")
+
+
+    def _post(self, name, kind, t):
+        held = t - self._down_at.get(name, t)
+        latency = time.monotonic() - t
+        self.last_latency = latency
+        self.max_latency = max(self.max_latency, latency)
+        self.events += 1
+        self._events.append(ButtonEvent(name, kind, t, held))
+        self._ready.set()
@@ -2,54 +2,115 @@ import spidev
 import asyncio
 import time
 import RPi.GPIO as GPIO
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 import numpy as np
 import sugarpie
-import zlib
+from modules.framebuffer import dirty_rects, RGB565Converter, to_rgb565, rgb565_to_image
+from modules.asset_cache import AssetCache
+from modules.now_playing import NowPlayingView
+from modules.text_layout import get_layout, FONT_BOLD, FONT_MENU
+from modules.lru import LRUCache
+from modules.backlight import Backlight
+from modules.spi_transport import SPITransport
+from modules.battery import BatteryMonitor
+from modules.display_service import DisplayService
+
+
+# MADCTL y desplazamiento (x, y) de la ventana segun la rotacion.
+# el panel de 240x240 ocupa parte de la GRAM de 240x320 del ST7789, por eso
+# al invertir filas hay que desplazar 80 pixeles
+MADCTL_ROTACION = {
+    0: (0x00, 0, 0),
+    90: (0x60, 0, 0),
+    180: (0xC0, 0, 80),
+    270: (0xA0, 80, 0),
+}
+
+
+# scroll horizontal del elemento seleccionado en los menus
+MENU_SCROLL_PAUSE = 0.25  # segundos antes de empezar
+MENU_SCROLL_FPS = 30
+MENU_SCROLL_STEP = 6  # pixeles por frame
+
+# memoria maxima para paginas de menu ya convertidas (~115 KB cada una)
+MENU_CACHE_BYTES = 4 * 1024 * 1024
+
+# zona que ocupa el icono de bateria (x, y, ancho, alto), terminal incluido
+BATTERY_ICON_BOX = (208, 8, 27, 13)
 
 
 class InterfazLCD:
-    def __init__(self, rst_pin=27, dc_pin=25, bl_pin=24, cs_pin=8):
+    def __init__(self, rst_pin=27, dc_pin=25, bl_pin=24, cs_pin=8, rotation=180):  #   /// ROTAR PANTALLA /// horizontal: 270
         self.width = 240
         self.height = 240
+        self.rotation = rotation
+        self.madctl, self.x_offset, self.y_offset = MADCTL_ROTACION[rotation]
         self.RST_PIN = rst_pin
         self.DC_PIN = dc_pin
         self.BL_PIN = bl_pin
         self.CS_PIN = cs_pin
         self.spi = spidev.SpiDev()
-        self.last_image_hash = None
+        self.last_frame = None  # ultimo framebuffer RGB565 enviado al panel
+        self.converter = RGB565Converter(self.width, self.height)
+        self._buffers = (self.converter.new_buffer(), self.converter.new_buffer())
+        self.assets = AssetCache(width=self.width, height=self.height, rotation=rotation)
+        self.now_playing = NowPlayingView(self, BATTERY_ICON_BOX)
+        self.menu_converter = RGB565Converter(self.width, self.height)
+        self.menu_cache = LRUCache(maxsize=64, max_bytes=MENU_CACHE_BYTES, sizeof=lambda frame: frame.nbytes)
         self.pisugar = sugarpie.Pisugar()
+        self.battery = BatteryMonitor(self.pisugar)
+        self.battery.add_listener(self._on_battery_sample)
+        self.on_battery_change = None  # se llama cuando cambia el relleno del icono
+        self._battery_fill_shown = None
         self.last_input_time = time.time()
         self.inactive_timeout = 80  # segundos  ///AUMENTA O DISMINUYE SEGUN PREFIERAS///// 
-        self.backlight_on = True
+        self.dim_timeout = 60  # segundos hasta atenuar la pantalla antes de apagarla
         self.ultimo_nivel_bateria = -1
         self.current_image = None # flag para guardar imagen y actualizar bateria modo stream
         self.scroll_offset = 0
         self.last_scroll_time = time.time()
         self.screen_locked = False
+        self.dark = False  # panel dormido con la retroiluminacion apagada: no se renderiza
+        self.on_wake = None  # funcion que repinta el estado actual al despertar
 
 
         GPIO.setmode(GPIO.BCM)
         GPIO.setwarnings(False)
-        for pin in (self.RST_PIN, self.DC_PIN, self.BL_PIN, self.CS_PIN):
+        for pin in (self.RST_PIN, self.DC_PIN, self.CS_PIN):
             GPIO.setup(pin, GPIO.OUT)
 
-        GPIO.setup(self.BL_PIN, GPIO.OUT)
-
-        # Iniciar PWM en BL_PIN con una frecuencia de 1000 Hz
-        self.bl_pwm = GPIO.PWM(self.BL_PIN, 1000)
-        self.bl_pwm.start(100)  # Brillo al 100%
+        # retroiluminacion al 100% (sin PWM mientras el brillo sea fijo)
+        self.backlight = Backlight(self.BL_PIN)
         self.spi.open(0, 0)
         self.spi.max_speed_hz = 32000000
         self.spi.mode = 0b00
+        self.transport = SPITransport(self.spi, self.DC_PIN)
         self.inicializar_lcd()
 
+        # a partir de aqui solo el hilo del display toca el SPI
+        self.display = DisplayService(self._render_frame, self._render_patch)
+
 
     def __del__(self):
+        self.display.stop()
+        self.backlight.close()
         self.spi.close()
         GPIO.cleanup()
 
 
+    def start_battery_monitor(self):
+        self.battery.start()
+
+
+    def _on_battery_sample(self, monitor):
+        self.ultimo_nivel_bateria = int(round(monitor.level))
+        fill = self.battery_fill()
+        if fill != self._battery_fill_shown:
+            self._battery_fill_shown = fill
+            if self.on_battery_change is not None:
+                self.on_battery_change()
+
+
     def start_inactivity_monitor(self):
         # crear la tarea de monitorizacion solo cuando se llame a este metodo
         self.last_input_time = time.time()
@@ -59,33 +120,80 @@ class InterfazLCD:
     async def monitor_inactivity(self):
         while True:
             await asyncio.sleep(5)
-            if self.backlight_on and time.time() - self.last_input_time > self.inactive_timeout:
-                self.bl_pwm.ChangeDutyCycle(0)
-                self.backlight_on = False
+            inactivo = time.time() - self.last_input_time
+            if self.backlight_on and inactivo > self.inactive_timeout:
+                self.backlight.off()
+                self.sleep_display()
+            elif self.backlight.state == "on" and inactivo > self.dim_timeout:
+                self.backlight.dim()
+
+
+    @property
+    def backlight_on(self):
+        # atenuada sigue contando como encendida: los botones actuan normalmente
+        return self.backlight.state != "off"
 
 
     def update_activity(self):
         self.last_input_time = time.time()
-        if not self.backlight_on:
-            self.bl_pwm.ChangeDutyCycle(100)
-            self.backlight_on = True
+        if self.backlight.state != "on":
+            self.wake_display()
+            self.backlight.on()
+
+
+    def sleep_display(self):
+        """
+        Modo oscuro: deja de renderizar y duerme el ST7789 (DISPOFF + SLPIN).
+        Los frames que lleguen mientras tanto solo se recuerdan.
+        """
+        if self.dark:
+            return
+        self.dark = True
+        self.display.call(self._panel_sleep)
+
+
+    def wake_display(self):
+        """Despierta el panel y envia un unico frame con el estado actual."""
+        if not self.dark:
+            return
+        self.dark = False
+        self.display.call(self._panel_wake)
+
+        # la GRAM se conserva dormida, el diff solo envia lo que haya cambiado
+        if self.on_wake is not None:
+            self.on_wake()
+        elif self.current_image is not None:
+            self.display_image(self.current_image)
+
+
+    def _panel_sleep(self):
+        self.write_command(0x28)  # DISPOFF
+        self.write_command(0x10)  # SLPIN
+
+
+    def _panel_wake(self):
+        self.write_command(0x11)  # SLPOUT
+        time.sleep(0.12)
+        self.write_command(0x29)  # DISPON
 
 
     def write_command(self, cmd):
-        GPIO.output(self.DC_PIN, GPIO.LOW)
-        self.spi.xfer([cmd])
+        self.transport.command(cmd)
 
 
     def write_data(self, data):
-        GPIO.output(self.DC_PIN, GPIO.HIGH)
-        self.spi.xfer(data)
+        self.transport.data(data)
 
 
     def set_window(self, x_start=0, y_start=0, x_end=239, y_end=239):
+        x_start += self.x_offset
+        x_end += self.x_offset
+        y_start += self.y_offset
+        y_end += self.y_offset
         self.write_command(0x2A)
-        self.write_data([0x00, x_start, 0x00, x_end])
+        self.write_data([x_start >> 8, x_start & 0xFF, x_end >> 8, x_end & 0xFF])
         self.write_command(0x2B)
-        self.write_data([0x00, y_start, 0x00, y_end])
+        self.write_data([y_start >> 8, y_start & 0xFF, y_end >> 8, y_end & 0xFF])
         self.write_command(0x2C)
 
 
@@ -97,7 +205,7 @@ class InterfazLCD:
         GPIO.output(self.RST_PIN, GPIO.HIGH)
 
         comandos = [
-            (0x36, [0x00]), (0x3A, [0x05]), (0xB2, [0x0C, 0x0C, 0x00, 0x33, 0x33]),
+            (0x36, [self.madctl]), (0x3A, [0x05]), (0xB2, [0x0C, 0x0C, 0x00, 0x33, 0x33]),
             (0xB7, [0x35]), (0xBB, [0x1F]), (0xC0, [0x2C]), (0xC2, [0x01]),
             (0xC3, [0x12]), (0xC4, [0x20]), (0xC6, [0x0F]), (0xD0, [0xA4, 0xA1]),
             (0xE0, [0xD0, 0x08, 0x11, 0x08, 0x0C, 0x15, 0x39, 0x33, 0x50, 0x36, 0x13, 0x14, 0x29, 0x2D]),
@@ -114,32 +222,98 @@ class InterfazLCD:
 
 
     def display_image(self, image):
+        """
+        Encola la imagen (Image, ruta o funcion que devuelve una Image) para el
+        hilo del display sin bloquear. Devuelve un Future que se completa
+        cuando el frame esta en pantalla.
+        """
         if self.screen_locked:
+            return None
+
+        self.current_image = image  # <--- Guarda imagen base (sin rotar)
+        if self.dark:
+            return None  # se enviara al despertar
+        return self.display.submit(image)
+
+
+    async def display_image_async(self, image):
+        fut = self.display_image(image)
+        if fut is not None:
+            await asyncio.wrap_future(fut)
+
+
+    def _render_frame(self, image):
+        # corre en el hilo del display
+        frame = self._to_frame(image)
+
+        # enviar solo los rectangulos que han cambiado desde el ultimo frame
+        rects = dirty_rects(self.last_frame, frame)
+        self.last_frame = frame
+        for rect in rects:
+            self.write_rect(frame, *rect)
+
+
+    def blit_region(self, x, y, data, key=None):
+        """
+        Envia solo una zona de la pantalla (array RGB565 alto x ancho) sin
+        pasar por el frame completo. Parches con la misma clave se sustituyen.
+        """
+        if self.screen_locked or self.dark:
+            return None
+        return self.display.submit_patch(key or (x, y), (x, y, data))
+
+
+    def _render_patch(self, patch):
+        # corre en el hilo del display
+        x, y, data = patch
+        if self.last_frame is None:
             return
-        
-        if isinstance(image, str):
-            img = Image.open(image)
-        else:
-            img = image
-
-        img = img.rotate(180, expand=False)  #   /// ROTAR PANTALLA /// horizontal: 270
-        img = img.resize((240, 240)).convert("RGB")
-        self.current_image = img.copy()  # <--- Guarda copia
-        img_data = np.array(img, dtype=np.uint16)
-        # check image hash
-        current_hash = zlib.crc32(img.tobytes())
-        if current_hash == self.last_image_hash:
+
+        # mantener last_frame igual a lo que hay en el panel
+        frame = self.last_frame
+        if not any(frame is buf for buf in self._buffers):
+            frame = self._next_buffer()
+            np.copyto(frame, self.last_frame)
+            self.last_frame = frame
+
+        # recortar a la pantalla (como hacia paste): la ultima fila de un menu con titulo se sale por abajo
+        alto = min(data.shape[0], self.height - y)
+        ancho = min(data.shape[1], self.width - x)
+        if alto <= 0 or ancho <= 0:
             return
-        self.last_image_hash = current_hash
+        frame[y:y + alto, x:x + ancho] = data[:alto, :ancho]
+        self.write_rect(frame, x, y, x + ancho - 1, y + alto - 1)
+
+
+    def _to_frame(self, image):
+        """
+        Devuelve el framebuffer RGB565 de una Image, una ruta (desde la cache
+        de assets, sin decodificar), un array ya convertido o una funcion que
+        devuelve cualquiera de ellos.
+        """
+        if callable(image):
+            image = image()
+        if isinstance(image, np.ndarray):
+            return image
+        if isinstance(image, str):
+            return self.assets.get(image)
+
+        # la rotacion la hace el panel (MADCTL), aqui solo se empaqueta
+        frame = self._next_buffer()
+        self.converter.convert(image, frame)
+        return frame
+
+
+    def _next_buffer(self):
+        # doble buffer: se escribe siempre en el que no esta en pantalla
+        a, b = self._buffers
+        return b if self.last_frame is a else a
 
-        r = (img_data[:, :, 0] >> 3) << 11
-        g = (img_data[:, :, 1] >> 2) << 5
-        b = (img_data[:, :, 2] >> 3)
-        img_rgb565 = (r | g | b).astype(np.uint16).byteswap().tobytes()
 
-        self.set_window()
-        for i in range(0, len(img_rgb565), 4096):
-            self.write_data(img_rgb565[i:i + 4096])
+    def write_rect(self, frame, x0, y0, x1, y1):
+        # filas completas son contiguas en memoria: se envian sin copiar
+        self.set_window(x0, y0, x1, y1)
+        self.transport.write(frame[y0:y1 + 1, x0:x1 + 1])
 
 
     def split_text(self, texto, max_length=14):
@@ -150,52 +324,37 @@ class InterfazLCD:
         """
         Dibuja solo el icono de bateria encima de la imagen actual.
         """
-        if self.current_image is None:
-            return  # no hay imagen base para mostrar encima
+        base = self.current_image
+        if base is None or self.screen_locked or self.dark:
+            return None  # no hay imagen base para mostrar encima
 
-        # usa la imagen actual como fondo
-        base = self.current_image.copy()
-        draw = ImageDraw.Draw(base)
+        # se compone en el hilo del display; el diff de teselas envia solo la zona del icono
+        return self.display.submit(lambda: self._battery_frame(base))
 
-        # dibujar el icono encima del fondo actual
-        self.draw_battery_icon(draw)
-
-        # coordenadas icono bateria
-        x, y = 208, 8
-        ancho = 25
-        alto = 13
-
-        # cortar solo el area del icono
-        icon_crop = base.crop((x, y, x + ancho, y + alto))
-
-        icon_crop = icon_crop.rotate(180, expand=False)
-
-        # ajustar coordenadas segun la rotacion
-        x_rotado = 240 - (x + ancho)
-        y_rotado = 240 - (y + alto)
 
-        # convertir a RGB565
-        img_data = np.array(icon_crop, dtype=np.uint16)
-        r = (img_data[:, :, 0] >> 3) << 11
-        g = (img_data[:, :, 1] >> 2) << 5
-        b = (img_data[:, :, 2] >> 3)
-        img_rgb565 = (r | g | b).astype(np.uint16).byteswap().tobytes()
+    def _battery_frame(self, base):
+        frame = self._to_frame(base)
+        if frame is not self._next_buffer():
+            # no tocar assets mapeados ni frames ajenos
+            buf = self._next_buffer()
+            np.copyto(buf, frame)
+            frame = buf
 
-        # dibujar solo esa region en pantalla
-        self.set_window(x_rotado, y_rotado, x_rotado + ancho - 1, y_rotado + alto - 1)
-        self.write_data(img_rgb565)
+        # redibujar el icono sobre la zona correspondiente del framebuffer
+        x, y, ancho, alto = BATTERY_ICON_BOX
+        zona = frame[y:y + alto, x:x + ancho]
+        icono = rgb565_to_image(zona)
+        self.draw_battery_icon(ImageDraw.Draw(icono), 0, 0)
+        zona[:] = to_rgb565(icono)
+        return frame
 
 
-    def draw_battery_icon(self, draw):
-        x, y = 208, 8  # coordenadas icono bateria
+    def draw_battery_icon(self, draw, x=208, y=8):  # coordenadas icono bateria
         ancho = 24
         alto = 12
         borde = 2
         relleno_max = ancho - 6
 
-        nivel = self.get_battery_level()
-        nivel = max(0, min(nivel, 100))
-
         # marco del icono
         draw.rectangle((x, y, x + ancho, y + alto), outline="grey", fill="black")
 
@@ -203,27 +362,23 @@ class InterfazLCD:
         draw.rectangle((x + ancho, y + alto // 4, x + ancho + 2, y + 3 * alto // 4), outline="grey", fill="grey")
 
         # nivel de bateria
-        relleno = (relleno_max * nivel) // 100
+        relleno = self.battery_fill(relleno_max)
         if relleno > 0:
             draw.rectangle((x + 3, y + 3, x + 3 + relleno, y + alto - 3), fill="grey")
 
 
+    def battery_fill(self, relleno_max=18):
+        """Pixeles de relleno del icono para el nivel actual."""
+        nivel = max(0, min(self.get_battery_level(), 100))
+        return (relleno_max * nivel) // 100
+
+
     def get_battery_level(self):
-        now = time.time()
-        if now - getattr(self, "_last_battery_check", 0) > 10:
-            try:
-                self.ultimo_nivel_bateria = self.pisugar.get_battery_level()
-            except:
-                self.ultimo_nivel_bateria = 0
-            self._last_battery_check = now
+        # valor ya muestreado por BatteryMonitor, nunca lee I2C aqui
         return self.ultimo_nivel_bateria
 
 
-    def draw_volume_triangle(self, draw, volume_level):
-
-        # coordenadas base en la pantalla
-        x = 8
-        y = 8
+    def draw_volume_triangle(self, draw, volume_level, x=8, y=8):  # coordenadas base en la pantalla
         height = 14
         width = 8
 
@@ -260,46 +415,18 @@ class InterfazLCD:
 
 
     def draw_text_on_lcd(self, texto, extra_info=None, progreso_barra=None, volume_level=None):
-        font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 19)
+        layout = get_layout(FONT_BOLD, 19)
+        font = layout.font
         img = Image.new("RGB", (240, 240), "black")
         draw = ImageDraw.Draw(img)
 
-        max_width = 220  # 240 - 10 (izquierda) - 10 (derecha)
-        margin_x = 10
-        y = 75
-        line_height = draw.textbbox((0, 0), "A", font=font)[3]
-
-        # romper texto en lineas sin exceder el ancho maximo
-        words = texto.split()
-        lines = []
-        current_line = ""
-        for word in words:
-            prueba_linea = f"{current_line} {word}".strip()
-            bbox = draw.textbbox((0, 0), prueba_linea, font=font)
-            if bbox[2] - bbox[0] <= max_width:
-                current_line = prueba_linea
-            else:
-                lines.append(current_line)
-                current_line = word
-        if current_line:
-            lines.append(current_line)
-
-        for line in lines[:5]:  # máximo 5 lineas
-            bbox = draw.textbbox((0, 0), line, font=font)
-            x = max((240 - (bbox[2] - bbox[0])) // 2, margin_x)
-            draw.text((x, y), line, fill="lightgrey", font=font)
-            y += line_height
+        self.draw_title_block(draw, texto, layout)
 
         if extra_info:
             draw.text((65, 180), extra_info, font=font, fill=(200, 200, 200))
 
         if progreso_barra is not None:
-            ancho_barra = 200
-            altura_barra = 10
-            x_inicio = 20
-            y_inicio = 215
-            draw.rectangle([x_inicio, y_inicio, x_inicio + ancho_barra, y_inicio + altura_barra], outline="lightgrey", width=1)
-            draw.rectangle([x_inicio, y_inicio, x_inicio + progreso_barra, y_inicio + altura_barra], fill=(0, 255, 0))
+            self.draw_progress_bar(draw, progreso_barra)
 
         self.draw_battery_icon(draw)
         if volume_level is not None:
@@ -307,9 +434,29 @@ class InterfazLCD:
         return img
 
 
+    def draw_title_block(self, draw, texto, layout, y=75):
+        max_width = 220  # 240 - 10 (izquierda) - 10 (derecha)
+        margin_x = 10
+
+        # romper texto en lineas sin exceder el ancho maximo
+        lines = layout.wrap(texto, max_width)
+
+        for line in lines[:5]:  # máximo 5 lineas
+            x = max((240 - layout.width(line)) // 2, margin_x)
+            draw.text((x, y), line, fill="lightgrey", font=layout.font)
+            y += layout.line_height
+
+
+    def draw_progress_bar(self, draw, progreso_barra, x_inicio=20, y_inicio=215):
+        ancho_barra = 200
+        altura_barra = 10
+        draw.rectangle([x_inicio, y_inicio, x_inicio + ancho_barra, y_inicio + altura_barra], outline="lightgrey", width=1)
+        draw.rectangle([x_inicio, y_inicio, x_inicio + progreso_barra, y_inicio + altura_barra], fill=(0, 255, 0))
+
+
     # render nostr dm preview 
     def draw_chat_on_lcd(self, texto):
-        font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 18)
+        layout = get_layout(FONT_BOLD, 18)
 
         img = Image.new("RGB", (240, 240), "black")
         draw = ImageDraw.Draw(img)
@@ -317,33 +464,17 @@ class InterfazLCD:
         max_width = 220
         margin_x = 10
         y = 40
-        line_height = draw.textbbox((0, 0), "A", font=font)[3] + 2
+        line_height = layout.line_height + 2
 
         lines = []
 
-        
         for paragraph in texto.split("\n"):
-            words = paragraph.split()
-            current_line = ""
-
-            for word in words:
-                test_line = f"{current_line} {word}".strip()
-                bbox = draw.textbbox((0, 0), test_line, font=font)
-
-                if bbox[2] - bbox[0] <= max_width:
-                    current_line = test_line
-                else:
-                    lines.append(current_line)
-                    current_line = word
-
-            if current_line:
-                lines.append(current_line)
-
+            lines.extend(layout.wrap(paragraph, max_width))
             lines.append("")
 
         # alineado a la izquierda
         for line in lines[:10]:
-            draw.text((margin_x, y), line, fill="lightgrey", font=font)
+            draw.text((margin_x, y), line, fill="lightgrey", font=layout.font)
             y += line_height
 
         self.draw_battery_icon(draw)
@@ -353,9 +484,8 @@ class InterfazLCD:
 
     # render chat messages
     def draw_chat_feed(self, blocks, scroll_offset):
-        font = ImageFont.truetype(
-            "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 16
-        )
+        layout = get_layout(FONT_BOLD, 16)
+        font = layout.font
 
         img = Image.new("RGB", (240, 240), "black")
         draw = ImageDraw.Draw(img)
@@ -363,7 +493,7 @@ class InterfazLCD:
         max_width = 200
         margin_x = 10
         y = 30
-        line_height = draw.textbbox((0, 0), "A", font=font)[3] + 2
+        line_height = layout.line_height + 2
         spacing = 6
 
         y_cursor = 0
@@ -397,11 +527,7 @@ class InterfazLCD:
 
 
     def get_chat_viewport(self):
-        font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 18)
-        dummy_img = Image.new("RGB", (240, 240))
-        draw = ImageDraw.Draw(dummy_img)
-
-        line_height = draw.textbbox((0, 0), "A", font=font)[3] + 2
+        line_height = get_layout(FONT_BOLD, 18).line_height + 2
 
         y_start = 30
         available_height = 240 - y_start
@@ -410,11 +536,7 @@ class InterfazLCD:
 
 
     def build_chat_blocks(self, mensajes, name):
-        font = ImageFont.truetype(
-            "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 17
-        )
-        dummy = Image.new("RGB", (240, 240))
-        draw = ImageDraw.Draw(dummy)
+        layout = get_layout(FONT_BOLD, 17)
 
         max_width = 200
 
@@ -426,23 +548,8 @@ class InterfazLCD:
             blocks.append(("name", sender))
 
             for paragraph in msg["text"].split("\n"):
-
-                words = paragraph.split()
-                current = ""
-
-                for w in words:
-                    test = f"{current} {w}".strip()
-                    bbox = draw.textbbox((0, 0), test, font=font)
-
-                    if bbox[2] - bbox[0] <= max_width:
-                        current = test
-                    else:
-                        if current:
-                            blocks.append(("text", current))
-                        current = w
-
-                if current:
-                    blocks.append(("text", current))
+                for line in layout.wrap(paragraph, max_width, keep_empty=False):
+                    blocks.append(("text", line))
 
             blocks.append(("space", ""))
 
@@ -461,31 +568,24 @@ class InterfazLCD:
         return max(0, total - viewport_lines)
 
 
-    def display_mp3_info(self, titulo, tiempo_actual, duracion, volume_level=None):
-        titulo = titulo.replace('_', ' ').replace('-', ' ')
-
-        key = (int(tiempo_actual), titulo, int(duracion), int(volume_level or 0))
-        if key == getattr(self, "_last_mp3_key", None):
-            return
-        self._last_mp3_key = key
-
-        lineas_titulo = self.split_text(titulo, max_length=17)
-        titulo_procesado = "\n".join(lineas_titulo[:4])
-
-        tiempo_str = f"{int(tiempo_actual // 60)}:{int(tiempo_actual % 60):02d}"
-        duracion_str = f"{int(duracion // 60)}:{int(duracion % 60):02d}"
-        extra_info = f"{tiempo_str} / {duracion_str}"
+    def display_mp3_info(self, titulo, tiempo_actual, duracion, volume_level=None, force=False):
+        """
+        Pantalla de reproduccion por capas: solo se redibujan y envian las
+        capas (tiempo, barra, volumen, bateria) que han cambiado.
+        force vuelve a enviar el frame aunque no haya cambios (al salir de un menu).
+        """
+        if self.dark:
+            return  # al despertar se repinta con force
 
-        progreso = int((tiempo_actual / duracion) * 200) if duracion > 0 else 0
-        img = self.draw_text_on_lcd(titulo, extra_info, progreso, volume_level)
-        self.display_image(img)
+        frame = self.now_playing.update(titulo, tiempo_actual, duracion, volume_level, force=force)
+        if frame is not None:
+            self.now_playing.sent(frame, self.display_image(frame))
 
 
     def create_mp3_snapshot(self, titulo, tiempo_actual, duracion, volume_level=None):
         """
         Devuelve un Image de la pantalla MP3 sin mostrarlo.
         """
-        titulo = titulo.replace('_', ' ').replace('-', ' ')
         tiempo_str = f"{int(tiempo_actual // 60)}:{int(tiempo_actual % 60):02d}"
         duracion_str = f"{int(duracion // 60)}:{int(duracion % 60):02d}"
         extra_info = f"{tiempo_str} / {duracion_str}"
@@ -506,155 +606,85 @@ class InterfazLCD:
         max_items_pantalla = height // 20 - (1 if titulo else 0)
         max_width = width - 10
 
-        try:
-            fuente = ImageFont.truetype("DejaVuSans.ttf", 17)
-        except IOError:
-            fuente = ImageFont.load_default()
-
-        # cache de ancho de texto
-        if not hasattr(self, "_text_width_cache"):
-            self._text_width_cache = {}
-
-        last_index = -1
-        last_render_time = 0
-
-        scroll_delay = 0.01
-        scroll_offset = 0
-        scroll_done = False
-        scroll_image = None
-        scroll_start_time = 0
+        layout = get_layout(FONT_MENU, 17)
+        fuente = layout.font
 
         primer_visible = max(0, seleccion_index - max_items_pantalla + 1)
+        visibles = tuple(opciones[primer_visible:primer_visible + max_items_pantalla])
+        y_inicio = 23 if titulo else 0
 
-        while True:
-
-            ahora = time.time()
-
-            redibujar = (
-                seleccion_index != last_index
-                or ahora - last_render_time > scroll_delay
-            )
-
-            if redibujar:
-
-                imagen = Image.new("RGB", (width, height), "black")
-                draw = ImageDraw.Draw(imagen)
-
-                y = 0
-
-                if titulo:
-                    draw.text((5, y), titulo[:width // 10], font=fuente, fill="white")
-                    y += 23
-
-                scroll_needed = False
-
-                for i in range(
-                    primer_visible,
-                    min(primer_visible + max_items_pantalla, len(opciones))
-                ):
-
-                    opcion = opciones[i]
-
-                    # obtener ancho desde cache
-                    if opcion not in self._text_width_cache:
-                        bbox = draw.textbbox((0, 0), opcion, font=fuente)
-                        self._text_width_cache[opcion] = bbox[2] - bbox[0]
-
-                    texto_ancho = self._text_width_cache[opcion]
-
-                    if i == seleccion_index:
-
-                        draw.rectangle([(0, y), (width, y + 20)], fill="lightgray")
+        seleccionada = seleccion_index - primer_visible
+        fila_scroll = None
+        if 0 <= seleccionada < len(visibles):
+            texto_ancho = layout.width(visibles[seleccionada])
+            if texto_ancho > max_width:
+                fila_scroll = (y_inicio + seleccionada * 20, visibles[seleccionada], texto_ancho)
 
-                        if texto_ancho > max_width:
+        # pagina ya convertida a RGB565: va directa al SPI
+        key = (titulo, visibles, seleccionada, FONT_MENU, 17)
+        frame = self.menu_cache.get(key)
 
-                            scroll_needed = True
+        if frame is None:
+            imagen = Image.new("RGB", (width, height), "black")
+            draw = ImageDraw.Draw(imagen)
 
-                            # reiniciar scroll si cambia seleccion
-                            if seleccion_index != last_index:
-                                scroll_offset = 0
-                                scroll_done = False
-                                scroll_image = None
-                                scroll_start_time = ahora
+            y = 0
 
-                            # crear imagen scroll tras una pausa
-                            if scroll_image is None and ahora - scroll_start_time > 0.25:
+            if titulo:
+                draw.text((5, y), titulo[:width // 10], font=fuente, fill="white")
+                y += 23
 
-                                scroll_image = Image.new(
-                                    "RGB",
-                                    (texto_ancho + 20, 20),
-                                    "lightgray"
-                                )
+            for i, opcion in enumerate(visibles):
 
-                                scroll_draw = ImageDraw.Draw(scroll_image)
-                                scroll_draw.text((0, 0), opcion, font=fuente, fill="black")
+                if i == seleccionada:
 
-                            if scroll_image:
+                    draw.rectangle([(0, y), (width, y + 20)], fill="lightgray")
+                    draw.text((5, y), opcion, font=fuente, fill="black")
 
-                                if not scroll_done:
-
-                                    scroll_offset += 4  # velocidad scroll
-
-                                    if scroll_offset >= texto_ancho - max_width:
-                                        scroll_offset = texto_ancho - max_width
-                                        scroll_done = True
-
-                                visible = scroll_image.crop(
-                                    (scroll_offset, 0, scroll_offset + max_width, 20)
-                                )
-
-                                imagen.paste(visible, (5, y))
-
-                            else:
-                                draw.text((5, y), opcion, font=fuente, fill="black")
-
-                        else:
-
-                            draw.text((5, y), opcion, font=fuente, fill="black")
-
-                            scroll_image = None
-                            scroll_offset = 0
-                            scroll_done = True
-
-                    else:
-
-                        # truncar texto largo
-                        if texto_ancho > max_width:
-
-                            truncado = opcion
-
-                            for j in range(len(opcion), 0, -1):
+                else:
 
-                                test = opcion[:j] + "..."
+                    # truncar texto largo
+                    if layout.width(opcion) > max_width:
+                        opcion = layout.truncate(opcion, max_width)
 
-                                if test not in self._text_width_cache:
-                                    bbox = draw.textbbox((0, 0), test, font=fuente)
-                                    self._text_width_cache[test] = bbox[2] - bbox[0]
+                    draw.text((5, y), opcion, font=fuente, fill="white")
 
-                                if self._text_width_cache[test] <= max_width:
-                                    truncado = test
-                                    break
+                y += 20
 
-                            opcion = truncado
+            frame = self.menu_converter.convert(imagen, self.menu_converter.new_buffer())
+            self.menu_cache.put(key, frame)
 
-                        draw.text((5, y), opcion, font=fuente, fill="white")
+        # el menu estatico se envia una sola vez
+        self.display_image(frame)
 
-                    y += 20
+        if fila_scroll is None:
+            return
 
-                self.display_image(imagen)
+        # scroll horizontal: la etiqueta se dibuja y convierte una vez en una
+        # tira y luego solo se envia la ventana visible de esa fila
+        y, opcion, texto_ancho = fila_scroll
+        await asyncio.sleep(MENU_SCROLL_PAUSE)
 
-                last_index = seleccion_index
-                last_render_time = ahora
+        tira = Image.new("RGB", (texto_ancho + 20, 20), "lightgray")
+        ImageDraw.Draw(tira).text((0, 0), opcion, font=fuente, fill="black")
+        tira = to_rgb565(tira)
 
-            if not scroll_needed or scroll_done:
-                break
+        recorrido = texto_ancho - max_width
+        scroll_offset = 0
 
-            await asyncio.sleep(scroll_delay)
+        while scroll_offset < recorrido:
+            scroll_offset = min(scroll_offset + MENU_SCROLL_STEP, recorrido)
+            self.blit_region(5, y, tira[:, scroll_offset:scroll_offset + max_width], key="menu-scroll")
+            await asyncio.sleep(1 / MENU_SCROLL_FPS)
 
 
     def limpiar_lcd(self):
-        self.set_window()
-        data = b'\x00\x00' * (240 * 240)
-        for i in range(0, len(data), 4096):
-            self.write_data(data[i:i + 4096])
+        self.current_image = None
+        return self.display.call(self._limpiar_panel)
+
 
+    def _limpiar_panel(self):
+        frame = self._next_buffer()
+        frame.fill(0)
+        self.write_rect(frame, 0, 0, self.width - 1, self.height - 1)
+        self.last_frame = frame
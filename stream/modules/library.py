@@ -0,0 +1,486 @@
+import os
+import sqlite3
+import threading
+from array import array
+from collections import defaultdict, namedtuple
+from urllib.parse import unquote
+
+from modules import paths
+
+
+LIBRARY_DB = os.path.join(paths.CACHE_DIR, "library.sqlite3")
+
+FORMATOS_VALIDOS = (
+    ".mp3", ".flac", ".ogg", ".wav", ".aac", ".m4a", ".aiff", ".aif",  # audio
+    ".mp4", ".mkv", ".avi", ".mov", ".webm", ".flv"                       # video
+)
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    path   TEXT PRIMARY KEY,
+    parent TEXT,
+    mtime  INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    path  TEXT PRIMARY KEY,
+    dir   TEXT NOT NULL,
+    mtime INTEGER NOT NULL,
+    size  INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS playlists (
+    id    INTEGER PRIMARY KEY,
+    path  TEXT UNIQUE NOT NULL,
+    dir   TEXT NOT NULL,
+    kind  TEXT NOT NULL,            -- 'm3u' o 'dir' (carpeta sin .m3u)
+    mtime INTEGER NOT NULL,
+    size  INTEGER NOT NULL,
+    track_count INTEGER NOT NULL DEFAULT 0,
+    duration    REAL               -- suma de los #EXTINF, si los hay
+);
+CREATE TABLE IF NOT EXISTS tracks (
+    playlist_id INTEGER NOT NULL REFERENCES playlists(id) ON DELETE CASCADE,
+    pos         INTEGER NOT NULL,
+    path        TEXT NOT NULL,
+    PRIMARY KEY (playlist_id, pos)
+);
+CREATE INDEX IF NOT EXISTS dirs_parent ON dirs(parent);
+CREATE INDEX IF NOT EXISTS files_dir ON files(dir);
+CREATE INDEX IF NOT EXISTS playlists_dir ON playlists(dir);
+"""
+VERSION = 1
+
+# lo que necesita el menu de playlists, sin las pistas
+PlaylistHeader = namedtuple("PlaylistHeader", "path name count duration")
+
+
+def nombre_playlist(path):
+    """Nombre en el menu: la carpeta de la playlist."""
+    return os.path.basename(os.path.dirname(path))
+
+
+def parse_m3u(m3u_path):
+    """Rutas de las pistas de un .m3u (relativas al propio fichero)."""
+    return leer_m3u(m3u_path)[0]
+
+
+def leer_m3u(m3u_path):
+    """Pistas de un .m3u y la suma de sus #EXTINF (None si alguna no lo tiene)."""
+    pistas = []
+    duracion, sin_duracion = 0.0, False
+    pendiente = None  # duracion del ultimo #EXTINF, para la pista que le sigue
+    base = os.path.dirname(m3u_path)
+    with open(m3u_path, "r", errors="replace") as m3u_file:
+        for line in m3u_file:
+            line = line.strip()
+            if line.startswith("#EXTINF:"):
+                try:
+                    pendiente = float(line[8:].split(",", 1)[0].split()[0])
+                except (ValueError, IndexError):
+                    pendiente = None
+            elif line and not line.startswith("#"):
+                path = os.path.join(base, line) if not os.path.isabs(line) else line
+                pistas.append(unquote(path))
+                if pendiente is None or pendiente < 0:
+                    sin_duracion = True
+                else:
+                    duracion += pendiente
+                pendiente = None
+    return pistas, (None if sin_duracion or not pistas else duracion)
+
+
+def abrir_db(db_path, conectar):
+    """
+    Abre una base SQLite con `conectar()`. La marca "<db>.open" existe
+    mientras esta abierta: si esta al arrancar, el proceso anterior no la
+    cerro y solo entonces se comprueba la integridad. Una base corrupta se
+    borra (con su WAL) y se crea vacia.
+    """
+    if db_path == ":memory:":
+        return conectar()
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    marca = db_path + ".open"
+    db = None
+    try:
+        db = conectar()
+        if os.path.exists(marca) and db.execute("PRAGMA quick_check").fetchone()[0] != "ok":
+            raise sqlite3.DatabaseError("quick_check")
+    except sqlite3.DatabaseError:
+        if db is not None:
+            db.close()
+        for sufijo in ("", "-wal", "-shm"):
+            try:
+                os.remove(db_path + sufijo)
+            except FileNotFoundError:
+                pass
+        db = conectar()
+    open(marca, "w").close()
+    return db
+
+
+def cerrar_db(db, db_path):
+    """Cierra una base abierta con abrir_db y quita su marca."""
+    db.close()
+    if db_path != ":memory:":
+        try:
+            os.remove(db_path + ".open")
+        except FileNotFoundError:
+            pass
+
+
+class LibraryIndex:
+    """
+    Indice de la biblioteca de musica en SQLite.
+
+    Guarda carpetas, playlists y pistas con su mtime y tamaño. rescan() solo
+    lista las carpetas cuyo mtime ha cambiado y solo vuelve a leer los .m3u
+    que han cambiado; en el resto se limita a un stat. Hay una playlist por
+    .m3u, o una por carpeta con audio y sin .m3u, igual que en el antiguo
+    load_playlists.
+
+    headers() da lo que necesita el menu (nombre, numero de pistas y
+    duracion) sin tocar la tabla de pistas; las pistas de una playlist se
+    piden con tracks() al abrirla. playlists() lo devuelve todo junto.
+    """
+
+    def __init__(self, root, db_path=LIBRARY_DB):
+        self.root = os.path.abspath(root)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._db = self._open()
+
+        # resultado y contadores del ultimo rescan
+        self.changed = set()  # rutas de playlists nuevas, cambiadas o borradas
+        self.dirs_listed = 0
+        self.playlists_parsed = 0
+
+
+    def _open(self):
+        # si estaba corrupto se reconstruye en el siguiente rescan
+        return abrir_db(self.db_path, self._connect)
+
+
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, check_same_thread=False)
+        db.execute("PRAGMA foreign_keys = ON")
+        db.execute("PRAGMA journal_mode = WAL")
+        db.execute("PRAGMA synchronous = NORMAL")
+        db.executescript(ESQUEMA)
+        if db.execute("PRAGMA user_version").fetchone()[0] < VERSION:
+            self._migrar(db)
+        return db
+
+
+    def _migrar(self, db):
+        # indices de antes de las cabeceras: sin track_count ni duration
+        columnas = {fila[1] for fila in db.execute("PRAGMA table_info(playlists)")}
+        with db:
+            if "track_count" not in columnas:
+                db.execute("ALTER TABLE playlists ADD COLUMN track_count INTEGER NOT NULL DEFAULT 0")
+                db.execute(
+                    "UPDATE playlists SET track_count = "
+                    "(SELECT COUNT(*) FROM tracks WHERE playlist_id = playlists.id)"
+                )
+            if "duration" not in columnas:
+                db.execute("ALTER TABLE playlists ADD COLUMN duration REAL")
+            db.execute(f"PRAGMA user_version = {VERSION}")
+
+
+    def close(self):
+        with self._lock:
+            cerrar_db(self._db, self.db_path)
+
+
+    def is_empty(self):
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM dirs LIMIT 1").fetchone() is None
+
+
+    def directories(self):
+        with self._lock:
+            return [path for (path,) in self._db.execute("SELECT path FROM dirs")]
+
+
+    def files(self):
+        """Ficheros de audio como (ruta, mtime, size), los mas nuevos primero."""
+        with self._lock:
+            return self._db.execute("SELECT path, mtime, size FROM files ORDER BY mtime DESC").fetchall()
+
+
+    def tracks(self, path, tabla=None):
+        """Pistas de una playlist, o None si ya no existe. Con `tabla` (TrackTable), sus ids."""
+        with self._lock:
+            fila = self._db.execute("SELECT id FROM playlists WHERE path = ?", (path,)).fetchone()
+            if fila is None:
+                return None
+            filas = self._db.execute("SELECT path FROM tracks WHERE playlist_id = ? ORDER BY pos", fila)
+            if tabla is not None:
+                return tabla.ids(pista for (pista,) in filas)
+            return [pista for (pista,) in filas]
+
+
+    def headers(self):
+        """Cabeceras de las playlists en el orden de los menus, sin leer ninguna pista."""
+        with self._lock:
+            filas = self._db.execute(
+                "SELECT path, track_count, duration FROM playlists WHERE track_count > 0 ORDER BY dir, path"
+            ).fetchall()
+        return [PlaylistHeader(path, nombre_playlist(path), n, duracion) for path, n, duracion in filas]
+
+
+    def header(self, path):
+        with self._lock:
+            fila = self._db.execute(
+                "SELECT track_count, duration FROM playlists WHERE path = ? AND track_count > 0", (path,)
+            ).fetchone()
+        return PlaylistHeader(path, nombre_playlist(path), *fila) if fila else None
+
+
+    def playlists(self, tabla=None):
+        """
+        Lista de (ruta, pistas) en el orden de los menus. Con `tabla`
+        (TrackTable) las pistas son un array de ids en lugar de rutas.
+        """
+        resultado = []
+        actual = None
+        with self._lock:
+            # fila a fila, sin tener todas las rutas en memoria a la vez
+            for playlist_id, ruta, pista in self._db.execute(
+                "SELECT p.id, p.path, t.path FROM playlists p JOIN tracks t ON t.playlist_id = p.id "
+                "ORDER BY p.dir, p.path, t.pos"
+            ):
+                if playlist_id != actual:
+                    actual = playlist_id
+                    pistas = array("i") if tabla is not None else []
+                    resultado.append((ruta, pistas))
+                pistas.append(tabla.id(pista) if tabla is not None else pista)
+        if tabla is not None:
+            tabla.compactar()
+        return resultado
+
+
+    # --- rescan ---
+
+    def rescan(self, carpetas=None):
+        """
+        Pone el indice al dia con el disco y devuelve el conjunto de rutas de
+        playlists que han cambiado (vacio si nada). Con `carpetas` (las que
+        ha visto cambiar el watcher) solo lista esas y lo nuevo o cambiado
+        que cuelgue de ellas.
+        """
+        self.changed = set()
+        self.dirs_listed = 0
+        self.playlists_parsed = 0
+        with self._lock, self._db:
+            if carpetas is None:
+                self._rescan_todo()
+            else:
+                self._rescan_carpetas(carpetas)
+        return self.changed
+
+
+    def _rescan_todo(self):
+        db = self._db
+        conocidos = dict(db.execute("SELECT path, mtime FROM dirs"))
+        hijos = defaultdict(list)
+        for path, parent in db.execute("SELECT path, parent FROM dirs"):
+            hijos[parent].append(path)
+
+        vistos = set()
+        pendientes = [self.root]
+        while pendientes:
+            carpeta = pendientes.pop()
+            try:
+                mtime = os.stat(carpeta).st_mtime_ns
+            except OSError:
+                continue
+            vistos.add(carpeta)
+
+            if conocidos.get(carpeta) == mtime:
+                # mismas entradas: basta con mirar si se ha editado algun .m3u
+                # o reescrito algun audio en su sitio (retag), que no cambia la carpeta
+                self._revisar_m3u(carpeta)
+                self._revisar_audio(carpeta)
+                pendientes.extend(hijos[carpeta])
+            else:
+                pendientes.extend(self._leer_carpeta(carpeta, mtime))
+
+        for carpeta in set(conocidos) - vistos:
+            self._olvidar_carpeta(carpeta)
+
+
+    def _rescan_carpetas(self, carpetas):
+        conocidos = dict(self._db.execute("SELECT path, mtime FROM dirs"))
+        vistos = set()
+        pendientes = list(carpetas)
+        while pendientes:
+            carpeta = pendientes.pop()
+            if carpeta in vistos or not (carpeta == self.root or carpeta.startswith(self.root + os.sep)):
+                continue
+            vistos.add(carpeta)
+            try:
+                mtime = os.stat(carpeta).st_mtime_ns
+            except OSError:
+                if carpeta in conocidos:
+                    self._olvidar_carpeta(carpeta)
+                continue
+            # las subcarpetas que no han cambiado no se vuelven a recorrer
+            if carpeta in carpetas or conocidos.get(carpeta) != mtime:
+                pendientes.extend(self._leer_carpeta(carpeta, mtime))
+
+
+    def _leer_carpeta(self, carpeta, mtime):
+        """Lista una carpeta nueva o cambiada y actualiza sus filas. Devuelve sus subcarpetas."""
+        db = self._db
+        self.dirs_listed += 1
+
+        subcarpetas, audio, m3us = [], [], []
+        try:
+            with os.scandir(carpeta) as entradas:
+                for e in entradas:
+                    try:
+                        if e.is_dir(follow_symlinks=False):
+                            subcarpetas.append(e.path)
+                        elif e.is_file():
+                            nombre = e.name.lower()
+                            if nombre.endswith(FORMATOS_VALIDOS):
+                                audio.append((e.name, e.path, e.stat()))
+                            elif nombre.endswith(".m3u"):
+                                m3us.append((e.path, e.stat()))
+                    except OSError:
+                        continue
+        except OSError:
+            return []
+
+        parent = os.path.dirname(carpeta) if carpeta != self.root else None
+        db.execute(
+            "INSERT INTO dirs(path, parent, mtime) VALUES (?, ?, ?) "
+            "ON CONFLICT(path) DO UPDATE SET parent = excluded.parent, mtime = excluded.mtime",
+            (carpeta, parent, mtime),
+        )
+        db.execute("DELETE FROM files WHERE dir = ?", (carpeta,))
+        db.executemany(
+            "INSERT OR REPLACE INTO files(path, dir, mtime, size) VALUES (?, ?, ?, ?)",
+            [(path, carpeta, st.st_mtime_ns, st.st_size) for _, path, st in audio],
+        )
+
+        previas = {
+            path: (mtime, size)
+            for path, mtime, size in db.execute(
+                "SELECT path, mtime, size FROM playlists WHERE dir = ?", (carpeta,)
+            )
+        }
+        actuales = set()
+
+        if m3us:
+            for path, st in m3us:
+                actuales.add(path)
+                if previas.get(path) != (st.st_mtime_ns, st.st_size):
+                    self._guardar_m3u(carpeta, path, st)
+        elif audio:
+            # carpeta sin .m3u: sus ficheros de audio por orden de nombre
+            path = os.path.join(carpeta, "")
+            actuales.add(path)
+            pistas = [p for _, p, _ in sorted(audio)]
+            self._guardar_playlist(path, carpeta, "dir", mtime, 0, pistas)
+
+        for path in set(previas) - actuales:
+            self._borrar_playlist(path)
+
+        # solo se bajara a las subcarpetas nuevas o cambiadas
+        conocidas = {
+            path for (path,) in db.execute("SELECT path FROM dirs WHERE parent = ?", (carpeta,))
+        }
+        for vieja in conocidas - set(subcarpetas):
+            self._olvidar_carpeta(vieja)
+        return subcarpetas
+
+
+    def _revisar_m3u(self, carpeta):
+        filas = self._db.execute(
+            "SELECT path, mtime, size FROM playlists WHERE dir = ? AND kind = 'm3u'", (carpeta,)
+        ).fetchall()
+        for path, mtime, size in filas:
+            try:
+                st = os.stat(path)
+            except OSError:
+                self._borrar_playlist(path)
+                continue
+            if (st.st_mtime_ns, st.st_size) != (mtime, size):
+                self._guardar_m3u(carpeta, path, st)
+
+
+    def _revisar_audio(self, carpeta):
+        # las filas de files son la firma con la que la cache de tags decide que reextraer
+        db = self._db
+        cambiados, borrados = [], []
+        for path, mtime, size in db.execute("SELECT path, mtime, size FROM files WHERE dir = ?", (carpeta,)).fetchall():
+            try:
+                st = os.stat(path)
+            except OSError:
+                borrados.append((path,))
+                continue
+            if (st.st_mtime_ns, st.st_size) != (mtime, size):
+                cambiados.append((st.st_mtime_ns, st.st_size, path))
+        if cambiados:
+            db.executemany("UPDATE files SET mtime = ?, size = ? WHERE path = ?", cambiados)
+        if borrados:
+            db.executemany("DELETE FROM files WHERE path = ?", borrados)
+
+
+    def _guardar_m3u(self, carpeta, path, st):
+        try:
+            pistas, duracion = leer_m3u(path)
+        except OSError:
+            pistas, duracion = [], None
+        self.playlists_parsed += 1
+        if pistas:
+            self._guardar_playlist(path, carpeta, "m3u", st.st_mtime_ns, st.st_size, pistas, duracion)
+        else:
+            self._borrar_playlist(path)
+
+
+    def _borrar_playlist(self, path):
+        if self._db.execute("DELETE FROM playlists WHERE path = ?", (path,)).rowcount:
+            self.changed.add(path)
+
+
+    def _guardar_playlist(self, path, carpeta, kind, mtime, size, pistas, duracion=None):
+        db = self._db
+        anterior = db.execute("SELECT duration FROM playlists WHERE path = ?", (path,)).fetchone()
+        db.execute(
+            "INSERT INTO playlists(path, dir, kind, mtime, size, track_count, duration) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(path) DO UPDATE SET dir = excluded.dir, kind = excluded.kind, "
+            "mtime = excluded.mtime, size = excluded.size, "
+            "track_count = excluded.track_count, duration = excluded.duration",
+            (path, carpeta, kind, mtime, size, len(pistas), duracion),
+        )
+        (playlist_id,) = db.execute("SELECT id FROM playlists WHERE path = ?", (path,)).fetchone()
+        previas = [p for (p,) in db.execute(
+            "SELECT path FROM tracks WHERE playlist_id = ? ORDER BY pos", (playlist_id,)
+        )]
+        if previas == pistas and anterior == (duracion,):
+            return
+        self.changed.add(path)
+        if previas == pistas:
+            return  # solo ha cambiado la cabecera
+        db.execute("DELETE FROM tracks WHERE playlist_id = ?", (playlist_id,))
+        db.executemany(
+            "INSERT INTO tracks(playlist_id, pos, path) VALUES (?, ?, ?)",
+            [(playlist_id, pos, pista) for pos, pista in enumerate(pistas)],
+        )
+
+
+    def _olvidar_carpeta(self, carpeta):
+        """Borra una carpeta desaparecida y todo lo que colgaba de ella."""
+        db = self._db
+        pendientes = [carpeta]
+        while pendientes:
+            actual = pendientes.pop()
+            pendientes.extend(
+                path for (path,) in db.execute("SELECT path FROM dirs WHERE parent = ?", (actual,))
+            )
+            for (path,) in db.execute("SELECT path FROM playlists WHERE dir = ?", (actual,)).fetchall():
+                self._borrar_playlist(path)
+            db.execute("DELETE FROM files WHERE dir = ?", (actual,))
+            db.execute("DELETE FROM dirs WHERE path = ?", (actual,))
@@ -0,0 +1,236 @@
+import asyncio
+import ctypes
+import ctypes.util
+import errno
+import os
+import struct
+import time
+
+
+# constantes de <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# IN_MODIFY no: una subida genera uno por bloque; basta con IN_CLOSE_WRITE al terminar
+MASCARA = (
+    IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+)
+
+EVENTO = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+def _libc():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+    except (OSError, AttributeError):
+        return None
+    libc.inotify_add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+    libc.inotify_rm_watch.argtypes = (ctypes.c_int, ctypes.c_int)
+    return libc
+
+
+class LibraryWatcher:
+    """
+    Vigila la biblioteca con inotify (via ctypes) desde el loop, sin hilos ni
+    sondeo: el descriptor se registra con loop.add_reader y en reposo no
+    cuesta nada.
+
+    inotify no es recursivo, asi que hay un watch por carpeta; las carpetas
+    que se crean o se mueven dentro reciben el suyo al vuelo. Los eventos se
+    agrupan en un conjunto de carpetas tocadas y se entregan juntos a
+    `on_change(carpetas)` (corutina) cuando pasan `delay` segundos sin
+    eventos, o como mucho `max_delay` despues del primero. Si la cola del
+    kernel se desborda se pide un rescan completo (carpetas=None).
+    """
+
+    def __init__(self, root, on_change, delay=0.25, max_delay=1.0):
+        self.root = os.path.abspath(root)
+        self.on_change = on_change
+        self.delay = delay
+        self.max_delay = max_delay
+        self.loop = None
+
+        self._libc = _libc()
+        self.available = self._libc is not None
+        self._fd = -1
+        self._watches = {}  # wd -> carpeta
+        self._wds = {}      # carpeta -> wd
+
+        self._pendientes = set()
+        self._todo = False        # rescan completo pendiente
+        self._primero = None      # instante del primer evento sin entregar
+        self._temporizador = None
+        self._entrega = None      # tarea de on_change en curso
+        self._esperando = False   # hay otra tanda esperando a que acabe la actual
+
+        # contadores
+        self.events = 0
+        self.flushes = 0
+
+
+    def start(self, loop, carpetas=()):
+        """Empieza a vigilar `root` y `carpetas` (las que ya conoce el indice)."""
+        if not self.available:
+            return False
+        self.loop = loop
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            self.available = False
+            return False
+
+        self._vigilar(self.root)
+        for carpeta in carpetas:
+            self._vigilar(carpeta)
+        loop.add_reader(self._fd, self._leer)
+        return True
+
+
+    def close(self):
+        if self._temporizador:
+            self._temporizador.cancel()
+            self._temporizador = None
+        if self._fd >= 0:
+            if self.loop is not None and not self.loop.is_closed():
+                self.loop.remove_reader(self._fd)
+            os.close(self._fd)  # el kernel quita todos los watches
+            self._fd = -1
+        # _watches y _wds se conservan (sin fd ya no se usan) para las estadisticas
+
+
+    @property
+    def watches(self):
+        return len(self._watches)
+
+
+    # --- watches ---
+
+    def _vigilar(self, carpeta):
+        if carpeta in self._wds:
+            return
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(carpeta), MASCARA)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                print("LibraryWatcher: sin watches libres (fs.inotify.max_user_watches)")
+            return
+        self._watches[wd] = carpeta
+        self._wds[carpeta] = wd
+
+
+    def _vigilar_arbol(self, carpeta):
+        """Watch para una carpeta nueva y todo lo que ya tenga dentro."""
+        for raiz, _, _ in os.walk(carpeta):
+            self._vigilar(raiz)
+
+
+    def _olvidar_arbol(self, carpeta):
+        # la carpeta se ha movido fuera: sus watches siguen al inodo, no a la ruta
+        prefijo = carpeta + os.sep
+        for ruta in [r for r in self._wds if r == carpeta or r.startswith(prefijo)]:
+            wd = self._wds.pop(ruta)
+            self._watches.pop(wd, None)
+            self._libc.inotify_rm_watch(self._fd, wd)
+
+
+    # --- eventos (en el loop) ---
+
+    def _leer(self):
+        try:
+            datos = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        except OSError:
+            return
+
+        offset = 0
+        while offset + EVENTO.size <= len(datos):
+            wd, mask, _cookie, longitud = EVENTO.unpack_from(datos, offset)
+            nombre = datos[offset + EVENTO.size:offset + EVENTO.size + longitud].rstrip(b"\0")
+            offset += EVENTO.size + longitud
+            self.events += 1
+            self._evento(wd, mask, os.fsdecode(nombre))
+        self._programar()
+
+
+    def _evento(self, wd, mask, nombre):
+        if mask & IN_Q_OVERFLOW:
+            self._todo = True
+            return
+
+        carpeta = self._watches.get(wd)
+        if carpeta is None:
+            return
+        if mask & IN_IGNORED:
+            del self._watches[wd]
+            if self._wds.get(carpeta) == wd:
+                del self._wds[carpeta]
+            return
+        if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+            # ya llegara el evento de la carpeta padre
+            return
+
+        # la carpeta que contiene la entrada ha cambiado
+        self._pendientes.add(carpeta)
+        if mask & IN_ISDIR and nombre:
+            ruta = os.path.join(carpeta, nombre)
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                self._vigilar_arbol(ruta)
+                self._pendientes.add(ruta)
+            elif mask & IN_MOVED_FROM:
+                self._olvidar_arbol(ruta)
+                self._pendientes.add(ruta)
+
+
+    def _programar(self):
+        if not (self._pendientes or self._todo):
+            return
+        ahora = time.monotonic()
+        if self._primero is None:
+            self._primero = ahora
+        espera = min(self.delay, max(0.0, self._primero + self.max_delay - ahora))
+        if self._temporizador:
+            self._temporizador.cancel()
+        self._temporizador = self.loop.call_later(espera, self._vencido)
+
+
+    def _vencido(self):
+        self._temporizador = None
+        if not (self._pendientes or self._todo):
+            return
+        if self._entrega is not None and not self._entrega.done():
+            # aun se esta aplicando la tanda anterior: esta sale cuando acabe
+            if not self._esperando:
+                self._esperando = True
+                self._entrega.add_done_callback(self._tras_entrega)
+            return
+        carpetas = None if self._todo else self._pendientes
+        self._pendientes = set()
+        self._todo = False
+        self._primero = None
+        self.flushes += 1
+        self._entrega = asyncio.ensure_future(self._entregar(carpetas))
+
+
+    def _tras_entrega(self, _):
+        self._esperando = False
+        self._vencido()
+
+
+    async def _entregar(self, carpetas):
+        try:
+            await self.on_change(carpetas)
+        except Exception as e:
+            print(f"LibraryWatcher: error aplicando cambios: {e}")
@@ -0,0 +1,72 @@
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Diccionario con limite de entradas que descarta el menos usado.
+    Con max_bytes y sizeof el limite es tambien de memoria.
+    Lleva contadores de aciertos y fallos.
+    """
+
+    def __init__(self, maxsize=256, max_bytes=None, sizeof=None):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._data = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def peek(self, key, default=None):
+        """Como get, pero sin mover la entrada ni contar acierto o fallo."""
+        return self._data.get(key, default)
+
+    def _size(self, value):
+        return self.sizeof(value) if self.sizeof else 0
+
+    def put(self, key, value):
+        if key in self._data:
+            self.bytes -= self._size(self._data[key])
+        self._data[key] = value
+        self._data.move_to_end(key)
+        self.bytes += self._size(value)
+
+        while len(self._data) > self.maxsize or (
+            self.max_bytes is not None and self.bytes > self.max_bytes and len(self._data) > 1
+        ):
+            _, viejo = self._data.popitem(last=False)
+            self.bytes -= self._size(viejo)
+
+    def pop(self, key, default=None):
+        try:
+            value = self._data.pop(key)
+        except KeyError:
+            return default
+        self.bytes -= self._size(value)
+        return value
+
+    def keys(self):
+        return list(self._data)
+
+    def clear(self):
+        self._data.clear()
+        self.bytes = 0
+
+    def stats(self):
+        return {"size": len(self._data), "bytes": self.bytes, "hits": self.hits, "misses": self.misses}
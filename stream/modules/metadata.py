@@ -0,0 +1,471 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+from collections import deque, namedtuple
+
+from modules import paths
+from modules.library import abrir_db, cerrar_db
+from modules.lru import LRUCache
+
+try:
+    import mutagen
+except ImportError:  # sin mutagen los titulos salen del nombre del fichero
+    mutagen = None
+
+
+METADATA_DB = os.path.join(paths.CACHE_DIR, "metadata.sqlite3")
+ART_DIR = os.path.join(paths.CACHE_DIR, "art")
+
+WORKERS = min(4, os.cpu_count() or 1)  # la Zero 2 tiene cuatro nucleos
+WORKER_NICE = 19  # mpv y la pantalla siempre antes que los tags
+LOTE = 16         # ficheros por peticion a cada proceso
+
+TITULOS_CACHE = 1024  # titulos en memoria: menus abiertos hace poco y la cola cercana
+CONSULTA = 500       # rutas por SELECT ... IN (limite de variables de SQLite)
+
+# directorio desde el que `python -m modules.metadata` encuentra el paquete
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TrackInfo = namedtuple("TrackInfo", "title artist album track duration rg_track rg_album art")
+
+CAMPOS = ("title", "artist", "album", "track", "duration", "rg_track", "rg_album", "art")
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS tags (
+    path     TEXT PRIMARY KEY,
+    mtime    INTEGER NOT NULL,
+    size     INTEGER NOT NULL,
+    title    TEXT,
+    artist   TEXT,
+    album    TEXT,
+    track    INTEGER,
+    duration REAL,
+    rg_track REAL,
+    rg_album REAL,
+    art      TEXT
+);
+"""
+
+# claves de cada campo en ID3, MP4 y Vorbis/FLAC (en ese orden)
+CLAVES = {
+    "title": ("TIT2", "\xa9nam", "title"),
+    "artist": ("TPE1", "\xa9ART", "artist"),
+    "album": ("TALB", "\xa9alb", "album"),
+    "track": ("TRCK", "trkn", "tracknumber"),
+    "rg_track": (
+        "TXXX:REPLAYGAIN_TRACK_GAIN", "TXXX:replaygain_track_gain",
+        "----:com.apple.iTunes:replaygain_track_gain", "replaygain_track_gain",
+    ),
+    "rg_album": (
+        "TXXX:REPLAYGAIN_ALBUM_GAIN", "TXXX:replaygain_album_gain",
+        "----:com.apple.iTunes:replaygain_album_gain", "replaygain_album_gain",
+    ),
+}
+
+
+def nombre_fichero(ruta):
+    """Titulo a falta de tags: el nombre del fichero, sin _ ni -."""
+    return os.path.basename(ruta).replace("_", " ").replace("-", " ")
+
+
+def titulo_de(info):
+    if info is None or not info.title:
+        return None
+    return f"{info.artist} - {info.title}" if info.artist else info.title
+
+
+# --- extraccion (en los procesos del pool) ---
+
+def _valor(v):
+    v = getattr(v, "text", v)  # frames ID3
+    if isinstance(v, (list, tuple)):
+        if not v:
+            return None
+        v = v[0]
+    if isinstance(v, tuple):  # trkn de MP4: (pista, total)
+        v = v[0]
+    if isinstance(v, bytes):
+        v = v.decode("utf-8", "replace")
+    v = str(v).strip()
+    return v or None
+
+
+def _numero(texto, tipo):
+    # "3/12" -> 3, "-6.20 dB" -> -6.2
+    if texto is None:
+        return None
+    try:
+        return tipo(texto.split("/")[0].split()[0])
+    except (ValueError, IndexError):
+        return None
+
+
+def _caratula(f, tags, carpeta_art):
+    datos, mime = None, "image/jpeg"
+    if hasattr(tags, "getall"):
+        apic = tags.getall("APIC")
+        if apic:
+            datos, mime = apic[0].data, apic[0].mime
+    elif getattr(f, "pictures", None):
+        datos, mime = f.pictures[0].data, f.pictures[0].mime
+    elif tags is not None and "covr" in tags:
+        cover = tags["covr"][0]
+        datos = bytes(cover)
+        mime = "image/png" if getattr(cover, "imageformat", None) == 14 else "image/jpeg"
+    if not datos:
+        return None
+
+    # por contenido: los discos comparten una sola copia
+    nombre = hashlib.sha1(datos).hexdigest() + (".png" if "png" in mime else ".jpg")
+    ruta = os.path.join(carpeta_art, nombre)
+    if not os.path.exists(ruta):
+        os.makedirs(carpeta_art, exist_ok=True)
+        temporal = f"{ruta}.{os.getpid()}"
+        with open(temporal, "wb") as salida:
+            salida.write(datos)
+        os.replace(temporal, ruta)
+    return ruta
+
+
+def extraer(ruta, carpeta_art=ART_DIR):
+    """Tags de un fichero como dict de CAMPOS, o None si no se pueden leer."""
+    if mutagen is None:
+        return None
+    f = mutagen.File(ruta)
+    if f is None:
+        return None
+    tags = f.tags
+
+    texto = {}
+    for campo, claves in CLAVES.items():
+        texto[campo] = None
+        if tags is None:
+            continue
+        for clave in claves:
+            try:
+                if clave in tags:
+                    texto[campo] = _valor(tags[clave])
+                    break
+            except (KeyError, ValueError, TypeError):
+                continue
+
+    return {
+        "title": texto["title"],
+        "artist": texto["artist"],
+        "album": texto["album"],
+        "track": _numero(texto["track"], int),
+        "duration": float(getattr(f.info, "length", 0) or 0),
+        "rg_track": _numero(texto["rg_track"], float),
+        "rg_album": _numero(texto["rg_album"], float),
+        "art": _caratula(f, tags, carpeta_art),
+    }
+
+
+def _worker():
+    """Proceso del pool: lee rutas (JSON por linea) y contesta [ruta, tags]."""
+    os.nice(WORKER_NICE)
+    for linea in sys.stdin:
+        ruta = json.loads(linea)
+        try:
+            datos = extraer(ruta)
+        except Exception:
+            datos = None
+        sys.stdout.write(json.dumps([ruta, datos]) + "\n")
+        sys.stdout.flush()
+
+
+# --- cache ---
+
+class MetadataCache:
+    """
+    Tags ya extraidos, en SQLite. En memoria solo quedan los titulos pedidos
+    hace poco (LRU por ruta); el resto se lee por clave primaria cuando se
+    pide, asi que ni el arranque ni la memoria dependen del tamaño de la
+    biblioteca. Una entrada vale mientras el fichero tenga el mismo mtime y
+    tamaño.
+
+    open() se llama desde un hilo; hasta entonces todos los titulos son el
+    nombre del fichero.
+    """
+
+    def __init__(self, db_path=METADATA_DB, maxsize=TITULOS_CACHE):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._db = None
+        self._titulos = LRUCache(maxsize)  # ruta -> texto para pantalla
+        self._filas = 0  # entradas al cerrar, para las estadisticas
+
+
+    def open(self):
+        db = self._open()
+        with self._lock:
+            self._db = db
+
+
+    def _open(self):
+        # si estaba corrupta se vuelve a extraer todo
+        return abrir_db(self.db_path, self._connect)
+
+
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode = WAL")
+        db.execute("PRAGMA synchronous = NORMAL")
+        db.executescript(ESQUEMA)
+        return db
+
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._filas = self._db.execute("SELECT COUNT(*) FROM tags").fetchone()[0]
+                cerrar_db(self._db, self.db_path)
+                self._db = None
+
+
+    def __len__(self):
+        with self._lock:
+            if self._db is None:
+                return self._filas
+            return self._db.execute("SELECT COUNT(*) FROM tags").fetchone()[0]
+
+
+    def get(self, ruta):
+        """TrackInfo de `ruta`, o None si no tiene tags (o aun no se han extraido)."""
+        with self._lock:
+            return self._get(ruta)
+
+
+    def _get(self, ruta):
+        if self._db is None:
+            return None
+        fila = self._db.execute(f"SELECT {', '.join(CAMPOS)} FROM tags WHERE path = ?", (ruta,)).fetchone()
+        return _info(fila) if fila else None
+
+
+    def titulo(self, ruta):
+        """Texto para pantalla y menus: tags si ya estan, si no el nombre del fichero."""
+        # el LRU tambien va con el lock: guardar() lo toca desde el hilo del scanner
+        with self._lock:
+            titulo = self._titulos.get(ruta)
+            if titulo is None:
+                if self._db is None:
+                    return nombre_fichero(ruta)
+                titulo = titulo_de(self._get(ruta)) or nombre_fichero(ruta)
+                self._titulos.put(ruta, titulo)
+        return titulo
+
+
+    def titulos(self, rutas):
+        """
+        titulo() de muchas rutas (los indices de los menus) en pocas consultas
+        y sin pasar por el LRU. Para llamarla desde un hilo: el lock se suelta
+        entre consulta y consulta para que titulo() no espere a todas.
+        """
+        encontrados = {}
+        for i in range(0, len(rutas), CONSULTA):
+            trozo = rutas[i:i + CONSULTA]
+            with self._lock:
+                if self._db is None:
+                    break
+                filas = self._db.execute(
+                    f"SELECT path, {', '.join(CAMPOS)} FROM tags WHERE path IN ({', '.join('?' * len(trozo))})",
+                    trozo,
+                ).fetchall()
+            for fila in filas:
+                encontrados[fila[0]] = titulo_de(_info(fila[1:]))
+        return [encontrados.get(ruta) or nombre_fichero(ruta) for ruta in rutas]
+
+
+    def pendientes(self, ficheros):
+        """
+        De `ficheros` ((ruta, mtime, size), ya ordenados) los que faltan o han
+        cambiado. Olvida los que ya no estan. La comparacion la hace SQLite
+        contra una tabla temporal, sin cargar la cache en memoria, y en una
+        conexion propia del hilo del scanner: no toma el lock de titulo().
+        """
+        if self.db_path == ":memory:":
+            with self._lock:
+                return _diferencia(self._db, ficheros)
+        db = sqlite3.connect(self.db_path)
+        try:
+            return _diferencia(db, ficheros)
+        finally:
+            db.close()
+
+
+    def guardar(self, resultados):
+        """resultados: (ruta, mtime, size, dict de CAMPOS o None)."""
+        filas = []
+        for ruta, mtime, size, datos in resultados:
+            valores = tuple((datos or {}).get(campo) for campo in CAMPOS)
+            filas.append((ruta, mtime, size) + valores)
+        with self._lock, self._db:
+            self._db.executemany(
+                f"INSERT OR REPLACE INTO tags(path, mtime, size, {', '.join(CAMPOS)}) "
+                f"VALUES ({', '.join('?' * (3 + len(CAMPOS)))})",
+                filas,
+            )
+            for fila in filas:
+                self._titulos.pop(fila[0])  # se vuelve a leer cuando se pida
+
+
+    def olvidar(self, rutas):
+        with self._lock, self._db:
+            self._db.executemany("DELETE FROM tags WHERE path = ?", [(r,) for r in rutas])
+            for ruta in rutas:
+                self._titulos.pop(ruta)
+
+
+def _diferencia(db, ficheros):
+    with db:
+        db.execute("CREATE TEMP TABLE IF NOT EXISTS disco (orden INTEGER PRIMARY KEY, path TEXT, mtime INTEGER, size INTEGER)")
+        db.execute("DELETE FROM disco")
+        db.executemany("INSERT INTO disco(path, mtime, size) VALUES (?, ?, ?)", ficheros)
+        faltan = db.execute(
+            "SELECT d.path, d.mtime, d.size FROM disco d LEFT JOIN tags t ON t.path = d.path "
+            "WHERE t.path IS NULL OR t.mtime != d.mtime OR t.size != d.size ORDER BY d.orden"
+        ).fetchall()
+        db.execute("DELETE FROM tags WHERE path NOT IN (SELECT path FROM disco)")
+        db.execute("DELETE FROM disco")
+    return faltan
+
+
+def _info(valores):
+    return TrackInfo(*valores) if any(v is not None for v in valores) else None
+
+
+# --- pool ---
+
+class MetadataScanner:
+    """
+    Extrae los tags que faltan en la cache con un pool de procesos a nice 19,
+    uno por nucleo, empezando por los ficheros mas nuevos. Los procesos solo
+    existen mientras hay trabajo; cada lote que termina se guarda en la cache
+    y se avisa a `on_update(rutas)` en el loop.
+
+    Los procesos se lanzan con `python -m modules.metadata` y no con
+    multiprocessing: spawn/forkserver volverian a importar main.py (y con
+    el la pantalla y los GPIO) en cada proceso.
+    """
+
+    def __init__(self, cache, library, on_update=None, workers=WORKERS):
+        self.cache = cache
+        self.library = library
+        self.on_update = on_update
+        self.workers = workers
+        self.available = mutagen is not None
+
+        self._pedido = None
+        self._tarea = None
+        self._procesos = []
+
+        # contadores
+        self.passes = 0
+        self.extracted = 0
+        self.failed = 0
+
+
+    def start(self, loop):
+        if not self.available:
+            return False
+        self._pedido = asyncio.Event()
+        self._tarea = loop.create_task(self._bucle())
+        self.request()
+        return True
+
+
+    def request(self):
+        """Pide otra pasada (hay ficheros nuevos o cambiados)."""
+        if self._pedido is not None:
+            self._pedido.set()
+
+
+    async def close(self):
+        if self._tarea:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+        for proceso in self._procesos:
+            if proceso.returncode is None:
+                proceso.kill()
+                await proceso.wait()
+        self._procesos = []
+
+
+    async def _bucle(self):
+        while True:
+            await self._pedido.wait()
+            self._pedido.clear()
+            try:
+                await self._pasada()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"MetadataScanner: {e}")
+
+
+    async def _pasada(self):
+        def pendientes():
+            return self.cache.pendientes(self.library.files())
+
+        cola = deque(await asyncio.to_thread(pendientes))
+        if not cola:
+            return
+        self.passes += 1
+
+        n = min(self.workers, -(-len(cola) // LOTE))
+        self._procesos = [
+            await asyncio.create_subprocess_exec(
+                sys.executable, "-m", "modules.metadata",
+                cwd=RAIZ,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+            )
+            for _ in range(n)
+        ]
+        try:
+            await asyncio.gather(*(self._trabajar(p, cola) for p in self._procesos))
+        finally:
+            for proceso in self._procesos:
+                if proceso.returncode is None:
+                    proceso.kill()
+                    await proceso.wait()
+            self._procesos = []
+
+
+    async def _trabajar(self, proceso, cola):
+        while cola:
+            lote = [cola.popleft() for _ in range(min(LOTE, len(cola)))]
+            proceso.stdin.write("".join(json.dumps(ruta) + "\n" for ruta, _, _ in lote).encode())
+            await proceso.stdin.drain()
+
+            resultados = []
+            for ruta, mtime, size in lote:
+                linea = await proceso.stdout.readline()
+                if not linea:
+                    return  # el proceso ha muerto: lo que quede sale en otra pasada
+                _, datos = json.loads(linea)
+                resultados.append((ruta, mtime, size, datos))
+                if datos is None:
+                    self.failed += 1
+                else:
+                    self.extracted += 1
+
+            await asyncio.to_thread(self.cache.guardar, resultados)
+            if self.on_update:
+                self.on_update({ruta for ruta, _, _, _ in resultados})
+
+        proceso.stdin.close()
+        await proceso.wait()
+
+
+if __name__ == "__main__":
+    _worker()
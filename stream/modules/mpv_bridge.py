@@ -0,0 +1,383 @@
+import asyncio
+import queue
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future
+
+
+# lo que ve el loop de mpv: una foto inmutable, nunca el dict que cambia el hilo de mpv
+Telemetry = namedtuple("Telemetry", "time duration volume pause path")
+TELEMETRY_VACIA = Telemetry(0.0, 0.0, 0, False, None)
+
+PROPIEDADES = {
+    "time-pos": "time",
+    "duration": "duration",
+    "volume": "volume",
+    "pause": "pause",
+    "path": "path",
+}
+
+# mpv_end_file_reason de libmpv
+END_FILE_REASONS = {0: "eof", 1: "restarted", 2: "stop", 3: "quit", 4: "error", 5: "redirect"}
+
+
+def end_file_reason(event):
+    """Motivo de un evento end-file como texto ('eof', 'stop', ...)."""
+    data = getattr(event, "data", event)
+    reason = getattr(data, "reason", None)
+    if isinstance(reason, bytes):
+        return reason.decode()
+    if isinstance(reason, int):
+        return END_FILE_REASONS.get(reason, str(reason))
+    return str(reason)
+
+
+class LatencyStats:
+    """Latencias de un tipo de comando: espera en la cola y ejecucion en mpv."""
+
+    __slots__ = ("count", "errors", "wait_total", "run_total", "last", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.wait_total = 0.0
+        self.run_total = 0.0
+        self.last = 0.0
+        self.max = 0.0
+
+
+    def add(self, espera, ejecucion, error=False):
+        self.count += 1
+        self.errors += error
+        self.wait_total += espera
+        self.run_total += ejecucion
+        self.last = espera + ejecucion
+        self.max = max(self.max, self.last)
+
+
+    def as_dict(self):
+        n = self.count or 1
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean_wait_ms": self.wait_total * 1000 / n,
+            "mean_run_ms": self.run_total * 1000 / n,
+            "last_ms": self.last * 1000,
+            "max_ms": self.max * 1000,
+        }
+
+
+class MpvBridge:
+    """
+    Unico punto de contacto con mpv.
+
+    Los comandos entran en una cola y los ejecuta un solo hilo en orden de
+    llegada (asyncio.to_thread podia reordenarlos en el executor); cada uno
+    devuelve un Future que se puede esperar desde el loop.
+
+    Los observers de mpv solo guardan el ultimo valor de cada propiedad. El
+    primer cambio programa una entrega al loop como muy pronto `interval`
+    segundos despues de la anterior, y todos los cambios que lleguen mientras
+    tanto salen juntos en una sola Telemetry.
+
+    time-pos cambia muchas veces por segundo: solo programa entrega cuando
+    cambia `time_key(tiempo, duracion)`, lo que se ve de el en pantalla (por
+    defecto los segundos enteros). El resto de propiedades, siempre.
+    """
+
+    def __init__(self, factory, interval=0.1, time_key=None, name="mpv-bridge"):
+        self._factory = factory  # fn() -> MPV, corre en el hilo del bridge
+        self.player = None
+        self.loop = None
+        self.interval = interval
+        self.time_key = time_key or (lambda tiempo, duracion: int(tiempo))
+
+        self.on_telemetry = None  # fn(Telemetry) en el loop
+        self.on_end_file = None   # fn(motivo, fichero) en el loop
+        self.on_file = None       # fn(path, fichero) en el loop, al empezar cada fichero
+
+        self.telemetry = TELEMETRY_VACIA
+        self._valores = TELEMETRY_VACIA._asdict()
+        self._lock = threading.Lock()
+        self._programada = False
+        self._ultima_entrega = 0.0
+        self._clave_tiempo = None  # time_key de la ultima time-pos que programo entrega
+
+        self._jobs = queue.Queue()
+
+        # contadores
+        self.stats = {}  # nombre de comando -> LatencyStats
+        self.property_changes = 0
+        self.snapshots = 0
+        self.files_started = 0  # eventos start-file: numera los ficheros que abre mpv
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        self.recreate()
+
+
+    def start(self, loop):
+        """Empieza a entregar telemetria y eventos a `loop`."""
+        self.loop = loop
+        self._programar()
+
+
+    # --- comandos ---
+
+    def submit(self, nombre, fn, *args):
+        """
+        Encola fn(player, *args) sin bloquear y devuelve un Future con su
+        resultado. `nombre` agrupa las latencias en `stats`.
+        """
+        fut = Future()
+        self._jobs.put((nombre, fn, args, fut, time.monotonic()))
+        return fut
+
+
+    async def call(self, nombre, fn, *args):
+        return await asyncio.wrap_future(self.submit(nombre, fn, *args))
+
+
+    def recreate(self):
+        """Termina el player actual (si hay) y crea otro, en orden con los comandos."""
+        return self.submit("create", self._create)
+
+
+    async def play(self, url):
+        return await self.call("play", _play, url)
+
+    async def stop(self):
+        return await self.call("stop", lambda p: p.stop())
+
+    async def set(self, propiedad, valor):
+        return await self.call(f"set {propiedad}", setattr, propiedad, valor)
+
+    async def toggle_pause(self):
+        return await self.call("toggle pause", _toggle_pause)
+
+    async def add_volume(self, delta, minimo=0, maximo=120):
+        return await self.call("volume", _add_volume, delta, minimo, maximo)
+
+    async def seek_relative(self, segundos):
+        return await self.call("seek", _seek_relative, segundos)
+
+    async def restart(self):
+        return await self.call("restart", _restart)
+
+
+    # --- playlist interna de mpv ---
+
+    async def load_playlist(self, rutas):
+        """Sustituye la playlist por `rutas` y empieza por la primera."""
+        return await self.call("load playlist", _load_playlist, rutas)
+
+    async def playlist_jump(self, pos):
+        return await self.call("playlist jump", _playlist_jump, pos)
+
+    async def playlist_slide(self, quitar, nuevas):
+        """Quita las `quitar` primeras entradas (ya sonadas) y añade `nuevas` al final."""
+        return await self.call("playlist slide", _playlist_slide, quitar, nuevas)
+
+    async def playlist_set_ahead(self, nuevas):
+        """Cambia lo que hay detras de la entrada actual por `nuevas`."""
+        return await self.call("playlist ahead", _playlist_set_ahead, nuevas)
+
+
+    async def close(self):
+        """Termina mpv y el hilo del bridge."""
+        try:
+            await self.call("terminate", lambda p: p.terminate())
+        finally:
+            self._jobs.put(None)
+
+
+    def stats_dict(self):
+        return {
+            "commands": {nombre: s.as_dict() for nombre, s in sorted(self.stats.items())},
+            "property_changes": self.property_changes,
+            "snapshots": self.snapshots,
+        }
+
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            nombre, fn, args, fut, encolado = job
+            if not fut.set_running_or_notify_cancel():
+                continue
+
+            inicio = time.monotonic()
+            error = None
+            try:
+                resultado = fn(self.player, *args)
+            except Exception as e:
+                error = e
+
+            # contadores antes de despertar a quien espera
+            stats = self.stats.get(nombre)
+            if stats is None:
+                stats = self.stats[nombre] = LatencyStats()
+            stats.add(inicio - encolado, time.monotonic() - inicio, error is not None)
+
+            if error is not None:
+                fut.set_exception(error)
+            else:
+                fut.set_result(resultado)
+
+
+    def _create(self, anterior):
+        if anterior is not None:
+            try:
+                anterior.terminate()
+            except Exception:
+                pass
+            self.player = None
+
+        player = self._factory()
+        for propiedad in PROPIEDADES:
+            player.observe_property(propiedad, self._on_property)
+        player.event_callback("start-file")(self._on_start_file)
+        player.event_callback("end-file")(self._on_end_file)
+        self.player = player
+
+
+    # --- telemetria (hilo de eventos de mpv) ---
+
+    def _on_property(self, name, value):
+        with self._lock:
+            self.property_changes += 1
+            self._valores[PROPIEDADES[name]] = value
+            if name == "time-pos":
+                clave = self.time_key(value or 0, self._valores["duration"] or 0)
+                if clave == self._clave_tiempo:
+                    return  # sale en la siguiente entrega, si la hay
+                self._clave_tiempo = clave
+        if name == "path" and value:
+            # el cambio de fichero no espera al throttle: va en orden con end-file
+            loop = self.loop
+            if loop is not None and not loop.is_closed():
+                loop.call_soon_threadsafe(self._entregar_fichero, value, self.files_started)
+        self._programar()
+
+
+    def _on_start_file(self, event):
+        self.files_started += 1
+
+
+    def _on_end_file(self, event):
+        # mpv emite end-file del fichero anterior antes del start-file del
+        # siguiente, asi que files_started dice a que fichero pertenece
+        motivo = end_file_reason(event)
+        fichero = self.files_started
+        loop = self.loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._entregar_fin, motivo, fichero)
+
+
+    def _programar(self):
+        with self._lock:
+            loop = self.loop
+            if self._programada or loop is None or loop.is_closed():
+                return
+            self._programada = True
+            espera = max(0.0, self._ultima_entrega + self.interval - time.monotonic())
+        loop.call_soon_threadsafe(loop.call_later, espera, self._entregar)
+
+
+    # --- entrega (en el loop) ---
+
+    def _entregar(self):
+        with self._lock:
+            self._programada = False
+            self._ultima_entrega = time.monotonic()
+            v = self._valores
+            snapshot = Telemetry(
+                float(v["time"] or 0),
+                float(v["duration"] or 0),
+                int(v["volume"] or 0),
+                bool(v["pause"]),
+                v["path"],
+            )
+        if snapshot == self.telemetry:
+            return
+        self.telemetry = snapshot
+        self.snapshots += 1
+        if self.on_telemetry:
+            self.on_telemetry(snapshot)
+
+
+    def _entregar_fichero(self, path, fichero):
+        if self.on_file:
+            self.on_file(path, fichero)
+
+
+    def _entregar_fin(self, motivo, fichero):
+        # la telemetria pendiente va antes que el fin de pista
+        if self._programada:
+            self._entregar()
+        if self.on_end_file:
+            self.on_end_file(motivo, fichero)
+
+
+# comandos compuestos: se ejecutan enteros en el hilo del bridge, sin otro comando en medio
+
+def _play(player, url):
+    player.play(url)
+    player.pause = False
+
+
+def _toggle_pause(player):
+    player.pause = not player.pause
+    return player.pause
+
+
+def _add_volume(player, delta, minimo, maximo):
+    volumen = max(minimo, min(player.volume + delta, maximo))
+    player.volume = volumen
+    return volumen
+
+
+def _restart(player):
+    player.seek(0, "absolute")
+    player.pause = False
+
+
+def _load_playlist(player, rutas):
+    player.loadfile(rutas[0], "replace")
+    for ruta in rutas[1:]:
+        player.loadfile(ruta, "append")
+    player.pause = False
+
+
+def _playlist_jump(player, pos):
+    player.playlist_pos = pos
+    player.pause = False
+
+
+def _playlist_slide(player, quitar, nuevas):
+    for _ in range(quitar):
+        player.playlist_remove(0)
+    for ruta in nuevas:
+        player.loadfile(ruta, "append")
+
+
+def _playlist_set_ahead(player, nuevas):
+    actual = player.playlist_pos
+    if actual is None or actual < 0:
+        return
+    while len(player.playlist) > actual + 1:
+        player.playlist_remove(actual + 1)
+    for ruta in nuevas:
+        player.loadfile(ruta, "append")
+
+
+def _seek_relative(player, segundos):
+    duracion = player.duration or 0
+    if duracion <= 0:
+        return None
+    nuevo = max(0, min((player.time_pos or 0) + segundos, duracion))
+    player.seek(nuevo, "absolute")
+    return nuevo
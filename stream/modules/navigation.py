@@ -0,0 +1,83 @@
+import unicodedata
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+
+# segundos mantenido a partir de los que cada repeticion salta una pagina / una letra
+NAV_PAGINA_TRAS = 1.5
+NAV_LETRA_TRAS = 3.0
+
+# pasos: lista de (direccion, nivel) con direccion +1/-1 y nivel "fila", "pagina" o "letra"
+Movimiento = namedtuple("Movimiento", "pasos")
+
+
+def nivel_repeticion(held):
+    """Tamaño del salto segun el tiempo que lleva pulsada la direccion."""
+    if held >= NAV_LETRA_TRAS:
+        return "letra"
+    if held >= NAV_PAGINA_TRAS:
+        return "pagina"
+    return "fila"
+
+
+def inicial(nombre):
+    """Letra con la que se agrupa un nombre: sin acentos, mayuscula, '#' para numeros y simbolos."""
+    for c in nombre:
+        if c.isalnum():
+            c = unicodedata.normalize("NFKD", c)[0].upper()
+            return c if "A" <= c <= "Z" else "#"
+    return "#"
+
+
+class ListaNavegable:
+    """
+    Indice de primeras letras de una lista de menu.
+
+    Guarda solo el inicio de cada grupo de nombres consecutivos con la misma
+    inicial, asi saltar de letra (o de pagina o de fila) es una busqueda
+    binaria y no recorre la lista.
+    """
+
+    def __init__(self, nombres, pagina=10):
+        self.total = len(nombres)
+        self.pagina = pagina
+        self.inicios = []
+        anterior = None
+        for i, nombre in enumerate(nombres):
+            letra = inicial(nombre)
+            if letra != anterior:
+                self.inicios.append(i)
+                anterior = letra
+
+
+    def mover(self, indice, direccion, nivel="fila"):
+        if not self.total:
+            return 0
+        if nivel == "letra" and len(self.inicios) > 1:
+            return self._saltar_letra(indice, direccion)
+        if nivel in ("pagina", "letra"):
+            return self._saltar_pagina(indice, direccion)
+        return (indice + direccion) % self.total
+
+
+    def aplicar(self, indice, movimiento):
+        for direccion, nivel in movimiento.pasos:
+            indice = self.mover(indice, direccion, nivel)
+        return indice
+
+
+    def _saltar_pagina(self, indice, direccion):
+        # se para en los extremos y solo da la vuelta desde ellos
+        ultimo = self.total - 1
+        if direccion > 0:
+            return 0 if indice == ultimo else min(indice + self.pagina, ultimo)
+        return ultimo if indice == 0 else max(indice - self.pagina, 0)
+
+
+    def _saltar_letra(self, indice, direccion):
+        if direccion > 0:
+            pos = bisect_right(self.inicios, indice)
+            return self.inicios[pos] if pos < len(self.inicios) else 0
+        # al inicio del grupo actual, o del anterior si ya se esta en el
+        pos = bisect_left(self.inicios, indice) - 1
+        return self.inicios[pos] if pos >= 0 else self.inicios[-1]
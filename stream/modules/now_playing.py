@@ -0,0 +1,241 @@
+import threading
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from modules.framebuffer import RGB565Converter, to_rgb565
+from modules.text_layout import get_layout, FONT_BOLD
+
+
+# ancho en pixeles de la barra de progreso
+PROGRESS_WIDTH = 200
+
+
+def volume_steps(volume_level):
+    """Numero de ondas que dibuja draw_volume_triangle (0-10)."""
+    if volume_level is None:
+        return None
+    if volume_level <= 0:
+        return 0
+    return min((int(volume_level) - 1) // 10 + 1, 10)
+
+
+def progress_pixels(tiempo_actual, duracion):
+    return int((tiempo_actual / duracion) * PROGRESS_WIDTH) if duracion > 0 else 0
+
+
+def visible_time(tiempo_actual, duracion):
+    """Lo que se ve del tiempo en pantalla: segundos enteros y pixeles de la barra."""
+    return int(tiempo_actual), progress_pixels(tiempo_actual, duracion)
+
+
+class NowPlayingModel:
+    """
+    Estado que muestra la pantalla de reproduccion (titulo, tiempo, duracion,
+    volumen), alimentado por la telemetria de mpv (MpvBridge) y por las
+    acciones del usuario.
+
+    Cada cambio se cuantiza a lo que se ve en pantalla (segundos enteros,
+    pixeles de la barra, ondas del volumen); solo si cambia algo visible se
+    programa un render en el loop, y nunca mas de uno pendiente a la vez.
+    """
+
+    def __init__(self, on_change):
+        self.on_change = on_change  # fn() que se llama en el loop
+        self.loop = None
+
+        self.titulo = None
+        self.time = 0
+        self.duration = 0
+        self.volume = 0
+
+        self._key = None
+        self._scheduled = False
+        self._lock = threading.Lock()
+
+        # contadores
+        self.updates = 0
+        self.renders = 0
+
+
+    def update(self, **campos):
+        """Actualiza campos (titulo, time, duration, volume) desde cualquier hilo."""
+        with self._lock:
+            self.updates += 1
+            for nombre, valor in campos.items():
+                setattr(self, nombre, valor)
+            key = (
+                self.titulo,
+                int(self.time),
+                int(self.duration),
+                progress_pixels(self.time, self.duration),
+                volume_steps(self.volume),
+            )
+            if key == self._key:
+                return
+            self._key = key
+        self._schedule()
+
+
+    def invalidate(self):
+        """Fuerza un render aunque no haya cambiado nada (la pantalla mostraba otra cosa)."""
+        self._schedule()
+
+
+    def snapshot(self):
+        with self._lock:
+            return self.titulo, int(self.time), int(self.duration), int(self.volume)
+
+
+    def _schedule(self):
+        with self._lock:
+            if self._scheduled or self.loop is None:
+                return
+            self._scheduled = True
+        self.loop.call_soon_threadsafe(self._fire)
+
+
+    def _fire(self):
+        with self._lock:
+            self._scheduled = False
+        self.renders += 1
+        self.on_change()
+
+
+class Layer:
+    """
+    Zona rectangular de la pantalla (x, y, ancho, alto) que se redibuja sola.
+    key es el valor ya cuantizado que muestra; si no cambia, la capa no se toca.
+    """
+
+    def __init__(self, box, draw_fn):
+        self.box = box
+        self.draw_fn = draw_fn
+        self.key = None
+        self.dirty = True
+
+    def set(self, key):
+        if key != self.key:
+            self.key = key
+            self.dirty = True
+
+
+class NowPlayingView:
+    """
+    Pantalla de reproduccion mp3 por capas.
+
+    El bloque del titulo se dibuja y convierte una sola vez por pista (capa
+    estatica). Tiempo, barra de progreso, volumen y bateria son capas pequeñas
+    que se dibujan sobre un recorte de la capa estatica y se escriben en el
+    framebuffer RGB565 solo cuando cambia lo que muestran.
+    """
+
+    def __init__(self, lcd, battery_box):
+        self.lcd = lcd
+        self.width = lcd.width
+        self.height = lcd.height
+        self.layout = get_layout(FONT_BOLD, 19)
+        self.font = self.layout.font
+        self.converter = RGB565Converter(self.width, self.height)
+
+        self.titulo = None
+        self.static = None  # Image con el bloque del titulo
+        self.frame = None   # ultimo frame compuesto (RGB565), no se modifica tras enviarlo
+        self._buffers = (self.converter.new_buffer(), self.converter.new_buffer())
+        self._envios = [None, None]  # Future del ultimo envio de cada buffer
+
+        self.layers = {
+            "time": Layer((0, 178, self.width, 26), self._draw_time),
+            "progress": Layer((20, 215, 201, 11), self._draw_progress),
+            "volume": Layer((0, 0, 42, 32), self._draw_volume),
+            "battery": Layer(battery_box, self._draw_battery),
+        }
+
+        # contadores
+        self.static_renders = 0
+        self.layer_renders = 0
+
+
+    def update(self, titulo, tiempo_actual, duracion, volume_level=None, force=False):
+        """
+        Actualiza el estado y devuelve el frame RGB565 nuevo, o None si no ha
+        cambiado nada visible (y no se fuerza).
+        """
+        nuevo_titulo = titulo != self.titulo
+        if nuevo_titulo:
+            self._render_static(titulo)
+
+        tiempo_str = f"{int(tiempo_actual // 60)}:{int(tiempo_actual % 60):02d}"
+        duracion_str = f"{int(duracion // 60)}:{int(duracion % 60):02d}"
+
+        self.layers["time"].set(f"{tiempo_str} / {duracion_str}")
+        self.layers["progress"].set(progress_pixels(tiempo_actual, duracion))
+        self.layers["volume"].set(volume_steps(volume_level))
+        self.layers["battery"].set(self.lcd.battery_fill())
+
+        dirty = [layer for layer in self.layers.values() if layer.dirty]
+        if not dirty and not nuevo_titulo:
+            return self.frame if force else None
+
+        frame = self._next_buffer()
+        if nuevo_titulo:
+            self.converter.convert(self.static, frame)
+        else:
+            np.copyto(frame, self.frame)
+
+        for layer in dirty:
+            x, y, ancho, alto = layer.box
+            img = self.static.crop((x, y, x + ancho, y + alto))
+            if layer.key is not None:
+                layer.draw_fn(ImageDraw.Draw(img), layer.key)
+            frame[y:y + alto, x:x + ancho] = to_rgb565(img)
+            layer.dirty = False
+            self.layer_renders += 1
+
+        self.frame = frame
+        return frame
+
+
+    def sent(self, frame, fut):
+        """Apunta el Future de display_image(frame) para no reescribir el buffer mientras se envia."""
+        for i, buf in enumerate(self._buffers):
+            if frame is buf:
+                self._envios[i] = fut
+
+
+    def _next_buffer(self):
+        # doble buffer como InterfazLCD._next_buffer, pero aqui se escribe desde
+        # el loop: no vale el ultimo frame, ni el del panel (dirty_rects compara
+        # con el), ni uno que el hilo del display aun no ha terminado de enviar
+        for buf, envio in zip(self._buffers, self._envios):
+            if buf is self.frame or buf is self.lcd.last_frame:
+                continue
+            if envio is not None and not envio.done():
+                continue
+            return buf
+        return self.converter.new_buffer()  # el display va atrasado: frame suelto
+
+
+    def _render_static(self, titulo):
+        img = Image.new("RGB", (self.width, self.height), "black")
+        self.lcd.draw_title_block(ImageDraw.Draw(img), titulo, self.layout)
+        self.static = img
+        self.titulo = titulo
+        self.static_renders += 1
+        for layer in self.layers.values():
+            layer.dirty = True
+
+
+    # cada capa dibuja con origen en su esquina superior izquierda
+
+    def _draw_time(self, draw, texto):
+        draw.text((65, 2), texto, font=self.font, fill=(200, 200, 200))
+
+    def _draw_progress(self, draw, progreso):
+        self.lcd.draw_progress_bar(draw, progreso, 0, 0)
+
+    def _draw_volume(self, draw, pasos):
+        self.lcd.draw_volume_triangle(draw, pasos * 10)
+
+    def _draw_battery(self, draw, relleno):
+        self.lcd.draw_battery_icon(draw, 0, 0)
@@ -0,0 +1,13 @@
+import os
+
+
+# raiz del usuario radiobit; el simulador la cambia con RADIOBIT_HOME
+RADIOBIT_HOME = os.environ.get("RADIOBIT_HOME", "/home/radiobit")
+
+DATA_DIR = os.path.join(RADIOBIT_HOME, "stream", "data")
+STREAMS_FILE = os.path.join(DATA_DIR, "streams.json")
+STREAM_IMAGES_DIR = os.path.join(DATA_DIR, "stream-images")
+MP3_DIR = os.path.join(DATA_DIR, "main-mix")
+
+CONFIG_FILE = os.path.join(RADIOBIT_HOME, "config.json")
+CACHE_DIR = os.path.join(RADIOBIT_HOME, ".cache", "radiobit")
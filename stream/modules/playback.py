@@ -1,20 +1,36 @@
 import os
 import asyncio
 from mpv import MPV
-from urllib.parse import unquote
 from modules.nostrbit import resolve_m3u8_async
 from modules.tools_menu import Tools
 from modules.snake_game import run_snake
+from modules.navigation import ListaNavegable, Movimiento
+from modules.lru import LRUCache
+from modules.now_playing import NowPlayingModel, visible_time
+from modules.mpv_bridge import MpvBridge
+from modules.library import LibraryIndex, parse_m3u
+from modules.library_watcher import LibraryWatcher
+from modules.metadata import MetadataCache, MetadataScanner
+from modules.track_table import TrackTable, contiene, posicion
+from modules import paths
 import re
 import time
 import json
 from pathlib import Path
+from array import array
+from collections import deque
+from bisect import bisect_left
 
 import subprocess
 import sys
 
 
-CONFIG_FILE = Path("/home/radiobit/config.json")
+CONFIG_FILE = Path(paths.CONFIG_FILE)
+
+SKIP_SETTLE = 0.25  # segundos sin otro salto antes de abrir la pista o stream elegido
+PLAYLIST_CACHE = 8  # playlists con las pistas ya leidas (ruta -> ids)
+PLAYLIST_CACHE_BYTES = 2 * 1024 * 1024
+PREFETCH_AHEAD = 2  # pistas de la cola que se dejan en la playlist de mpv detras de la actual
 
 
 def cargar_config():
@@ -34,6 +50,16 @@ def cargar_config():
     return config
 
 
+def _bytes_ids(ids):
+    return ids.itemsize * len(ids)
+
+
+def duracion_corta(segundos):
+    """1h05, 42m: para el titulo del menu."""
+    minutos = int(segundos // 60)
+    return f"{minutos // 60}h{minutos % 60:02d}" if minutos >= 60 else f"{minutos}m"
+
+
 def guardar_config(config):
     with open(CONFIG_FILE, "w") as f:
         json.dump(config, f)
@@ -41,96 +67,93 @@ def guardar_config(config):
 
 
 class ControlReproduccion:
-    def __init__(self, streams_file_path, images_directory, mp3_directory, lcd_interface):
+    def __init__(self, streams_file_path, images_directory, mp3_directory, lcd_interface, inputs=None):
         self.lcd_interface = lcd_interface
+        self.inputs = inputs  # InputManager, lo usan los juegos de Tools
         self.streams = self.load_streams(streams_file_path)
         self.images = self.load_images(images_directory)
         self.mp3_directory = mp3_directory
-        self.playlists = self.load_playlists(mp3_directory)
+        self.library = LibraryIndex(mp3_directory)
+        # playlists y cola guardan ids de esta tabla, no rutas
+        self.tracks = TrackTable()
+        # cabeceras de las playlists (PlaylistHeader); las pistas se leen al abrir cada una.
+        # El indice ya las tiene del ultimo arranque; solo la primera vez se recorre todo
+        self.playlists = self.library.headers() if not self.library.is_empty() else self.load_playlists(mp3_directory)
+        self.playlist_cache = LRUCache(PLAYLIST_CACHE, max_bytes=PLAYLIST_CACHE_BYTES, sizeof=_bytes_ids)
         self.current_playlist = 0
         self.current_mp3_index = 0
         self.current_stream = 0
         self.mode = "idle"
         self.tools = Tools(self)
-        self.estado_reproduccion = {"time": 0, "duration": 0}
-        self.update_task = None
+        self.now_playing_model = NowPlayingModel(self._on_now_playing_change)  # lo que muestra la pantalla mp3
         self.ultimo_titulo = None  # # evita redibujar pantalla si el titulo no ha cambiado
         self.en_menu = False  # # flag para los controles de menu
-        self.last_change_time = 0  # # evita dobles cambios de stream por multiples pulsaciones rapidas
         self.repetir_playlist = True  # # repetir playlist al terminar la cola de reproduccion
-        self.playback_queue = []
+        self.playback_queue = array("i")  # ids de self.tracks
         self.loop = None
-        self.manual_change = False    # flag para saltar on_end_file durante cambio manual
+        self._acciones = deque()  # (accion, payload, future) para _procesar_acciones
+        self._acciones_evento = None
+        self._tarea_acciones = None
+        self._tarea_rescan = None
+        self.watcher = None    # LibraryWatcher, despues del rescan de arranque
+        # titulos de los tags; hasta que se extraen, el nombre del fichero
+        self.metadata = MetadataCache()  # se abre en iniciar(), en un hilo
+        self.scanner = MetadataScanner(self.metadata, self.library, self._metadatos_nuevos)
+        self._apertura = None  # instante en que se abre el objetivo pendiente (None: nada pendiente)
+        self._abierto = None   # ruta o url que esta sonando en mpv
+        self._ventana = []     # (indice, ruta) de la playlist de mpv, empezando por la que suena
+        self._esperado = 0     # posicion de la ventana que debe empezar a sonar (None: la siguiente)
+        self._fichero_actual = None  # numero de start-file del bridge de lo que suena
+        self.aperturas = 0     # ficheros abiertos a peticion (los avances solos de mpv no cuentan)
+        self.avances_gapless = 0
+        self.acciones_recibidas = 0
+        self.saltos_agrupados = 0
         self.menu_task = None  # # flag para activar bucle async dentro del menu (scroll horizontal)
+        self.nav_cache = LRUCache(16)  # indices de letras de las listas de los menus
         config = cargar_config()
         self.video_enabled = config.get("video_enabled", False)  # video desactivado por defecto
         self.replaygain_mode = config.get("replaygain_mode", "track")
         self.ultimo_frame_stream = None
         self.ultimo_frame_mp3 = None
         self.idle_image = None
-        self.last_battery_update = 0
-        self._create_mpv()  # crear el objeto mpv segun config.json
+        self.lcd_interface.on_wake = self._on_wake
+        self.lcd_interface.on_battery_change = self._on_battery_change
+        # todos los comandos a mpv pasan por el hilo del bridge, en orden
+        self.mpv = MpvBridge(self._create_mpv, time_key=visible_time)  # crea el objeto mpv segun config.json
+        self.mpv.on_telemetry = self.actualizar_estado
+        self.mpv.on_end_file = self.on_end_file
+        self.mpv.on_file = self.on_file
+        self.NIP19_RE = re.compile(r"^(npub1|nprofile1)[ac-hj-np-z02-9]+$")
 
 
     ###### --------------- LOAD MPV --------------- ######
 
     def _create_mpv(self):
-        """(Re)crea self.mpv_player según self.video_enabled y registra observers/callbacks."""
+        """Crea el objeto mpv según self.video_enabled (lo llama el hilo del bridge)."""
         common_kwargs = dict(
             ytdl=True,
             loop_playlist="no",
             volume=40,
+            prefetch_playlist='yes',  # abre y demuxa la siguiente entrada antes de que acabe la actual
+            gapless_audio='weak',
             replaygain=self.replaygain_mode,
             replaygain_preamp=0,
             replaygain_clip='no'
         )
 
-        # termina player anterior si existe
-        try:
-            if hasattr(self, "mpv_player") and self.mpv_player is not None:
-                try:
-                    self.mpv_player.terminate()
-                except Exception:
-                    # ignora errores al terminar
-                    pass
-        except Exception:
-            pass
-
-        # Crear nuevo objeto mpv
         if self.video_enabled:
-            self.mpv_player = MPV(**common_kwargs)
-        else:
-            self.mpv_player = MPV(video='no', **common_kwargs)
+            return MPV(**common_kwargs)
+        return MPV(video='no', **common_kwargs)
 
-        self.mpv_player.observe_property('time-pos', self.actualizar_estado)
-        self.mpv_player.observe_property('duration', self.actualizar_estado)
-        self.mpv_player.observe_property('volume', self.actualizar_estado)
 
-        @self.mpv_player.event_callback('end-file')
+    # fin de fichero de mpv (en el loop): entra en la cola como una accion mas
+    def on_end_file(self, reason, fichero):
+        self._post("END_FILE", (reason, fichero))
 
-        # gestiona el evento mpv de fin de pista
-        def on_end_file(event):
-            if self.manual_change:
-                return
-
-            reason_code = getattr(event.data, 'reason', None)
 
-            # convierte bytes a string
-            if isinstance(reason_code, bytes):
-                reason_str = reason_code.decode()
-            elif isinstance(reason_code, int):
-                # mapear codigo a texto
-                reason_map = {0: 'eof', 1: 'stop', 2: 'error', 3: 'quit'}
-                reason_str = reason_map.get(reason_code, str(reason_code))
-            else:
-                reason_str = str(reason_code)
-
-            # solo avanzar si termina naturalmente
-            if self.mode == "mp3" and reason_str == 'eof':
-                if self.loop and self.loop.is_running():
-                    asyncio.run_coroutine_threadsafe(self.transition("NEXT_MP3"), self.loop)
-
-        self.NIP19_RE = re.compile(r"^(npub1|nprofile1)[ac-hj-np-z02-9]+$")
+    # mpv ha empezado a reproducir `path` (en el loop), tambien cuando avanza solo
+    def on_file(self, path, fichero):
+        self._post("FILE", (path, fichero))
 
 
 
@@ -185,261 +208,536 @@ class ControlReproduccion:
 
 
     def load_playlists(self, mp3_directory):
-        playlists = []
-        formatos_validos = (
-            ".mp3", ".flac", ".ogg", ".wav", ".aac", ".m4a", ".aiff", ".aif",  # audio
-            ".mp4", ".mkv", ".avi", ".mov", ".webm", ".flv"                       # video
-        )
-
-        for root, dirs, files in sorted(os.walk(mp3_directory), key=lambda x: x[0]):
-            archivos_m3u = [f for f in files if f.endswith('.m3u')]
-            if archivos_m3u:
-                for m3u in archivos_m3u:
-                    m3u_path = os.path.join(root, m3u)
-                    mp3_files = self.load_m3u_playlist(m3u_path)
-                    if mp3_files:
-                        playlists.append((m3u_path, mp3_files))
-            else:
-                pistas = [os.path.join(root, f) for f in sorted(files) if f.lower().endswith(formatos_validos)]
-                if pistas:
-                    playlists.append((os.path.join(root, ''), pistas))
-        return playlists
+        # cabeceras de las playlists; el indice solo vuelve a leer lo que ha cambiado en disco
+        if os.path.abspath(mp3_directory) != self.library.root:
+            self.library.close()
+            self.library = LibraryIndex(mp3_directory)
+        self.library.rescan()
+        return self.library.headers()
 
 
     def load_m3u_playlist(self, m3u_file_path):
-        mp3_files = []
-        with open(m3u_file_path, 'r') as m3u_file:
-            for line in m3u_file:
-                line = line.strip()
-                if line and not line.startswith('#'):
-                    path = os.path.join(os.path.dirname(m3u_file_path), line) if not os.path.isabs(line) else line
-                    mp3_files.append(unquote(path))
-        return mp3_files
+        return parse_m3u(m3u_file_path)
+
+
+    # rescan en un hilo; las playlists nuevas entran por la cola de reproduccion
+    async def refresh_playlists(self):
+        playlists = await asyncio.to_thread(self.load_playlists, self.mp3_directory)
+        self.scanner.request()
+        await self.transition("PLAYLISTS", playlists)
 
 
     ###### --------------- INIT SYSTEM --------------- ######
 
-    # arranca el sistema: resuelve npub, arranca en idle y lanza update_loop
+    # arranca el sistema: resuelve npub y arranca en idle
     async def iniciar(self):
         self.loop = asyncio.get_running_loop()
+        self.now_playing_model.loop = self.loop
+        # la cola de acciones antes que el bridge: sus eventos entran por _post
+        self._acciones_evento = asyncio.Event()
+        self._tarea_acciones = asyncio.create_task(self._procesar_acciones())
+        self.mpv.start(self.loop)
+        await asyncio.to_thread(self.metadata.open)
         self.streams = await self.resolve_all_npubs(self.streams)
         await self.enter_idle()
-        self.update_task = asyncio.create_task(self.update_loop())
+        self._tarea_rescan = asyncio.create_task(self._rescan_inicial())
 
 
-    # obtiene de mpv la posicion de reproduccion y duracion de pista
-    def actualizar_estado(self, name, value):
-        if name == "time-pos":
-            self.estado_reproduccion["time"] = int(value) if value else 0
-        elif name == "duration":
-            self.estado_reproduccion["duration"] = int(value) if value else 0
-        elif name == "volume":
-            self.estado_reproduccion["volume"] = int(value) if value else 0
+    # posicion, duracion y volumen de mpv, ya agrupados por el bridge (en el loop)
+    def actualizar_estado(self, telemetry):
+        self.now_playing_model.update(
+            time=telemetry.time, duration=telemetry.duration, volume=telemetry.volume
+        )
 
 
     # handle playlist/queue
     async def play_playlist(self, playlist_index, track_index=0):
-        if not (0 <= playlist_index < len(self.playlists)):
-            return
+        await self.transition("PLAY_PLAYLIST", (playlist_index, track_index))
 
-        await self.stop_playback()
 
-        self.current_playlist = playlist_index
-        self.playback_queue = self.playlists[playlist_index][1]
-        self.current_mp3_index = track_index
-        self.mode = "mp3"
+    #### ---- playback state controller ---- ####
+    async def transition(self, action, payload=None):
+        """
+        Pide un cambio de reproduccion y vuelve cuando el estado (modo, pista,
+        stream) ya lo refleja, sin esperar a que mpv abra el fichero:
+        - PLAY_MP3 (indice), NEXT_MP3, PREV_MP3
+        - PLAY_STREAM (indice o None para el actual)
+        - PLAY_PLAYLIST ((playlist, pista)), IDLE, RELOAD
+        - PLAYLISTS (todas las cabeceras), LIBRARY ({ruta: (cabecera, pistas)}, None si se ha borrado)
+        """
+        await self._post(action, payload)
 
-        await self.play_current_mp3()
 
+    def _post(self, action, payload=None):
+        # todas las acciones, del usuario o de mpv, pasan por una sola cola
+        fut = self.loop.create_future()
+        self._acciones.append((action, payload, fut))
+        self._acciones_evento.set()
+        return fut
 
-    #### ---- playback state controller ---- ####
-    async def transition(self, action, payload=None):
+
+    async def _siguiente_accion(self, timeout):
+        while not self._acciones:
+            self._acciones_evento.clear()
+            try:
+                await asyncio.wait_for(self._acciones_evento.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self._acciones.popleft()
+
+
+    async def _procesar_acciones(self):
         """
-        Metodo central de transicion para:
-        - reproducir pistas o streams
-        - avanzar/retroceder pistas
-        - reiniciar pistas
+        Unico consumidor de la cola. Los saltos solo mueven el objetivo (y la
+        pantalla); el fichero se abre cuando pasa SKIP_SETTLE sin otro salto,
+        asi una rafaga de NEXT/PREV abre una sola pista.
         """
-        self.manual_change = True
-        try:
+        while True:
+            timeout = None
+            if self._apertura is not None:
+                timeout = max(0.0, self._apertura - time.monotonic())
 
-            if action == "PLAY_MP3":
-                # comprobar si la pista real es la misma que esta sonando
-                pista_actual = self.mp3_actual()
+            accion = await self._siguiente_accion(timeout)
+            if accion is None:
+                self._apertura = None
+                try:
+                    await self._abrir()
+                except Exception as e:
+                    print(f"Error al abrir la pista: {e}")
+                continue
 
-                pista_solicitada = (
-                    self.playback_queue[payload]
-                    if (
-                        self.playback_queue
-                        and payload is not None
-                        and 0 <= payload < len(self.playback_queue)
-                    )
-                    else None
+            action, payload, fut = accion
+            self.acciones_recibidas += 1
+            try:
+                await self._aplicar(action, payload)
+            except Exception as e:
+                print(f"Error en {action}: {e}")
+            finally:
+                if not fut.done():
+                    fut.set_result(None)
+
+
+    async def _aplicar(self, action, payload):
+        if action == "END_FILE":
+            reason, fichero = payload
+            # solo el fin natural de lo que suena y si no hay un salto pendiente
+            if reason != "eof" or fichero != self._fichero_actual or self._apertura is not None:
+                return
+            # mpv pasa solo a la siguiente entrada; aqui solo importa que se acabe la ventana
+            if self.mode == "mp3" and len(self._ventana) <= 1:
+                await self._entrar_idle()
+
+
+        elif action == "FILE":
+            await self._seguir_mpv(*payload)
+
+
+        elif action == "PLAY_MP3":
+            if not self.playback_queue or payload is None or not (0 <= payload < len(self.playback_queue)):
+                return
+            # si esta sonando exactamente esa pista, no hacer nada
+            if (
+                self.mode == "mp3"
+                and self._apertura is None
+                and self._abierto == self.tracks.ruta(self.playback_queue[payload])
+            ):
+                return
+            self.ultimo_frame_stream = None
+            self.mode = "mp3"
+            self.current_mp3_index = payload
+            await self._programar_apertura(0)
+
+
+        elif action == "PLAY_PLAYLIST":
+            playlist_index, track_index = payload
+            if not (0 <= playlist_index < len(self.playlists)):
+                return
+            pistas = await self._cargar_pistas(self.playlists[playlist_index].path)
+            if not pistas:
+                return
+            self.current_playlist = playlist_index
+            self.playback_queue = pistas
+            self.current_mp3_index = track_index
+            self.mode = "mp3"
+            await self._programar_apertura(0)
+
+
+        elif action == "NEXT_MP3":
+            if not self.playback_queue:
+                return
+            if self._avanzar_mp3(1):
+                await self._programar_apertura()
+            else:
+                await self._entrar_idle()
+
+
+        elif action == "PREV_MP3":
+            if not self.playback_queue:
+                return
+
+            RESTART_THRESHOLD = 3
+
+            # reinicia la pista actual si ya lleva un rato sonando
+            if self._apertura is None and self.mpv.telemetry.time > RESTART_THRESHOLD:
+                await self._programar_apertura()
+            else:
+                self._avanzar_mp3(-1)
+                await self._programar_apertura()
+
+
+        elif action == "PLAY_STREAM":
+            if not self.streams:
+                return
+            if payload is not None:
+                self.current_stream = payload
+            self.mode = "stream"
+            await self._programar_apertura()
+
+
+        elif action == "RELOAD":
+            # player nuevo: vuelve a abrir lo que sonaba
+            if self.is_playing():
+                self._abierto = None
+                self._ventana = []
+                await self._programar_apertura(0)
+
+
+        elif action == "REPEAT":
+            # lo que hay detras de la pista actual depende de repetir_playlist
+            self.repetir_playlist = payload
+            if self.mode == "mp3" and self._ventana:
+                del self._ventana[1:]
+                await self.mpv.playlist_set_ahead(self._rellenar_ventana())
+
+
+        elif action == "IDLE":
+            await self._entrar_idle()
+
+
+        elif action == "PLAYLISTS":
+            await self._cambiar_playlists(payload)
+
+
+        elif action == "LIBRARY":
+            await self._aplicar_cambios_biblioteca(payload)
+
+
+    def _avanzar_mp3(self, delta):
+        """Mueve la pista actual; False si se sale de la cola y no hay que repetir."""
+        indice = self.current_mp3_index + delta
+        if indice >= len(self.playback_queue) and not self.repetir_playlist:
+            return False
+        self.current_mp3_index = indice % len(self.playback_queue)
+        return True
+
+
+    def _ruta_playlist_actual(self):
+        if 0 <= self.current_playlist < len(self.playlists):
+            return self.playlists[self.current_playlist].path
+        return None
+
+
+    async def _cargar_pistas(self, ruta):
+        """Ids de las pistas de una playlist: de la cache o, si no, del indice (en un hilo)."""
+        pistas = self.playlist_cache.get(ruta)
+        if pistas is None:
+            pistas = await asyncio.to_thread(self.library.tracks, ruta, self.tracks)
+            if pistas is not None:
+                self.playlist_cache.put(ruta, pistas)
+        return pistas
+
+
+    async def _cambiar_playlists(self, playlists):
+        """Cambia la lista de playlists manteniendo la playlist y la pista actuales (por ruta)."""
+        ruta_actual = self._ruta_playlist_actual()
+        # la tabla no olvida rutas: el mismo fichero conserva su id
+        ruta_pista = self.mp3_actual()
+        pista_actual = self.tracks.buscar(ruta_pista) if ruta_pista else None
+
+        self.playlists = playlists
+        self.playlist_cache.clear()  # las pistas de cualquiera pueden haber cambiado
+        rutas = [cabecera.path for cabecera in playlists]
+        self.current_playlist = rutas.index(ruta_actual) if ruta_actual in rutas else 0
+
+        if self.mode != "mp3":
+            return
+        pistas = await self._cargar_pistas(rutas[self.current_playlist]) if playlists else None
+        self.playback_queue = pistas or array("i")
+        self.current_mp3_index = posicion(self.playback_queue, pista_actual) or 0
+
+        # lo que suena sigue sonando; lo que viene detras sale de la cola nueva
+        if self._ventana:
+            self._ventana = [(self.current_mp3_index, self._ventana[0][1])]
+            await self.mpv.playlist_set_ahead(self._rellenar_ventana())
+
+
+    async def _rescan_inicial(self):
+        # el arranque usa el indice tal cual; lo cambiado con el equipo apagado llega despues
+        try:
+            cambios = await asyncio.to_thread(self.library.rescan)
+        except Exception as e:
+            print(f"Error al revisar la biblioteca: {e}")
+            return
+        if cambios:
+            playlists = await asyncio.to_thread(self.library.headers)
+            await self.transition("PLAYLISTS", playlists)
+        self.scanner.start(self.loop)
+
+        # desde aqui los cambios en disco llegan solos, sin menu ni reinicio
+        self.watcher = LibraryWatcher(self.mp3_directory, self._biblioteca_cambiada)
+        carpetas = await asyncio.to_thread(self.library.directories)
+        if not self.watcher.start(self.loop, carpetas):
+            print("LibraryWatcher: inotify no disponible, la biblioteca solo se actualiza desde el menu")
+
+
+    async def _biblioteca_cambiada(self, carpetas):
+        # lo llama el watcher con las carpetas tocadas (None: rescan completo).
+        # Solo se leen las pistas de las playlists que ya estaban leidas
+        leidas = set(self.playlist_cache.keys())
+        leidas.add(self._ruta_playlist_actual())
+
+        def releer():
+            cambiadas = self.library.rescan(carpetas)
+            return {
+                ruta: (
+                    self.library.header(ruta),
+                    self.library.tracks(ruta, self.tracks) if ruta in leidas else None,
                 )
-                # si esta sonando exactamente esa pista, no hacer nada
-                if (
-                    self.mode == "mp3"
-                    and pista_actual is not None
-                    and pista_actual == pista_solicitada
-                ):
-                    return
-                self.ultimo_frame_stream = None
-                await self.stop_playback()
-                self.mode = "mp3"
-                self.current_mp3_index = payload
-                await self.play_current_mp3()
+                for ruta in cambiadas
+            }
 
+        cambios = await asyncio.to_thread(releer)
+        self.scanner.request()
+        if cambios:
+            await self.transition("LIBRARY", cambios)
 
-            elif action == "NEXT_MP3":
-                if not self.playback_queue:
-                    self.manual_change = False
-                    return
-                
-                await self.stop_playback()
-                self.current_mp3_index += 1
-                if self.current_mp3_index >= len(self.playback_queue):
-                    if self.repetir_playlist:
-                        self.current_mp3_index = 0
-                    else:
-                        await self.enter_idle()
-                        return
-                    
-                await self.play_current_mp3()
-
-
-            elif action == "PREV_MP3":
-                if not self.playback_queue:
-                    self.manual_change = False
-                    return
-                
-                RESTART_THRESHOLD = 3
-                
-                tiempo_actual = self.estado_reproduccion.get("time", 0)
-                if tiempo_actual > RESTART_THRESHOLD:
-                    # reinicia la pista actual
-                    await self.stop_playback()
-                    await self.play_current_mp3()
-                else:
-                    # retrocede a la pista anterior
-                    self.current_mp3_index = (self.current_mp3_index - 1) % len(self.playback_queue)
-                    await self.play_current_mp3()
 
+    def _metadatos_nuevos(self, rutas):
+        # el scanner ha guardado un lote de tags (en el loop). Los indices de
+        # letras de las pistas usan los titulos: caducan solo los de las
+        # playlists que tienen alguna de estas pistas
+        ids = [track_id for track_id in map(self.tracks.buscar, rutas) if track_id is not None]
+        for clave in self.nav_cache.keys():
+            guardado = self.nav_cache.peek(clave)
+            if clave != "playlists" and contiene(guardado[0], ids):
+                self.nav_cache.pop(clave)
+        if self.mode == "mp3" and self._abierto in rutas and self._apertura is None:
+            self.now_playing_model.update(titulo=self.metadata.titulo(self._abierto))
 
-            elif action == "PLAY_STREAM":
-                if not self.streams:
-                    return
-                
-                if payload is not None:
-                    self.current_stream = payload
-                await self.start_stream(self.current_stream)
 
-        finally:
-            self.manual_change = False
+    async def _aplicar_cambios_biblioteca(self, cambios):
+        """
+        Aplica sobre self.playlists solo las playlists que han cambiado
+        (cabecera None: borrada). La playlist y la pista actuales se siguen
+        por ruta, no por indice.
+        """
+        ruta_actual = self._ruta_playlist_actual()
+        # con un salto pendiente la actual es el objetivo, no lo que sonaba
+        ruta_pista = self._abierto if self._apertura is None and self._abierto else self.mp3_actual()
+        pista_actual = self.tracks.buscar(ruta_pista) if ruta_pista else None
+
+        for ruta, (_, pistas) in cambios.items():
+            if pistas is not None:
+                self.playlist_cache.put(ruta, pistas)
+            else:
+                self.playlist_cache.pop(ruta)
+
+        # mismo orden que LibraryIndex.headers(): carpeta y ruta
+        clave = lambda ruta: (os.path.dirname(ruta), ruta)
+        playlists = [cabecera for cabecera in self.playlists if cabecera.path not in cambios]
+        claves = [clave(cabecera.path) for cabecera in playlists]
+        for ruta, (cabecera, _) in sorted(cambios.items()):
+            if cabecera is not None:
+                i = bisect_left(claves, clave(ruta))
+                claves.insert(i, clave(ruta))
+                playlists.insert(i, cabecera)
+        self.playlists = playlists
+
+        rutas = [cabecera.path for cabecera in playlists]
+        self.current_playlist = rutas.index(ruta_actual) if ruta_actual in rutas else 0
+
+        if self.mode != "mp3" or ruta_actual not in cambios:
+            return
+        en_curso = self._ventana and self._apertura is None
+
+        if ruta_actual not in rutas:
+            # la playlist que suena ya no existe: se acaba la pista actual y a idle
+            self.playback_queue = array("i", [pista_actual] if pista_actual is not None else [])
+            self.current_mp3_index = 0
+            if en_curso:
+                self._ventana = self._ventana[:1]
+                await self.mpv.playlist_set_ahead([])
+            return
 
+        anterior, indice = self.playback_queue, self.current_mp3_index
+        pistas = cambios[ruta_actual][1]
+        if pistas is None:
+            pistas = await self._cargar_pistas(ruta_actual)
+        # una playlist vacia es un array('i') vacio: no vale "or"
+        self.playback_queue = pistas if pistas is not None else array("i")
+        nuevo_indice = posicion(self.playback_queue, pista_actual)
+        if nuevo_indice is not None:
+            self.current_mp3_index = nuevo_indice
+        else:
+            # la pista actual se ha borrado: queda "delante" de la siguiente que siga existiendo
+            siguientes = anterior[indice + 1:] if posicion(anterior, pista_actual) is not None else []
+            quedan = set(self.playback_queue)
+            destino = next((p for p in siguientes if p in quedan), None)
+            siguiente = posicion(self.playback_queue, destino)
+            self.current_mp3_index = (siguiente if siguiente is not None else len(self.playback_queue)) - 1
+
+        # lo que suena sigue sonando; lo que viene detras sale de la cola nueva
+        if en_curso:
+            self._ventana = [(self.current_mp3_index, self._ventana[0][1])]
+            await self.mpv.playlist_set_ahead(self._rellenar_ventana())
+
+
+    def _rellenar_ventana(self):
+        """Completa la ventana hasta PREFETCH_AHEAD pistas por delante; devuelve las rutas nuevas."""
+        nuevas = []
+        total = len(self.playback_queue)
+        while self._ventana and total and len(self._ventana) < 1 + PREFETCH_AHEAD:
+            indice = self._ventana[-1][0] + 1
+            if indice >= total:
+                if not self.repetir_playlist:
+                    break
+                indice = 0
+            ruta = self.tracks.ruta(self.playback_queue[indice])
+            self._ventana.append((indice, ruta))
+            nuevas.append(ruta)
+        return nuevas
 
-    # refresh pantalla con el estado actual de reproduccion (pista, tiempo, bateria)
-    async def update_loop(self):
 
-        last_title = None
-        last_time = None
-        last_duration = None
-        last_volume = None
-        last_mode = None
+    async def _seguir_mpv(self, path, fichero):
+        """Pone el estado al dia cuando mpv empieza un fichero de la ventana."""
+        if self.mode != "mp3" or not self._ventana:
+            self._fichero_actual = fichero
+            return
 
-        while True:
-            await asyncio.sleep(0.2)
+        solo = self._esperado is None  # mpv ha avanzado sin que se lo pidieramos
+        esperado = 1 if solo else self._esperado
+        self._esperado = None
+        orden = [esperado] + list(range(len(self._ventana)))
+        pos = next((k for k in orden if k < len(self._ventana) and self._ventana[k][1] == path), None)
+        if pos is None:
+            return  # de una ventana anterior
+        self._fichero_actual = fichero
+        self._abierto = path
+        if pos == 0:
+            return
 
-            if self.en_menu:
-                continue
+        # avance (solo o por salto): la ventana se desliza igual que la playlist de mpv
+        if solo:
+            self.avances_gapless += 1
+        indice = self._ventana[pos][0]
+        del self._ventana[:pos]
+        nuevas = self._rellenar_ventana()
+        if self._apertura is None:
+            # con un salto pendiente el objetivo ya es otro
+            self.current_mp3_index = indice
+            self.now_playing_model.update(titulo=self.metadata.titulo(path))
+        await self.mpv.playlist_slide(pos, nuevas)
+
+
+    async def _programar_apertura(self, espera=SKIP_SETTLE):
+        """Muestra ya el objetivo y deja la apertura para cuando acabe la rafaga."""
+        if self._apertura is None:
+            # primera peticion de la rafaga: calla lo que suena. En pausa la
+            # playlist de mpv sigue ahi por si el objetivo ya esta precargado
+            if self.mode == "mp3" and self._ventana:
+                await self.mpv.set("pause", True)
+            else:
+                await self.stop_playback()
+                self._abierto = None
+        else:
+            self.saltos_agrupados += 1
+        self._apertura = time.monotonic() + espera
 
-            # Detectar cambio de modo
-            if self.mode != last_mode:
-                last_mode = self.mode
-                last_title = None
-                last_time = None
-                last_duration = None
-                last_volume = None
+        if self.mode == "mp3":
+            mp3_file = self.mp3_actual()
+            if mp3_file:
+                self.now_playing_model.update(titulo=self.metadata.titulo(mp3_file), time=0, duration=0)
+                self.now_playing_model.invalidate()
+        elif self.mode == "stream":
+            self._mostrar_stream(self.current_stream)
 
-            if self.mode == "mp3":
-                actual = self.mp3_actual()
-                if not actual:
-                    continue
 
-                titulo_actual = os.path.basename(actual)
-                tiempo = self.estado_reproduccion.get("time", 0)
-                duracion = self.estado_reproduccion.get("duration", 0)
-                volumen = int(self.estado_reproduccion.get("volume", 0))
-
-                if (
-                    titulo_actual != last_title
-                    or tiempo != last_time
-                    or duracion != last_duration
-                    or volumen != last_volume
-                ):
-                    last_title = titulo_actual
-                    last_time = tiempo
-                    last_duration = duracion
-                    last_volume = volumen
-
-                    await asyncio.to_thread(
-                        self.lcd_interface.display_mp3_info,
-                        titulo_actual,
-                        tiempo,
-                        duracion,
-                        volume_level=volumen
-                    )
+    async def _abrir(self):
+        if self.mode == "mp3":
+            await self.play_current_mp3()
+        elif self.mode == "stream":
+            await self.start_stream(self.current_stream)
 
 
-            elif self.mode == "stream":
-                now = time.time()
-                if now - self.last_battery_update > 10:
-                    self.last_battery_update = now
-                    await asyncio.to_thread(self.lcd_interface.update_battery_icon_only)
+    # el modelo avisa (en el loop) solo cuando cambia algo visible en la pantalla mp3
+    def _on_now_playing_change(self):
+        # en menu o con la pantalla apagada no se dibuja nada
+        if self.mode != "mp3" or self.en_menu or self.lcd_interface.dark:
+            return
+        self._mostrar_now_playing()
 
-            elif self.mode == "idle":
-                now = time.time()
-                if now - self.last_battery_update > 10:
-                    self.last_battery_update = now
-                    await asyncio.to_thread(self.lcd_interface.update_battery_icon_only)
 
+    def _mostrar_now_playing(self, force=False):
+        titulo, tiempo, duracion, volumen = self.now_playing_model.snapshot()
+        if titulo is None:
+            return
+        self.lcd_interface.display_mp3_info(titulo, tiempo, duracion, volume_level=volumen, force=force)
 
-    # detiene mpv
+
+    # el monitor de bateria avisa solo cuando cambia el relleno del icono
+    def _on_battery_change(self):
+        if self.en_menu or self.lcd_interface.dark:
+            return
+
+        if self.mode == "mp3":
+            # la capa de bateria es la unica que cambia
+            self._mostrar_now_playing()
+        else:
+            self.lcd_interface.update_battery_icon_only()
+
+
+    # detiene mpv (y vacia su playlist)
     async def stop_playback(self):
-        await asyncio.to_thread(self.mpv_player.stop)
+        self._ventana = []
+        await self.mpv.stop()
 
 
-    # reproduce stream actual
-    async def start_stream(self, stream_index: int):
-        if not self.streams or not (0 <= stream_index < len(self.streams)):
+    # pantalla del stream: su imagen, o OFFLINE si no tiene url
+    def _mostrar_stream(self, stream_index):
+        if not (0 <= stream_index < len(self.streams)):
             return
         entry = self.streams[stream_index]
-        stream_url = entry.get("url", "").strip()
-        await self.stop_playback()
-        self.mode = "stream"
-        self.current_stream = stream_index
-        # stream vacio
-        if not stream_url:
-            await self.stop_playback()
-            self.current_stream = stream_index  # marcar indice actual
-            
+        if not entry.get("url", "").strip():
             img = self.lcd_interface.draw_text_on_lcd(
                 f"STREAM {stream_index + 1}/{len(self.streams)}\nOFFLINE"
-            )    
+            )
             self.ultimo_frame_stream = img
             self.lcd_interface.display_image(img)
             return
-        
+
+        img_path = os.path.join(paths.STREAM_IMAGES_DIR,
+                                entry.get("image", "default-radio.png"))
+        self.ultimo_frame_stream = img_path
+        self.lcd_interface.display_image(img_path)
+        self.lcd_interface.update_battery_icon_only()
+
+
+    # reproduce stream actual (la pantalla ya la ha puesto _programar_apertura)
+    async def start_stream(self, stream_index: int):
+        if not self.streams or not (0 <= stream_index < len(self.streams)):
+            return
+        stream_url = self.streams[stream_index].get("url", "").strip()
+        # stream vacio
+        if not stream_url:
+            return
+
         try:
-            await asyncio.to_thread(self.mpv_player.play, stream_url)
-            self.mpv_player.pause = False
-            
-            entry = self.streams[stream_index]
-            img_path = os.path.join("/home/radiobit/stream/data/stream-images",
-                                    entry.get("image", "default-radio.png"))
-            
-            self.ultimo_frame_stream = img_path
-            self.lcd_interface.display_image(img_path)
-            self.lcd_interface.update_battery_icon_only()
+            self._ventana = []
+            self._esperado = 0
+            self._fichero_actual = None
+            await self.mpv.play(stream_url)
+            self.aperturas += 1
+            self._abierto = stream_url
         except Exception:
             img = self.lcd_interface.draw_text_on_lcd("ERROR\nPlay failed")
             self.lcd_interface.display_image(img)
@@ -449,10 +747,20 @@ class ControlReproduccion:
         return self.mode in ("mp3", "stream")
 
 
+    # helper. titulo de una pista de playlist o cola (id de self.tracks)
+    def titulo_pista(self, track_id):
+        return self.metadata.titulo(self.tracks.ruta(track_id))
+
+
+    # helper. titulos de todas las pistas de una lista de ids, de una vez (indices de los menus)
+    def titulos_pistas(self, track_ids):
+        return self.metadata.titulos(self.tracks.rutas(track_ids))
+
+
     # helper. entrega pista actual
     def mp3_actual(self):
         try:
-            return self.playback_queue[self.current_mp3_index]
+            return self.tracks.ruta(self.playback_queue[self.current_mp3_index])
         except (IndexError, TypeError):
             return None
 
@@ -464,23 +772,34 @@ class ControlReproduccion:
         mp3_file = self.mp3_actual()
         if mp3_file:
             self.ultimo_frame_stream = None
+            objetivo = (self.current_mp3_index, mp3_file)
+            pos = self._ventana.index(objetivo) if objetivo in self._ventana else None
             try:
-                await self.stop_playback()
-                await asyncio.sleep(0.05)
-                await asyncio.to_thread(self.mpv_player.play, mp3_file)
-                self.mpv_player.pause = False
+                if pos == 0 and self._abierto == mp3_file:
+                    # es la que suena: al principio sin volver a abrirla
+                    await self.mpv.restart()
+                elif pos:
+                    # ya esta en la playlist de mpv (y precargada si es la siguiente)
+                    self._esperado = pos
+                    self._fichero_actual = None
+                    await self.mpv.playlist_jump(pos)
+                else:
+                    # loadfile sustituye lo que suene, no hace falta parar antes
+                    self._ventana = [objetivo]
+                    nuevas = self._rellenar_ventana()
+                    self._esperado = 0
+                    self._fichero_actual = None
+                    await self.mpv.load_playlist([mp3_file] + nuevas)
+                self.aperturas += 1
+                self._abierto = mp3_file
+                self.now_playing_model.update(titulo=self.metadata.titulo(mp3_file))
+                self.now_playing_model.invalidate()
             except Exception as e:
                 print(f"Error al reproducir mp3: {e}")
 
 
-    # cambio manual stream
+    # cambio manual stream (las pulsaciones rapidas se agrupan en la cola)
     async def change_stream(self, direction):
-        now = time.time()
-        if now - self.last_change_time < 1.0:
-            return
-        
-        self.last_change_time = now
-
         if not self.streams:
             return
 
@@ -489,13 +808,8 @@ class ControlReproduccion:
         else:
             next_index = (self.current_stream - 1 + len(self.streams)) % len(self.streams)
 
-        prev_stream = self.current_stream
-
         await self.transition("PLAY_STREAM", next_index)
 
-        if self.current_stream != prev_stream:
-            self.last_change_time = now
-
 
     # cambio manual mp3
     async def change_mp3(self, direction):
@@ -530,11 +844,17 @@ class ControlReproduccion:
 
     # idle mode
     async def enter_idle(self):
+        await self.transition("IDLE")
+
+
+    async def _entrar_idle(self):
+        self._apertura = None
         await self.stop_playback()
-        self.mpv_player.pause = False
+        await self.mpv.set("pause", False)
+        self._abierto = None
         self.mode = "idle"
         self.ultimo_titulo = None
-        self.playback_queue = []
+        self.playback_queue = array("i")
         self.current_mp3_index = 0
 
         # pantalla idle
@@ -549,7 +869,7 @@ class ControlReproduccion:
         if not self.is_playing():
             return
         
-        self.mpv_player.pause = not self.mpv_player.pause
+        await self.mpv.toggle_pause()
 
 
     # volumen
@@ -558,17 +878,21 @@ class ControlReproduccion:
             return
         
         if direction == "up":
-            self.mpv_player.volume = min(self.mpv_player.volume + 3, 120)
+            volumen = await self.mpv.add_volume(3)
         elif direction == "down":
-            self.mpv_player.volume = max(self.mpv_player.volume - 3, 0)
+            volumen = await self.mpv.add_volume(-3)
+        else:
+            return
+        self.now_playing_model.update(volume=volumen)
 
 
     # retroceso/avance rapido
     async def seek(self, seconds):
-        if self.mode == "mp3" and self.estado_reproduccion["duration"] > 0:
-            new_time = max(0, min(self.estado_reproduccion["time"] + seconds, self.estado_reproduccion["duration"]))
-            await asyncio.to_thread(self.mpv_player.seek, new_time, "absolute")
-            self.estado_reproduccion["time"] = new_time
+        if self.mode == "mp3":
+            # el limite se calcula en el hilo del bridge con la posicion real de mpv
+            new_time = await self.mpv.seek_relative(seconds)
+            if new_time is not None:
+                self.now_playing_model.update(time=new_time)
 
 
 
@@ -577,17 +901,11 @@ class ControlReproduccion:
     # reinicia mpv (video ON/OFF)
     def reboot_player(self):
         # actualizar/crear mpv con la opcion actual
-        self._create_mpv()
+        self.mpv.recreate()
 
-        # reanudar reproduccion
-        try:
-            if self.loop and self.loop.is_running():
-                if self.mode == "stream":
-                    asyncio.run_coroutine_threadsafe(self.start_stream(self.current_stream), self.loop)
-                else:
-                    asyncio.run_coroutine_threadsafe(self.play_current_mp3(), self.loop)
-        except Exception:
-            pass
+        # reanudar reproduccion (en la cola, despues de crear el player)
+        if self.loop and self.loop.is_running():
+            self._post("RELOAD")
 
 
     # replaygain album/track
@@ -601,7 +919,7 @@ class ControlReproduccion:
 
         # Aplicar el cambio en mpv
         try:
-            self.mpv_player.replaygain = self.replaygain_mode
+            await self.mpv.set("replaygain", self.replaygain_mode)
         except Exception:
             pass
         
@@ -611,18 +929,10 @@ class ControlReproduccion:
             self.lcd_interface.display_image(self.ultimo_frame_stream)
             self.lcd_interface.update_battery_icon_only()
         elif self.mode == "mp3":
-            mp3_file = self.mp3_actual()
-            if mp3_file:
-                titulo = os.path.basename(mp3_file)
-                img = self.lcd_interface.create_mp3_snapshot(
-                    titulo,
-                    self.estado_reproduccion.get("time", 0),
-                    self.estado_reproduccion.get("duration", 0),
-                    volume_level=int(self.estado_reproduccion.get("volume", 0))
-                )
-
-                self.lcd_interface.display_image(img)
-                self.ultimo_frame_mp3 = img
+            if self.mp3_actual():
+                # reutiliza las capas ya dibujadas de la pantalla de reproduccion
+                self._mostrar_now_playing(force=True)
+                self.ultimo_frame_mp3 = self.lcd_interface.now_playing.frame
             return
 
         elif self.mode == "idle":
@@ -635,6 +945,15 @@ class ControlReproduccion:
             return
 
 
+    # al despertar la pantalla: repinta el estado actual (o el menu abierto)
+    def _on_wake(self):
+        if self.en_menu:
+            if self.lcd_interface.current_image is not None:
+                self.lcd_interface.display_image(self.lcd_interface.current_image)
+        else:
+            self.refresh_display()
+
+
     def display_free_text(self, texto):
         max_chars = 20
 
@@ -652,7 +971,6 @@ class ControlReproduccion:
             raise ValueError("Opciones y callbacks deben tener la misma longitud")
 
         self.en_menu = True
-#        await self.pause_update_loop()  # pausa update_loop
         seleccion = 0
         total = len(opciones)
 
@@ -679,31 +997,25 @@ class ControlReproduccion:
                 break
 
         self.en_menu = False
-#        self.resume_update_loop()  # reanuda update_loop
         await self.cerrar_menu_async()
         self.refresh_display()
 
 
-    async def pause_update_loop(self):
-        """Cancela temporalmente update_loop."""
-        if self.update_task:
-            self.update_task.cancel()
-            try:
-                await self.update_task
-            except asyncio.CancelledError:
-                pass
-            self.update_task = None
-
-
-    def resume_update_loop(self):
-        """Vuelve a lanzar update_loop si estaba pausado."""
-        if not self.update_task:
-            self.update_task = asyncio.create_task(self.update_loop())
-
-
+    ###### --------------- MENU PLAYLIST / TRACK / SYSTEM --------------- ######
 
+    async def _lista_navegable(self, clave, lista, nombres, pagina):
+        """
+        Indice de letras de una lista de menu (nombres(lista) da sus textos),
+        reutilizado mientras la lista no cambie. Se construye en un hilo: los
+        titulos de las pistas salen de SQLite.
+        """
+        guardado = self.nav_cache.get(clave)
+        if guardado is not None and guardado[0] is lista and guardado[1].total == len(lista):
+            return guardado[1]
+        nav = await asyncio.to_thread(lambda: ListaNavegable(nombres(lista), pagina))
+        self.nav_cache.put(clave, (lista, nav))
+        return nav
 
-    ###### --------------- MENU PLAYLIST / TRACK / SYSTEM --------------- ######
 
     # menu pistas
     async def seleccionar_pista(self, leer_entrada, playlist_index, playlist_tracks):
@@ -715,6 +1027,10 @@ class ControlReproduccion:
             indice = 0
         ventana_size = 10
         offset = 0
+        nav = await self._lista_navegable(
+            ("pistas", playlist_index), playlist,
+            self.titulos_pistas, ventana_size
+        )
 
         self.en_menu = True
 
@@ -726,7 +1042,7 @@ class ControlReproduccion:
 
             lineas = []
             for i in range(offset, min(offset + ventana_size, total)):
-                nombre = os.path.basename(playlist[i]).replace("_", " ")
+                nombre = self.titulo_pista(playlist[i])
                 prefijo = "> " if i == indice else "  "
                 reproduciendo = "* " if (self.current_playlist == playlist_index and i == self.current_mp3_index) else ""
 
@@ -734,12 +1050,10 @@ class ControlReproduccion:
 
             await self.mostrar_menu_async(lineas, indice - offset, titulo=f"TRACK {indice + 1}/{total}")
 
-            entrada = await leer_entrada()
+            entrada = await leer_entrada(navegar=True)
 
-            if entrada == "abajo":
-                indice = (indice + 1) % total
-            elif entrada == "arriba":
-                indice = (indice - 1) % total
+            if isinstance(entrada, Movimiento):
+                indice = nav.aplicar(indice, entrada)
             elif entrada == "enter":
                 if self.mode != "mp3" or not self.playback_queue or self.current_playlist != playlist_index:
                     await self.play_playlist(playlist_index, indice)
@@ -770,6 +1084,10 @@ class ControlReproduccion:
         cursor_index = self.current_playlist
         ventana_size = 10
         offset = 0
+        nav = await self._lista_navegable(
+            "playlists", self.playlists,
+            lambda cabeceras: [cabecera.name for cabecera in cabeceras], ventana_size
+        )
 
         while True:
             if cursor_index < offset:
@@ -779,20 +1097,22 @@ class ControlReproduccion:
 
             lineas = []
             for i in range(offset, min(offset + ventana_size, total)):
-                nombre = os.path.basename(os.path.dirname(self.playlists[i][0]))
+                nombre = self.playlists[i].name
                 prefijo = "> " if i == cursor_index else "  "
                 reproduciendo = "* " if i == self.current_playlist else ""
                 lineas.append(prefijo + reproduciendo + nombre)
 
-            await self.mostrar_menu_async(lineas, cursor_index - offset, titulo=f"PLAYLIST {cursor_index + 1}/{total}")
+            titulo = f"PLAYLIST {cursor_index + 1}/{total}"
+            duracion = self.playlists[cursor_index].duration
+            if duracion:
+                titulo += f" {duracion_corta(duracion)}"
+            await self.mostrar_menu_async(lineas, cursor_index - offset, titulo=titulo)
 
 
-            entrada = await leer_entrada()
+            entrada = await leer_entrada(navegar=True)
 
-            if entrada == "arriba":
-                cursor_index = (cursor_index - 1) % total
-            elif entrada == "abajo":
-                cursor_index = (cursor_index + 1) % total
+            if isinstance(entrada, Movimiento):
+                cursor_index = nav.aplicar(cursor_index, entrada)
             elif entrada == "enter":
                 if self.mode != "mp3" or not self.playback_queue or self.current_playlist != cursor_index:
                     await self.play_playlist(cursor_index, 0)
@@ -800,7 +1120,10 @@ class ControlReproduccion:
             elif entrada == "extra":
                 # Abrir menu de pistas de la playlist bajo el cursor
                 playlist_index = cursor_index
-                playlist_tracks = self.playlists[playlist_index][1]  # lista de pistas de esa playlist
+                # las pistas se leen ahora, no al arrancar
+                playlist_tracks = await self._cargar_pistas(self.playlists[playlist_index].path)
+                if not playlist_tracks:
+                    break
 
                 # Abrir menu de pistas SIN tocar estado global
                 await self.seleccionar_pista(
@@ -821,19 +1144,20 @@ class ControlReproduccion:
     # menu system
     async def menu_system(self, leer_entrada):
         self.en_menu = True
-        was_paused = self.mpv_player.pause
+        estado = self.mpv.telemetry
+        was_paused = estado.pause
         self.frame_pause_snapshot = None
 
         if was_paused:
             if self.mode == "mp3":
                 mp3_file = self.mp3_actual()
                 if mp3_file:
-                    titulo = os.path.basename(mp3_file)
+                    titulo = self.metadata.titulo(mp3_file)
                     self.frame_pause_snapshot = self.lcd_interface.create_mp3_snapshot(
                         titulo,
-                        self.estado_reproduccion.get("time", 0),
-                        self.estado_reproduccion.get("duration", 0),
-                        volume_level=int(self.estado_reproduccion.get("volume", 0))
+                        int(estado.time),
+                        int(estado.duration),
+                        volume_level=estado.volume
                     )
             elif self.mode == "stream":
                 self.frame_pause_snapshot = self.ultimo_frame_stream
@@ -875,7 +1199,7 @@ class ControlReproduccion:
                 
                 
                 elif seleccion == 1:
-                    self.repetir_playlist = not self.repetir_playlist
+                    await self.transition("REPEAT", not self.repetir_playlist)
                     self.refresh_display()
                     break
 
@@ -919,7 +1243,7 @@ class ControlReproduccion:
                     await self.cerrar_menu_async()
                     await self.close()  # asegura cerrar streams
                     img = self.lcd_interface.draw_text_on_lcd("Power down...")
-                    self.lcd_interface.display_image(img)
+                    await self.lcd_interface.display_image_async(img)
                     await asyncio.sleep(0.5)
                     self.lcd_interface.screen_locked = True
                     os.system("sync")
@@ -1148,11 +1472,18 @@ class ControlReproduccion:
 
     # detiene tareas y cierra mpv
     async def close(self):
-        if self.update_task:
-            self.update_task.cancel()
+        if self.watcher:
+            self.watcher.close()  # se queda en self.watcher: sus contadores siguen valiendo
+        if self._tarea_acciones:
+            self._tarea_acciones.cancel()
             try:
-                await self.update_task
+                await self._tarea_acciones
             except asyncio.CancelledError:
                 pass
-        await asyncio.to_thread(self.mpv_player.terminate)
+            self._tarea_acciones = None
+        await self.scanner.close()
+        await self.mpv.close()
+        # cerrar las bases quita su marca: el siguiente arranque no las comprueba
+        self.library.close()
+        self.metadata.close()
 
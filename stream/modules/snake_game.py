@@ -1,15 +1,14 @@
 import asyncio
 import random
 from PIL import Image, ImageDraw
-import RPi.GPIO as GPIO
 
-# Pines
-JOYSTICK_UP = 19
-JOYSTICK_DOWN = 6
-JOYSTICK_LEFT = 5
-JOYSTICK_RIGHT = 26
-KEY2 = 20
-KEY3 = 16
+# direccion de cada boton del joystick (pantalla girada)
+DIRECCIONES = {
+    "right": (0, -1),
+    "left": (0, 1),
+    "down": (-1, 0),
+    "up": (1, 0),
+}
 
 CELL_SIZE = 10
 GRID_WIDTH = 24
@@ -80,45 +79,24 @@ class SnakeGame:
             pass
         self.lcd.display_image(image)
 
-async def run_snake(lcd):
-    GPIO.setmode(GPIO.BCM)
-    for pin in [JOYSTICK_UP, JOYSTICK_DOWN, JOYSTICK_LEFT, JOYSTICK_RIGHT, KEY2, KEY3]:
-        GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-
+async def run_snake(lcd, inputs):
     game = SnakeGame(lcd)
-
-    last_states = {
-        JOYSTICK_UP: 1,
-        JOYSTICK_DOWN: 1,
-        JOYSTICK_LEFT: 1,
-        JOYSTICK_RIGHT: 1,
-        KEY2: 1,
-        KEY3: 1,
-    }
+    inputs.clear()
 
     try:
         while True:
-            for pin in last_states:
-                current = GPIO.input(pin)
-                if last_states[pin] == 1 and current == 0:
-                    if pin == JOYSTICK_RIGHT:
-                        game.change_direction((0, -1))
-                        lcd.update_activity()
-                    elif pin == JOYSTICK_LEFT:
-                        game.change_direction((0, 1))
-                        lcd.update_activity()
-                    elif pin == JOYSTICK_DOWN:
-                        game.change_direction((-1, 0))
-                        lcd.update_activity()
-                    elif pin == JOYSTICK_UP:
-                        game.change_direction((1, 0))
-                        lcd.update_activity()
-                    elif pin == KEY2 and game.game_over:
-                        game.reset_game()
-                        lcd.update_activity()
-                    elif pin == KEY3:
-                        raise KeyboardInterrupt
-                last_states[pin] = current
+            # pulsaciones llegadas desde el ultimo tick
+            for evento in inputs.drain():
+                if evento.kind != "press":
+                    continue
+                if evento.button in DIRECCIONES:
+                    game.change_direction(DIRECCIONES[evento.button])
+                    lcd.update_activity()
+                elif evento.button == "key2" and game.game_over:
+                    game.reset_game()
+                    lcd.update_activity()
+                elif evento.button == "key3":
+                    raise KeyboardInterrupt
 
             game.update()
             game.draw()
@@ -126,5 +104,3 @@ async def run_snake(lcd):
     except KeyboardInterrupt:
         image = Image.new("RGB", (lcd.width, lcd.height), "black")
         lcd.display_image(image)
-
-
@@ -0,0 +1,86 @@
+import time
+
+import numpy as np
+import RPi.GPIO as GPIO
+
+
+SPIDEV_BUFSIZ = "/sys/module/spidev/parameters/bufsiz"
+
+
+def kernel_bufsiz(default=4096):
+    """Tamaño maximo de transferencia del driver spidev (parametro bufsiz)."""
+    try:
+        with open(SPIDEV_BUFSIZ) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return default
+
+
+class SPITransport:
+    """
+    Escritura de comandos y framebuffers al ST7789.
+
+    Los framebuffers se envian con writebytes2 directamente desde un
+    memoryview del array RGB565 (sin copiarlo ni pasarlo a lista), en trozos
+    del tamaño de spidev.bufsiz, y el pin DC solo se cambia cuando pasa de
+    comando a datos o al reves.
+    """
+
+    def __init__(self, spi, dc_pin):
+        self.spi = spi
+        self.dc_pin = dc_pin
+        self.chunk = kernel_bufsiz()
+        self._dc = None
+        self._zero_copy = hasattr(spi, "writebytes2")
+
+        # contadores
+        self.bytes_sent = 0
+        self.bursts = 0
+        self.busy_time = 0.0
+
+
+    def _set_dc(self, level):
+        if level != self._dc:
+            GPIO.output(self.dc_pin, level)
+            self._dc = level
+
+
+    def command(self, cmd):
+        self._set_dc(GPIO.LOW)
+        self.spi.writebytes([cmd])
+
+
+    def data(self, values):
+        """Datos cortos (parametros de comandos)."""
+        self._set_dc(GPIO.HIGH)
+        self.spi.writebytes(list(values))
+
+
+    def write(self, buf):
+        """Envia un buffer (array numpy, bytes...) como una rafaga de datos."""
+        if isinstance(buf, np.ndarray) and not buf.flags.c_contiguous:
+            buf = np.ascontiguousarray(buf)
+        mv = memoryview(buf).cast("B")
+        total = len(mv)
+
+        inicio = time.perf_counter()
+        self._set_dc(GPIO.HIGH)
+        for i in range(0, total, self.chunk):
+            trozo = mv[i:i + self.chunk]
+            if self._zero_copy:
+                self.spi.writebytes2(trozo)
+            else:
+                self.spi.xfer(trozo.tolist())
+
+        self.busy_time += time.perf_counter() - inicio
+        self.bytes_sent += total
+        self.bursts += 1
+
+
+    def stats(self):
+        return {
+            "bytes": self.bytes_sent,
+            "bursts": self.bursts,
+            "busy_time": self.busy_time,
+            "throughput": self.bytes_sent / self.busy_time if self.busy_time else 0.0,
+        }
@@ -0,0 +1,162 @@
+from functools import lru_cache
+
+from PIL import ImageFont
+
+from modules.lru import LRUCache
+
+
+FONT_BOLD = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+FONT_MENU = "DejaVuSans.ttf"
+
+# diferencia maxima entre el avance y el ancho del bbox (bearings del primer
+# y ultimo glifo). Dentro de este margen se mide con el bbox real.
+BBOX_MARGIN = 4
+
+
+@lru_cache(maxsize=None)
+def get_font(path, size):
+    """Fuente cargada una sola vez por (ruta, tamaño)."""
+    try:
+        return ImageFont.truetype(path, size)
+    except IOError:
+        return ImageFont.load_default()
+
+
+@lru_cache(maxsize=None)
+def get_layout(path, size):
+    """TextLayout compartido por (ruta, tamaño)."""
+    return TextLayout(get_font(path, size))
+
+
+class TextLayout:
+    """
+    Medidas de texto para una fuente.
+
+    El ancho se calcula sumando una tabla de avances por glifo (y el kerning
+    por pareja), sin pasar por FreeType; solo cuando el resultado esta cerca
+    del limite se confirma con el bbox real, asi el corte de lineas es el
+    mismo que con draw.textbbox. Los resultados de wrap y truncate se
+    guardan en un LRU.
+    """
+
+    def __init__(self, font, cache_size=512):
+        self.font = font
+        self.line_height = font.getbbox("A")[3]
+        self._adv = {}
+        self._kern = {}
+        self._widths = LRUCache(cache_size * 4)
+        self._wraps = LRUCache(cache_size)
+        self._truncs = LRUCache(cache_size)
+
+
+    def _glyph(self, ch):
+        adv = self._adv.get(ch)
+        if adv is None:
+            adv = self._adv[ch] = self.font.getlength(ch)
+        return adv
+
+
+    def _pair(self, a, b):
+        par = a + b
+        kern = self._kern.get(par)
+        if kern is None:
+            kern = self._kern[par] = self.font.getlength(par) - self._glyph(a) - self._glyph(b)
+        return kern
+
+
+    def advance(self, texto):
+        """Avance horizontal del texto usando las tablas."""
+        total = 0
+        prev = None
+        for ch in texto:
+            total += self._glyph(ch)
+            if prev is not None:
+                total += self._pair(prev, ch)
+            prev = ch
+        return total
+
+
+    def width(self, texto):
+        """Ancho exacto (bbox), como draw.textbbox((0, 0), texto)."""
+        w = self._widths.get(texto)
+        if w is None:
+            bbox = self.font.getbbox(texto)
+            w = bbox[2] - bbox[0]
+            self._widths.put(texto, w)
+        return w
+
+
+    def fits(self, texto, max_width, avance=None):
+        if avance is None:
+            avance = self.advance(texto)
+        if avance <= max_width - BBOX_MARGIN:
+            return True
+        if avance > max_width + BBOX_MARGIN:
+            return False
+        return self.width(texto) <= max_width
+
+
+    def wrap(self, texto, max_width, keep_empty=True):
+        """
+        Parte un parrafo en lineas de como mucho max_width pixeles, palabra a
+        palabra. keep_empty conserva la linea vacia que queda cuando la primera
+        palabra ya no cabe (comportamiento original de la pantalla de titulo).
+        """
+        key = (texto, max_width, keep_empty)
+        lineas = self._wraps.get(key)
+        if lineas is not None:
+            return lineas
+
+        lineas = []
+        actual = ""
+        avance = 0
+        espacio = self._glyph(" ")
+
+        for word in texto.split():
+            adv_word = self.advance(word)
+            if actual:
+                prueba = f"{actual} {word}"
+                adv_prueba = (avance + self._pair(actual[-1], " ") + espacio
+                              + self._pair(" ", word[0]) + adv_word)
+            else:
+                prueba = word
+                adv_prueba = adv_word
+
+            if self.fits(prueba, max_width, adv_prueba):
+                actual, avance = prueba, adv_prueba
+            else:
+                if actual or keep_empty:
+                    lineas.append(actual)
+                actual, avance = word, adv_word
+
+        if actual:
+            lineas.append(actual)
+
+        lineas = tuple(lineas)
+        self._wraps.put(key, lineas)
+        return lineas
+
+
+    def truncate(self, texto, max_width, suffix="..."):
+        """Prefijo mas largo de texto que con suffix cabe en max_width (busqueda binaria)."""
+        if self.width(texto) <= max_width:
+            return texto
+
+        key = (texto, max_width, suffix)
+        truncado = self._truncs.get(key)
+        if truncado is not None:
+            return truncado
+
+        lo, hi = 1, len(texto)
+        truncado = texto
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            prueba = texto[:mid] + suffix
+            if self.fits(prueba, max_width):
+                truncado = prueba
+                lo = mid + 1
+            else:
+                hi = mid - 1
+
+        self._truncs.put(key, truncado)
+        return truncado
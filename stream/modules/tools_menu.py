@@ -4,6 +4,7 @@ import re
 import subprocess
 
 from modules.snake_game import run_snake
+from modules.paths import STREAMS_FILE
 
 
 class Tools:
@@ -38,7 +39,7 @@ class Tools:
         self.control.lcd_interface.display_image(img)
 
         nuevos_streams = await self.control.resolve_all_npubs(
-            self.control.load_streams("/home/radiobit/stream/data/streams.json")
+            self.control.load_streams(STREAMS_FILE)
         )
 
         self.control.streams = nuevos_streams
@@ -51,44 +52,8 @@ class Tools:
     async def refresh_playlists(self):
         await self.control.cerrar_menu_async()
 
-        ruta_actual = (
-            self.control.playlists[self.control.current_playlist][0]
-            if self.control.playlists else None
-        )
-
-        pista_actual = self.control.mp3_actual()
-
-        self.control.playlists = self.control.load_playlists(
-            self.control.mp3_directory
-        )
-
-        nuevo_indice_playlist = 0
-        nuevo_indice_pista = 0
-
-        if ruta_actual:
-            for i, (ruta, pistas) in enumerate(self.control.playlists):
-                if ruta == ruta_actual:
-                    nuevo_indice_playlist = i
-
-                    if pista_actual:
-                        try:
-                            nuevo_indice_pista = pistas.index(pista_actual)
-                        except ValueError:
-                            nuevo_indice_pista = 0
-
-                    break
-
-        self.control.current_playlist = nuevo_indice_playlist
-
-        self.control.playback_queue = (
-            self.control.playlists[self.control.current_playlist][1]
-            if self.control.playlists else []
-        )
-
-        self.control.current_mp3_index = (
-            nuevo_indice_pista
-            if self.control.playback_queue else 0
-        )
+        # el indice solo vuelve a leer las carpetas y .m3u que han cambiado
+        await self.control.refresh_playlists()
 
         img = self.control.lcd_interface.draw_text_on_lcd(
             "Playlists updated"
@@ -149,7 +114,7 @@ class Tools:
     async def play_snake(self):
         await self.control.cerrar_menu_async()
 
-        await run_snake(self.control.lcd_interface)
+        await run_snake(self.control.lcd_interface, self.control.inputs)
 
         self.control.refresh_display()
 
@@ -0,0 +1,138 @@
+import os
+import threading
+from array import array
+
+import numpy as np
+
+
+COMPACTAR = 4096  # rutas nuevas que se juntan en el dict antes de pasarlas al indice ordenado
+
+
+def posicion(ids, track_id):
+    """Primera posicion de `track_id` en un array('i') de ids, o None (vectorizado, sin crear ints)."""
+    if track_id is None or not len(ids):
+        return None
+    encontradas = np.flatnonzero(np.frombuffer(ids, dtype=np.intc) == track_id)
+    return int(encontradas[0]) if len(encontradas) else None
+
+
+def contiene(ids, track_ids):
+    """True si alguno de `track_ids` esta en el array('i') `ids`."""
+    if not len(ids) or not track_ids:
+        return False
+    return bool(np.isin(np.frombuffer(ids, dtype=np.intc), np.array(track_ids, dtype=np.intc)).any())
+
+
+class TrackTable:
+    """
+    Todas las pistas conocidas, una sola vez cada una y con un id entero
+    estable. Playlists y cola guardan ids en array('i'): 4 bytes por pista
+    en lugar de un str con la ruta entera.
+
+    Las rutas no se guardan como str: la carpeta es un prefijo internado que
+    comparten todas sus pistas y los nombres van seguidos en un bytearray,
+    con sus offsets en un array. ruta(id) la recompone al vuelo.
+
+    El indice ruta -> id son los hashes de las rutas ordenados (numpy) con
+    su id al lado; lo añadido desde la ultima compactacion espera en un dict.
+    Los ids no se reutilizan: una pista borrada del disco se queda en la
+    tabla hasta el siguiente arranque.
+
+    Las lecturas no bloquean; las altas (desde los hilos del rescan) van
+    con lock.
+    """
+
+    __slots__ = ("_carpetas", "_id_carpeta", "_carpeta", "_inicio", "_nombres", "_indice", "_nuevas", "_lock")
+
+    def __init__(self):
+        self._carpetas = []          # prefijos ("/.../album/")
+        self._id_carpeta = {}        # prefijo -> posicion en _carpetas
+        self._carpeta = array("I")   # id -> prefijo
+        self._inicio = array("I", [0])  # nombre del id i: _nombres[_inicio[i]:_inicio[i + 1]]
+        self._nombres = bytearray()
+        self._indice = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32))  # hashes, ids
+        self._nuevas = {}            # ruta -> id, aun fuera de _indice
+        self._lock = threading.Lock()
+
+
+    def __len__(self):
+        return len(self._carpeta)
+
+
+    def ruta(self, track_id):
+        inicio = self._inicio
+        nombre = self._nombres[inicio[track_id]:inicio[track_id + 1]]
+        return self._carpetas[self._carpeta[track_id]] + nombre.decode("utf-8", "surrogateescape")
+
+
+    def buscar(self, ruta):
+        """Id de `ruta`, o None si no esta en la tabla."""
+        track_id = self._nuevas.get(ruta)
+        if track_id is not None:
+            return track_id
+        hashes, ids = self._indice
+        h = hash(ruta)
+        i = int(np.searchsorted(hashes, h))
+        # varias rutas pueden compartir hash (en 32 bits no es raro con 50k pistas)
+        while i < len(hashes) and hashes[i] == h:
+            candidato = int(ids[i])
+            if self.ruta(candidato) == ruta:
+                return candidato
+            i += 1
+        return None
+
+
+    def id(self, ruta):
+        """Id de `ruta`; la añade si no estaba."""
+        track_id = self.buscar(ruta)
+        if track_id is None:
+            with self._lock:
+                track_id = self.buscar(ruta)
+                if track_id is None:
+                    track_id = self._añadir(ruta)
+        return track_id
+
+
+    def ids(self, rutas):
+        return array("i", map(self.id, rutas))
+
+
+    def rutas(self, ids):
+        return [self.ruta(track_id) for track_id in ids]
+
+
+    def compactar(self):
+        """Pasa las rutas nuevas al indice ordenado (despues de una carga grande)."""
+        with self._lock:
+            self._compactar()
+
+
+    def _añadir(self, ruta):
+        corte = ruta.rfind(os.sep) + 1
+        carpeta = ruta[:corte]
+        indice_carpeta = self._id_carpeta.get(carpeta)
+        if indice_carpeta is None:
+            indice_carpeta = self._id_carpeta[carpeta] = len(self._carpetas)
+            self._carpetas.append(carpeta)
+
+        track_id = len(self._carpeta)
+        self._nombres += ruta[corte:].encode("utf-8", "surrogateescape")
+        self._inicio.append(len(self._nombres))
+        self._carpeta.append(indice_carpeta)
+        self._nuevas[ruta] = track_id
+        if len(self._nuevas) >= COMPACTAR:
+            self._compactar()
+        return track_id
+
+
+    def _compactar(self):
+        nuevas = self._nuevas
+        if not nuevas:
+            return
+        hashes, ids = self._indice
+        hashes = np.concatenate((hashes, np.fromiter(map(hash, nuevas), np.int64, len(nuevas))))
+        ids = np.concatenate((ids, np.fromiter(nuevas.values(), np.int32, len(nuevas))))
+        orden = np.argsort(hashes, kind="stable")
+        # primero el indice nuevo y despues el dict vacio: quien lee siempre encuentra la ruta
+        self._indice = (hashes[orden], ids[orden])
+        self._nuevas = {}
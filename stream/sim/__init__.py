@@ -0,0 +1,73 @@
+"""
+Simulador del hardware de Radiobit para ejecutar main.py sin la Raspberry Pi.
+
+install() registra en sys.modules sustitutos de RPi.GPIO, spidev, sugarpie y
+mpv antes de que se importe la aplicacion:
+
+    import sim
+    board = sim.install()
+    import main
+
+o directamente:
+
+    python3 -m sim --timeline pulsaciones.jsonl --screenshot final.png
+"""
+import os
+import sys
+import tempfile
+
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+
+class Board:
+    """Hardware simulado: GPIO, panel ST7789 y PiSugar."""
+
+    def __init__(self, gpio, panel, pisugar, home):
+        self.gpio = gpio
+        self.panel = panel
+        self.pisugar = pisugar
+        self.home = home
+
+
+    def screenshot(self, path=None):
+        img = self.panel.screenshot()
+        if path:
+            img.save(path)
+        return img
+
+
+def install(home=None, dc_pin=25, pisugar=None):
+    """
+    Instala los modulos simulados y devuelve el Board. `home` hace de
+    /home/radiobit; si no se da se crea uno temporal con los datos de ejemplo
+    del repositorio.
+    """
+    from sim.gpio import SimGPIO
+    from sim.st7789 import VirtualST7789, spidev_module
+    from sim.pisugar import FakePisugar, sugarpie_module
+    from sim.mpv_stub import mpv_module
+
+    if "modules.paths" in sys.modules:
+        raise RuntimeError("sim.install() debe llamarse antes de importar la aplicacion")
+
+    if home is None:
+        home = tempfile.mkdtemp(prefix="radiobit-sim-")
+        os.makedirs(os.path.join(home, "stream"), exist_ok=True)
+        os.symlink(DATA_DIR, os.path.join(home, "stream", "data"))
+    os.environ["RADIOBIT_HOME"] = home
+
+    gpio = SimGPIO()
+    panel = VirtualST7789(gpio, dc_pin=dc_pin)
+    pisugar = pisugar or FakePisugar()
+
+    rpi = type(sys)("RPi")
+    rpi.GPIO = gpio
+    sys.modules["RPi"] = rpi
+    sys.modules["RPi.GPIO"] = gpio
+    sys.modules["spidev"] = spidev_module(panel)
+    sys.modules["sugarpie"] = sugarpie_module(pisugar)
+    sys.modules["mpv"] = mpv_module()
+    sys.modules["pigpio"] = None  # sin pigpiod: Backlight usa el GPIO simulado
+
+    return Board(gpio, panel, pisugar, home)
@@ -0,0 +1,101 @@
+"""
+Ejecuta main.py con el hardware simulado.
+
+    python3 -m sim [--home DIR] [--timeline FICHERO] [--speed X]
+                   [--seconds N] [--screenshot PNG] [--stats]
+
+Sin --seconds corre hasta Ctrl+C; con --timeline termina 2 s despues de la
+ultima pulsacion.
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sim  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="python3 -m sim", description="Radiobit sin Raspberry Pi")
+    parser.add_argument("--home", help="directorio que hace de /home/radiobit (por defecto uno temporal)")
+    parser.add_argument("--timeline", help="pulsaciones a reproducir (JSON lines)")
+    parser.add_argument("--speed", type=float, default=1.0, help="velocidad de reproduccion del timeline")
+    parser.add_argument("--seconds", type=float, help="segundos hasta cerrar la aplicacion")
+    parser.add_argument("--screenshot", help="guarda lo que muestra el panel al terminar (PNG)")
+    parser.add_argument("--stats", action="store_true", help="imprime contadores en JSON al terminar")
+    return parser.parse_args()
+
+
+def collect_stats(board, app):
+    lcd = app.interfaz_lcd
+    return {
+        "panel": board.panel.stats(),
+        "spi": lcd.transport.stats(),
+        "display": {
+            "frames_rendered": lcd.display.frames_rendered,
+            "frames_dropped": lcd.display.frames_dropped,
+            "max_latency": lcd.display.max_latency,
+        },
+        "input": {
+            "edges": app.entrada.edges,
+            "bounces": app.entrada.bounces,
+            "events": app.entrada.events,
+            "max_latency": app.entrada.max_latency,
+        },
+        "mpv": app.control_reproduccion.mpv.stats_dict(),
+        "playback": {
+            "actions": app.control_reproduccion.acciones_recibidas,
+            "skips_coalesced": app.control_reproduccion.saltos_agrupados,
+            "files_opened": app.control_reproduccion.aperturas,
+            "gapless_advances": app.control_reproduccion.avances_gapless,
+        },
+        "library_watcher": _watcher_stats(app.control_reproduccion.watcher),
+        "metadata": {
+            "cached": len(app.control_reproduccion.metadata),
+            "passes": app.control_reproduccion.scanner.passes,
+            "extracted": app.control_reproduccion.scanner.extracted,
+            "failed": app.control_reproduccion.scanner.failed,
+        },
+        "battery_reads": board.pisugar.reads,
+    }
+
+
+def _watcher_stats(watcher):
+    if watcher is None:
+        return None
+    return {"watches": watcher.watches, "events": watcher.events, "flushes": watcher.flushes}
+
+
+async def run(board, app, args):
+    tarea = asyncio.create_task(app.main())
+
+    segundos = args.seconds
+    if args.timeline:
+        from sim.timeline import Timeline
+        timeline = Timeline.load(args.timeline)
+        timeline.play(board.gpio, speed=args.speed)
+        if segundos is None:
+            segundos = timeline.duration / args.speed + 2
+
+    if segundos is not None:
+        await asyncio.sleep(segundos)
+        signal.raise_signal(signal.SIGINT)
+    await tarea
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    board = sim.install(home=args.home)
+
+    import main as app  # noqa: E402  (despues de install)
+
+    asyncio.run(run(board, app, args))
+
+    if args.screenshot:
+        board.screenshot(args.screenshot)
+    if args.stats:
+        print(json.dumps(collect_stats(board, app), indent=2))
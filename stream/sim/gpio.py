@@ -0,0 +1,174 @@
+import queue
+import threading
+import types
+
+
+class SimPWM:
+    """PWM software de RPi.GPIO: solo recuerda el ciclo de trabajo."""
+
+    def __init__(self, gpio, pin, frequency):
+        self.gpio = gpio
+        self.pin = pin
+        self.frequency = frequency
+        self.duty = None
+
+    def start(self, duty):
+        self.duty = duty
+        self.gpio.pwm_running.add(self.pin)
+
+    def ChangeDutyCycle(self, duty):
+        self.duty = duty
+
+    def ChangeFrequency(self, frequency):
+        self.frequency = frequency
+
+    def stop(self):
+        self.duty = None
+        self.gpio.pwm_running.discard(self.pin)
+
+
+class SimGPIO(types.ModuleType):
+    """
+    Sustituto de RPi.GPIO.
+
+    Guarda el nivel de cada pin; las entradas empiezan en alto (pull-up, boton
+    suelto). set_input() cambia un nivel y, si hay deteccion de flancos, llama
+    a los callbacks desde un hilo propio, en orden, como hace RPi.GPIO.
+    """
+
+    BCM = 11
+    BOARD = 10
+    OUT = 0
+    IN = 1
+    LOW = 0
+    HIGH = 1
+    PUD_OFF = 20
+    PUD_DOWN = 21
+    PUD_UP = 22
+    RISING = 31
+    FALLING = 32
+    BOTH = 33
+
+    def __init__(self):
+        super().__init__("RPi.GPIO")
+        self.mode = None
+        self.levels = {}
+        self.directions = {}
+        self.edges = {}       # pin -> tipo de flanco
+        self.callbacks = {}   # pin -> [callbacks]
+        self.detected = set()
+        self.pwm_running = set()
+        self.output_listeners = []  # fn(pin, level)
+        self._lock = threading.Lock()
+        self._pending = queue.Queue()
+        self._thread = None
+
+
+    # --- API de RPi.GPIO ---
+
+    def setmode(self, mode):
+        self.mode = mode
+
+    def getmode(self):
+        return self.mode
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, pins, direction, pull_up_down=None, initial=None):
+        for pin in self._pins(pins):
+            self.directions[pin] = direction
+            if direction == self.IN:
+                self.levels[pin] = self.LOW if pull_up_down == self.PUD_DOWN else self.HIGH
+            elif initial is not None:
+                self.levels[pin] = initial
+            else:
+                self.levels.setdefault(pin, self.LOW)
+
+    def input(self, pin):
+        return self.levels.get(pin, self.HIGH)
+
+    def output(self, pins, value):
+        for pin in self._pins(pins):
+            self.levels[pin] = self.HIGH if value else self.LOW
+            for fn in self.output_listeners:
+                fn(pin, self.levels[pin])
+
+    def add_event_detect(self, pin, edge, callback=None, bouncetime=None):
+        with self._lock:
+            if pin in self.edges:
+                raise RuntimeError("Conflicting edge detection already enabled for this GPIO channel")
+            self.edges[pin] = edge
+            self.callbacks[pin] = [callback] if callback else []
+
+    def add_event_callback(self, pin, callback):
+        with self._lock:
+            self.callbacks.setdefault(pin, []).append(callback)
+
+    def remove_event_detect(self, pin):
+        with self._lock:
+            self.edges.pop(pin, None)
+            self.callbacks.pop(pin, None)
+
+    def event_detected(self, pin):
+        if pin in self.detected:
+            self.detected.discard(pin)
+            return True
+        return False
+
+    def cleanup(self, pins=None):
+        with self._lock:
+            for pin in self._pins(pins) if pins is not None else list(self.edges):
+                self.edges.pop(pin, None)
+                self.callbacks.pop(pin, None)
+
+    def PWM(self, pin, frequency):
+        return SimPWM(self, pin, frequency)
+
+
+    # --- simulacion ---
+
+    def set_input(self, pin, level):
+        """Cambia el nivel de una entrada como lo haria el boton."""
+        level = self.HIGH if level else self.LOW
+        anterior = self.levels.get(pin, self.HIGH)
+        self.levels[pin] = level
+        if level == anterior:
+            return
+
+        with self._lock:
+            edge = self.edges.get(pin)
+            callbacks = list(self.callbacks.get(pin, ()))
+        if edge is None:
+            return
+        if edge == self.BOTH or (edge == self.FALLING) == (level == self.LOW):
+            self.detected.add(pin)
+            for fn in callbacks:
+                self._dispatch(fn, pin)
+
+    def press(self, pin):
+        self.set_input(pin, self.LOW)
+
+    def release(self, pin):
+        self.set_input(pin, self.HIGH)
+
+    def has_edge_detect(self, pin):
+        return pin in self.edges
+
+    def _dispatch(self, fn, pin):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run_callbacks, name="sim-gpio", daemon=True)
+            self._thread.start()
+        self._pending.put((fn, pin))
+
+    def _run_callbacks(self):
+        while True:
+            fn, pin = self._pending.get()
+            try:
+                fn(pin)
+            except Exception as e:
+                print(f"sim-gpio: error en callback del pin {pin}: {e}")
+
+    @staticmethod
+    def _pins(pins):
+        return pins if isinstance(pins, (list, tuple, set)) else [pins]
@@ -0,0 +1,332 @@
+import os
+import queue
+import threading
+import time
+import types
+from types import SimpleNamespace
+
+
+# codigos de mpv_end_file_reason de libmpv
+END_EOF = 0
+END_STOP = 2
+END_QUIT = 3
+END_ERROR = 4
+
+
+def _mpv_name(name):
+    return name.replace("_", "-")
+
+
+class FakeMPV:
+    """
+    Sustituto de mpv.MPV sin audio ni video.
+
+    Lleva un reloj por pista: time-pos avanza cada `tick` segundos mientras no
+    este en pausa y al llegar a la duracion se emite end-file (eof). Los
+    observers y event callbacks se llaman desde un hilo de eventos propio,
+    como en python-mpv. Tiene playlist interna: al acabar un fichero pasa al
+    siguiente (end-file eof, start-file) sin que nadie lo pida. La duracion
+    de los ficheros sale de `durations` (ruta -> segundos) o de
+    `default_duration`; las URL no terminan nunca.
+    """
+
+    default_duration = 180.0
+    tick = 0.05
+    durations = {}
+
+    def __init__(self, *args, **kwargs):
+        props = {
+            "pause": False,
+            "volume": 100,
+            "time-pos": None,
+            "duration": None,
+            "path": None,
+            "idle-active": True,
+            "playlist": [],
+            "playlist-pos": -1,
+            "playlist-count": 0,
+        }
+        for k, v in kwargs.items():
+            props[_mpv_name(k)] = v
+        object.__setattr__(self, "_props", props)
+        object.__setattr__(self, "_observers", {})
+        object.__setattr__(self, "_events", {})
+        object.__setattr__(self, "_lock", threading.RLock())
+        object.__setattr__(self, "_queue", queue.Queue())
+        object.__setattr__(self, "_alive", True)
+        object.__setattr__(self, "commands", [])
+        object.__setattr__(self, "_playlist", [])
+        object.__setattr__(self, "_event_thread", threading.Thread(target=self._run_events, name="sim-mpv-events", daemon=True))
+        object.__setattr__(self, "_clock_thread", threading.Thread(target=self._run_clock, name="sim-mpv-clock", daemon=True))
+        self._event_thread.start()
+        self._clock_thread.start()
+
+
+    # --- propiedades ---
+
+    def __getattr__(self, name):
+        props = object.__getattribute__(self, "_props")
+        try:
+            return props[_mpv_name(name)]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, value):
+        self._set_user(_mpv_name(name), value)
+
+    def __getitem__(self, name):
+        return self._props.get(name)
+
+    def __setitem__(self, name, value):
+        self._set_user(name, value)
+
+    def _set_user(self, name, value):
+        # playlist-pos escrito por el usuario salta a esa entrada
+        if name == "playlist-pos":
+            self._jump(int(value))
+        else:
+            self._set(name, value)
+
+    def _set(self, name, value):
+        with self._lock:
+            if self._props.get(name) == value:
+                return
+            self._props[name] = value
+        for fn in list(self._observers.get(name, ())):
+            self._queue.put((fn, (name, value)))
+
+    def observe_property(self, name, handler):
+        self._observers.setdefault(name, []).append(handler)
+        self._queue.put((handler, (name, self._props.get(name))))
+
+    def unobserve_property(self, name, handler):
+        if handler in self._observers.get(name, ()):
+            self._observers[name].remove(handler)
+
+    def property_observer(self, name):
+        def wrapper(fn):
+            self.observe_property(name, fn)
+            return fn
+        return wrapper
+
+
+    # --- eventos ---
+
+    def event_callback(self, *names):
+        def wrapper(fn):
+            for name in names:
+                self._events.setdefault(name, []).append(fn)
+            return fn
+        return wrapper
+
+    def _emit(self, name, **data):
+        evento = SimpleNamespace(event_id=name, data=SimpleNamespace(**data))
+        for fn in list(self._events.get(name, ())):
+            self._queue.put((fn, (evento,)))
+
+    def _run_events(self):
+        while True:
+            fn, args = self._queue.get()
+            if fn is None:
+                return
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"sim-mpv: error en callback: {e}")
+
+
+    # --- comandos ---
+
+    def command(self, name, *args):
+        self.commands.append((name,) + args)
+        if name == "loadfile":
+            self.loadfile(*args)
+        elif name == "stop":
+            self.stop()
+        elif name == "seek":
+            self.seek(*args)
+        elif name == "set":
+            self._set_user(args[0], args[1])
+        elif name == "playlist-next":
+            self.playlist_next()
+        elif name == "playlist-remove":
+            self.playlist_remove(*args)
+        elif name == "playlist-clear":
+            self.playlist_clear()
+        elif name == "quit":
+            self.terminate()
+
+    def play(self, filename):
+        self.loadfile(filename)
+
+    def loadfile(self, filename, mode="replace", *args):
+        with self._lock:
+            if mode == "replace":
+                self._playlist[:] = [filename]
+                self._open(0, parar=True)
+            else:
+                self._playlist.append(filename)
+                if mode == "append-play" and self._props["path"] is None:
+                    self._open(len(self._playlist) - 1)
+                else:
+                    self._sync_playlist()
+
+    def playlist_append(self, filename):
+        self.loadfile(filename, "append")
+
+    def playlist_next(self):
+        with self._lock:
+            self._jump(self._props["playlist-pos"] + 1)
+
+    def playlist_remove(self, index="current"):
+        with self._lock:
+            pos = self._props["playlist-pos"]
+            if index == "current":
+                index = pos
+            index = int(index)
+            if not 0 <= index < len(self._playlist):
+                return
+            del self._playlist[index]
+            if index < pos:
+                self._props["playlist-pos"] = pos - 1
+                self._sync_playlist()
+            elif index == pos:
+                if index < len(self._playlist):
+                    self._open(index, parar=True)
+                else:
+                    self._finish(END_STOP)
+            else:
+                self._sync_playlist()
+
+    def playlist_clear(self):
+        # como en mpv: quita todo menos la entrada que suena
+        with self._lock:
+            pos = self._props["playlist-pos"]
+            self._playlist[:] = [self._playlist[pos]] if 0 <= pos < len(self._playlist) else []
+            self._props["playlist-pos"] = 0 if self._playlist else -1
+            self._sync_playlist()
+
+    def stop(self):
+        with self._lock:
+            self._playlist.clear()
+            if self._props["path"] is not None:
+                self._finish(END_STOP)
+            else:
+                self._sync_playlist()
+
+    def seek(self, amount, reference="relative", precision="default-precise"):
+        with self._lock:
+            pos = self._props["time-pos"]
+            duracion = self._props["duration"]
+        if pos is None:
+            return
+        nuevo = float(amount) if "absolute" in reference else pos + float(amount)
+        if duracion is not None:
+            nuevo = min(nuevo, duracion)
+        self._set("time-pos", max(nuevo, 0.0))
+        self._emit("seek")
+
+    def terminate(self):
+        object.__setattr__(self, "_alive", False)
+        self._queue.put((None, None))
+
+    def wait_for_shutdown(self, timeout=None):
+        self._event_thread.join(timeout)
+
+    def _jump(self, pos):
+        with self._lock:
+            if 0 <= pos < len(self._playlist):
+                self._open(pos, parar=True)
+
+    def _open(self, pos, parar=False):
+        # mismo orden que mpv: end-file del anterior, start-file y luego las propiedades
+        if parar and self._props["path"] is not None:
+            self._emit("end-file", reason=END_STOP)
+        filename = self._playlist[pos]
+        self._props["playlist-pos"] = pos
+        self._emit("start-file")
+        self._set("path", filename)
+        self._set("idle-active", False)
+        self._set("duration", self._duration(filename))
+        self._set("time-pos", 0.0)
+        self._sync_playlist()
+        self._emit("file-loaded")
+
+    def _finish(self, reason):
+        self._props["playlist-pos"] = -1
+        self._set("path", None)
+        self._set("time-pos", None)
+        self._set("duration", None)
+        self._set("idle-active", True)
+        self._sync_playlist()
+        self._emit("end-file", reason=reason)
+
+    def _eof(self):
+        # fin natural: pasa sola a la siguiente entrada de la playlist
+        with self._lock:
+            siguiente = self._props["playlist-pos"] + 1
+            if siguiente < len(self._playlist):
+                self._emit("end-file", reason=END_EOF)
+                self._open(siguiente)
+            else:
+                self._playlist.clear()
+                self._finish(END_EOF)
+
+    def _sync_playlist(self):
+        pos = self._props["playlist-pos"]
+        self._set("playlist", [
+            {"filename": f, "current": True} if i == pos else {"filename": f}
+            for i, f in enumerate(self._playlist)
+        ])
+        self._set("playlist-count", len(self._playlist))
+
+    def _duration(self, filename):
+        if "://" in filename:
+            return None
+        if filename in self.durations:
+            return self.durations[filename]
+        return self.default_duration if os.path.exists(filename) else 0.0
+
+    def _run_clock(self):
+        ultimo = time.monotonic()
+        while self._alive:
+            time.sleep(self.tick)
+            ahora = time.monotonic()
+            paso, ultimo = ahora - ultimo, ahora
+            with self._lock:
+                pos = self._props["time-pos"]
+                duracion = self._props["duration"]
+                pausa = self._props["pause"]
+            if pos is None or pausa:
+                continue
+            pos += paso
+            if duracion is not None and pos >= duracion:
+                self._eof()
+            else:
+                self._set("time-pos", pos)
+
+
+def mpv_module():
+    """
+    Modulo `mpv` para el simulador: python-mpv de verdad con ao=null y vo=null
+    si libmpv esta instalada, si no FakeMPV.
+    """
+    try:
+        import mpv as real
+    except (ImportError, OSError):
+        real = None
+
+    mod = types.ModuleType("mpv")
+    if real is None:
+        mod.MPV = FakeMPV
+        return mod
+
+    class NullMPV(real.MPV):
+        def __init__(self, *args, **kwargs):
+            kwargs["ao"] = "null"
+            kwargs["vo"] = "null"
+            super().__init__(*args, **kwargs)
+
+    mod.__dict__.update({k: v for k, v in vars(real).items() if not k.startswith("__")})
+    mod.MPV = NullMPV
+    return mod
@@ -0,0 +1,49 @@
+import time
+import types
+
+
+class FakePisugar:
+    """
+    PiSugar simulada: la bateria se descarga `drain` puntos por hora (o se
+    carga si charging=True). `latency` imita lo que tarda una lectura I2C.
+    """
+
+    def __init__(self, level=80.0, drain=12.0, charging=False, latency=0.0):
+        self.start_level = level
+        self.drain = drain
+        self.charging = charging
+        self.latency = latency
+        self.reads = 0
+        self._t0 = time.monotonic()
+
+
+    def _level(self):
+        horas = (time.monotonic() - self._t0) / 3600
+        delta = self.drain * horas
+        nivel = self.start_level + delta if self.charging else self.start_level - delta
+        return max(0.0, min(nivel, 100.0))
+
+
+    def set_level(self, level, charging=None):
+        self.start_level = level
+        if charging is not None:
+            self.charging = charging
+        self._t0 = time.monotonic()
+
+
+    def get_battery_level(self):
+        self.reads += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return int(self._level())
+
+
+    def get_battery_charging_status(self):
+        return self.charging
+
+
+def sugarpie_module(pisugar):
+    """Modulo `sugarpie` cuyo Pisugar() devuelve `pisugar`."""
+    mod = types.ModuleType("sugarpie")
+    mod.Pisugar = lambda *args, **kwargs: pisugar
+    return mod
@@ -0,0 +1,240 @@
+import errno
+import types
+from collections import Counter
+
+import numpy as np
+
+from modules.framebuffer import rgb565_to_image
+
+
+CASET = 0x2A
+RASET = 0x2B
+RAMWR = 0x2C
+MADCTL = 0x36
+SLPIN = 0x10
+SLPOUT = 0x11
+DISPOFF = 0x28
+DISPON = 0x29
+
+MADCTL_MY = 0x80
+MADCTL_MV = 0x20
+
+GRAM_SIZE = 320  # el ST7789 tiene 240x320; con MV se cambian filas por columnas
+
+
+class VirtualST7789:
+    """
+    Panel ST7789 en memoria.
+
+    Decodifica el flujo SPI segun el nivel del pin DC: CASET/RASET fijan la
+    ventana y RAMWR escribe los pixeles que llegan a continuacion en la GRAM.
+    La GRAM guarda los pixeles tal cual llegan (RGB565 big-endian), en el
+    mismo formato que los framebuffers de InterfazLCD. Con decode=False los
+    pixeles solo se cuentan (para que el panel no pese en las mediciones).
+    """
+
+    def __init__(self, gpio, dc_pin=25, width=240, height=240, decode=True):
+        self.gpio = gpio
+        self.decode = decode
+        self.dc_pin = dc_pin
+        self.width = width
+        self.height = height
+        self.gram = np.zeros((GRAM_SIZE, GRAM_SIZE), dtype=np.uint16)
+
+        self.madctl = 0
+        self.sleeping = True
+        self.display_on = False
+        self.window = (0, 0, width - 1, height - 1)  # x0, y0, x1, y1
+
+        self._cmd = None
+        self._params = bytearray()
+        self._pos = 0          # pixel dentro de la ventana durante RAMWR
+        self._odd = None       # byte suelto entre dos trozos
+
+        # contadores
+        self.commands = Counter()
+        self.bytes = 0
+        self.pixels = 0
+        self.writes = 0        # RAMWR recibidos
+        self.overflow = 0      # pixeles fuera de la ventana
+
+
+    def receive(self, data):
+        mv = memoryview(data).cast("B")
+        self.bytes += len(mv)
+        if self.gpio.input(self.dc_pin):
+            self._data(mv)
+        else:
+            for cmd in mv:
+                self._command(cmd)
+
+
+    def _command(self, cmd):
+        self._cmd = cmd
+        self._params = bytearray()
+        self.commands[cmd] += 1
+
+        if cmd == RAMWR:
+            self._pos = 0
+            self._odd = None
+            self.writes += 1
+        elif cmd == SLPIN:
+            self.sleeping = True
+        elif cmd == SLPOUT:
+            self.sleeping = False
+        elif cmd == DISPOFF:
+            self.display_on = False
+        elif cmd == DISPON:
+            self.display_on = True
+
+
+    def _data(self, mv):
+        if self._cmd == RAMWR:
+            if self.decode:
+                self._pixels(mv)
+            else:
+                self.pixels += len(mv) // 2
+            return
+
+        self._params += mv
+        if self._cmd in (CASET, RASET) and len(self._params) >= 4:
+            p = self._params
+            inicio, fin = (p[0] << 8) | p[1], (p[2] << 8) | p[3]
+            x0, y0, x1, y1 = self.window
+            if self._cmd == CASET:
+                self.window = (inicio, y0, fin, y1)
+            else:
+                self.window = (x0, inicio, x1, fin)
+        elif self._cmd == MADCTL and self._params:
+            self.madctl = self._params[0]
+
+
+    def _pixels(self, mv):
+        if self._odd is not None:
+            datos = bytes([self._odd]) + bytes(mv)
+            self._odd = None
+        else:
+            datos = mv
+        if len(datos) % 2:
+            self._odd = datos[-1]
+            datos = datos[:-1]
+        if not len(datos):
+            return
+
+        pix = np.frombuffer(datos, dtype=np.uint16)
+        x0, y0, x1, y1 = self.window
+        ancho = x1 - x0 + 1
+        total = ancho * (y1 - y0 + 1)
+
+        n = min(len(pix), total - self._pos)
+        self.overflow += len(pix) - n
+        self.pixels += n
+
+        # fila parcial inicial, filas completas y fila parcial final
+        i = 0
+        while i < n:
+            fila, col = divmod(self._pos, ancho)
+            if col == 0 and n - i >= ancho:
+                filas = (n - i) // ancho
+                cuantos = filas * ancho
+                self.gram[y0 + fila:y0 + fila + filas, x0:x0 + ancho] = pix[i:i + cuantos].reshape(filas, ancho)
+            else:
+                cuantos = min(ancho - col, n - i)
+                self.gram[y0 + fila, x0 + col:x0 + col + cuantos] = pix[i:i + cuantos]
+            i += cuantos
+            self._pos += cuantos
+
+
+    # --- lectura ---
+
+    def visible(self):
+        """Zona de la GRAM que se ve en el panel de 240x240 (RGB565, como los frames)."""
+        desplazamiento = 80 if self.madctl & MADCTL_MY else 0
+        if self.madctl & MADCTL_MV:
+            return self.gram[:self.height, desplazamiento:desplazamiento + self.width]
+        return self.gram[desplazamiento:desplazamiento + self.height, :self.width]
+
+
+    def screenshot(self):
+        return rgb565_to_image(self.visible())
+
+
+    def stats(self):
+        return {
+            "bytes": self.bytes,
+            "pixels": self.pixels,
+            "writes": self.writes,
+            "overflow": self.overflow,
+            "commands": {f"0x{cmd:02X}": n for cmd, n in sorted(self.commands.items())},
+        }
+
+
+    def reset_stats(self):
+        self.commands.clear()
+        self.bytes = self.pixels = self.writes = self.overflow = 0
+
+
+class SimSpiDev:
+    """spidev.SpiDev que entrega todo lo escrito al panel virtual."""
+
+    def __init__(self, panel, bufsiz=4096):
+        self.panel = panel
+        self.bufsiz = bufsiz
+        self.max_speed_hz = 125000000
+        self.mode = 0
+        self.bits_per_word = 8
+        self.is_open = False
+
+        # contadores
+        self.transfers = 0
+        self.bytes = 0
+
+
+    def open(self, bus, device):
+        self.is_open = True
+
+    def close(self):
+        self.is_open = False
+
+
+    @property
+    def wire_time(self):
+        """Segundos que habria ocupado el bus a max_speed_hz."""
+        return self.bytes * 8 / self.max_speed_hz
+
+
+    def _send(self, data):
+        if not self.is_open:
+            raise OSError(errno.EBADF, "SPI device not open")
+        self.transfers += 1
+        self.bytes += len(data)
+        self.panel.receive(data)
+
+
+    def writebytes(self, values):
+        if len(values) > self.bufsiz:
+            raise OSError(errno.EMSGSIZE, "Message too long")
+        self._send(bytes(values))
+
+    def writebytes2(self, values):
+        # el de verdad tambien parte en trozos de bufsiz
+        mv = memoryview(values).cast("B") if not isinstance(values, list) else memoryview(bytes(values))
+        for i in range(0, len(mv), self.bufsiz):
+            self._send(mv[i:i + self.bufsiz])
+
+    def xfer(self, values, *args):
+        self.writebytes(values)
+        return [0] * len(values)
+
+    xfer2 = xfer
+
+    def xfer3(self, values, *args):
+        self.writebytes2(values)
+        return (0,) * len(values)
+
+
+def spidev_module(panel):
+    """Modulo `spidev` cuyos SpiDev() escriben en `panel`."""
+    mod = types.ModuleType("spidev")
+    mod.SpiDev = lambda *args: SimSpiDev(panel)
+    return mod
@@ -0,0 +1,104 @@
+import json
+import threading
+import time
+
+from modules.input_events import BOTONES
+
+
+class Timeline:
+    """
+    Secuencia de pulsaciones: lista de (segundos, boton, pulsado).
+
+    Se escribe a mano (press/tap encadenados), se graba en el dispositivo con
+    TimelineRecorder o se carga de un fichero JSON lines con una entrada
+    {"t": ..., "button": ..., "pressed": ...} por linea.
+    """
+
+    def __init__(self, entries=None):
+        self.entries = sorted(entries or [], key=lambda e: e[0])
+
+
+    def press(self, button, at, hold=0.08):
+        """Pulsa `button` en el segundo `at` y lo suelta `hold` segundos despues."""
+        if button not in BOTONES:
+            raise ValueError(f"Boton desconocido: {button}")
+        self.entries.append((at, button, True))
+        self.entries.append((at + hold, button, False))
+        self.entries.sort(key=lambda e: e[0])
+        return self
+
+
+    def tap(self, *buttons, start=0.0, every=0.5, hold=0.08):
+        """Pulsaciones cortas seguidas, una cada `every` segundos."""
+        for i, button in enumerate(buttons):
+            self.press(button, start + i * every, hold)
+        return self
+
+
+    @property
+    def duration(self):
+        return self.entries[-1][0] if self.entries else 0.0
+
+
+    @classmethod
+    def load(cls, path):
+        entries = []
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    e = json.loads(line)
+                    entries.append((float(e["t"]), e["button"], bool(e["pressed"])))
+        return cls(entries)
+
+
+    def save(self, path):
+        with open(path, "w") as f:
+            for t, button, pressed in self.entries:
+                f.write(json.dumps({"t": round(t, 4), "button": button, "pressed": pressed}) + "\n")
+
+
+    def play(self, gpio, buttons=BOTONES, speed=1.0, wait_ready=5.0):
+        """
+        Reproduce la secuencia sobre un SimGPIO desde un hilo. Espera a que la
+        aplicacion active la deteccion de flancos antes de empezar a contar.
+        """
+        hilo = threading.Thread(
+            target=self._run, args=(gpio, buttons, speed, wait_ready), name="sim-timeline", daemon=True
+        )
+        hilo.start()
+        return hilo
+
+
+    def _run(self, gpio, buttons, speed, wait_ready):
+        pins = {buttons[b].pin for _, b, _ in self.entries}
+        limite = time.monotonic() + wait_ready
+        while not all(gpio.has_edge_detect(p) for p in pins) and time.monotonic() < limite:
+            time.sleep(0.01)
+
+        inicio = time.monotonic()
+        for t, button, pressed in self.entries:
+            espera = inicio + t / speed - time.monotonic()
+            if espera > 0:
+                time.sleep(espera)
+            gpio.set_input(buttons[button].pin, not pressed)
+
+
+class TimelineRecorder:
+    """Graba las pulsaciones (ya sin rebotes) de un InputManager a un fichero."""
+
+    def __init__(self, inputs, path):
+        self.file = open(path, "w")
+        self._t0 = None
+        inputs.add_listener(self._on_transition)
+
+
+    def _on_transition(self, button, pressed, t):
+        if self._t0 is None:
+            self._t0 = t
+        self.file.write(json.dumps({"t": round(t - self._t0, 4), "button": button, "pressed": pressed}) + "\n")
+        self.file.flush()
+
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,28 @@
+"""
+Las pruebas corren sobre el simulador (stream/sim): GPIO, panel ST7789,
+PiSugar y mpv falsos. sim.install() tiene que ir antes de importar nada
+de la aplicacion, por eso se hace aqui.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sim  # noqa: E402
+
+BOARD = sim.install()
+
+
+@pytest.fixture(scope="session")
+def board():
+    return BOARD
+
+
+@pytest.fixture(scope="session")
+def lcd(board):
+    from modules.interface import InterfazLCD
+    lcd = InterfazLCD()
+    yield lcd
+    lcd.display.stop()
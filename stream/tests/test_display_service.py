@@ -0,0 +1,51 @@
+import threading
+
+from modules.display_service import DisplayService
+
+
+def servicio():
+    """DisplayService que apunta lo que envia; el frame "bloqueo" retiene el hilo hasta soltar()."""
+    enviados = []
+    enviando, soltar = threading.Event(), threading.Event()
+
+    def render(frame):
+        if frame == "bloqueo":
+            enviando.set()
+            soltar.wait(2)
+        enviados.append(frame)
+
+    ds = DisplayService(render, enviados.append)
+    ds.submit("bloqueo")
+    assert enviando.wait(2)
+    return ds, enviados, soltar
+
+
+def test_comandos_en_orden_con_los_frames():
+    ds, enviados, soltar = servicio()
+    ds.submit("X")
+    limpiar = ds.call(enviados.append, "limpiar")
+    ds.submit("Y")
+    ds.submit_patch("bateria", "parche")
+    ds.call(enviados.append, "dormir")
+    soltar.set()
+
+    assert ds.wait_idle(2)
+    assert limpiar.result(2) is None
+    assert enviados == ["bloqueo", "X", "limpiar", "Y", "parche", "dormir"]
+    ds.stop()
+
+
+def test_gana_el_ultimo_frame_entre_comandos():
+    ds, enviados, soltar = servicio()
+    a = ds.submit("A")
+    ds.submit("B")
+    ds.call(enviados.append, "limpiar")
+    ds.submit("C")
+    d = ds.submit("D")
+    soltar.set()
+
+    assert ds.wait_idle(2)
+    assert enviados == ["bloqueo", "B", "limpiar", "D"]
+    assert a.result(2) and d.result(2)
+    assert ds.frames_dropped == 2
+    ds.stop()
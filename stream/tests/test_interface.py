@@ -0,0 +1,37 @@
+import asyncio
+
+import numpy as np
+
+from modules import interface
+
+
+def test_scroll_de_la_ultima_fila_no_se_sale_de_la_pantalla(lcd, board, capsys, monkeypatch):
+    # con titulo la fila 11 empieza en y=223: su tira de 20 px pasa del borde
+    monkeypatch.setattr(interface, "MENU_SCROLL_PAUSE", 0)
+    opciones = [f"Pista {i}" for i in range(10)]
+    opciones.append("Una pista con un nombre demasiado largo para caber en la pantalla")
+
+    async def un_rato():
+        try:
+            await asyncio.wait_for(lcd.display_menu(opciones, 10, titulo="TRACKS"), 0.3)
+        except asyncio.TimeoutError:
+            pass
+
+    asyncio.run(un_rato())
+    assert lcd.display.wait_idle(2)
+
+    assert "Error" not in capsys.readouterr().out
+    assert np.array_equal(board.panel.visible(), lcd.last_frame)
+
+
+def test_parche_recortado_al_borde(lcd, board):
+    fondo = np.zeros((lcd.height, lcd.width), dtype=np.uint16)
+    lcd.display.submit(fondo).result(2)
+
+    parche = np.full((20, 30), 0xFFFF, dtype=np.uint16)
+    assert lcd.blit_region(lcd.width - 10, lcd.height - 5, parche, key="borde").result(2)
+
+    visible = board.panel.visible()
+    assert (visible[lcd.height - 5:, lcd.width - 10:] == 0xFFFF).all()
+    assert (visible[:lcd.height - 5] == 0).all()
+    assert board.panel.overflow == 0
@@ -0,0 +1,26 @@
+import os
+
+from modules.library import LibraryIndex
+
+
+def test_rescan_ve_un_fichero_reescrito_en_su_sitio(tmp_path):
+    disco = tmp_path / "main-mix" / "disco"
+    disco.mkdir(parents=True)
+    pista = disco / "01.mp3"
+    pista.write_bytes(b"a" * 10)
+    (disco / "02.mp3").write_bytes(b"b" * 10)
+
+    indice = LibraryIndex(str(tmp_path / "main-mix"), str(tmp_path / "library.sqlite3"))
+    indice.rescan()
+    carpeta = os.stat(disco).st_mtime_ns
+
+    # retag con el equipo apagado: mismo nombre, otro contenido; la carpeta no cambia
+    pista.write_bytes(b"c" * 20)
+    os.utime(pista, ns=(carpeta + 10**9, carpeta + 10**9))
+    os.utime(disco, ns=(carpeta, carpeta))
+
+    assert indice.rescan() == set()  # las playlists siguen igual
+    assert indice.dirs_listed == 0
+    st = os.stat(pista)
+    assert (str(pista), st.st_mtime_ns, st.st_size) in indice.files()
+    indice.close()
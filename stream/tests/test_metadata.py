@@ -0,0 +1,27 @@
+import threading
+
+from modules.metadata import MetadataCache
+
+
+def test_pendientes_sin_el_lock_de_los_titulos(tmp_path):
+    cache = MetadataCache(str(tmp_path / "metadata.sqlite3"))
+    cache.open()
+    cache.guardar([
+        ("/musica/a.mp3", 1, 10, {"title": "A"}),
+        ("/musica/b.mp3", 1, 10, {"title": "B"}),
+        ("/musica/borrada.mp3", 1, 10, {"title": "C"}),
+    ])
+    disco = [("/musica/nueva.mp3", 5, 10), ("/musica/a.mp3", 1, 10), ("/musica/b.mp3", 2, 10)]
+
+    # el loop puede estar dentro de titulo(): la pasada del scanner no le espera
+    resultado = []
+    with cache._lock:
+        hilo = threading.Thread(target=lambda: resultado.append(cache.pendientes(disco)))
+        hilo.start()
+        hilo.join(5)
+        assert not hilo.is_alive()
+
+    assert resultado == [[("/musica/nueva.mp3", 5, 10), ("/musica/b.mp3", 2, 10)]]
+    assert len(cache) == 2
+    assert cache.titulos(["/musica/a.mp3", "/musica/nueva_pista.mp3"]) == ["A", "nueva pista.mp3"]
+    cache.close()
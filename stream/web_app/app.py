@@ -13,6 +13,10 @@ import json
 
 import threading
 import time
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.asset_cache import AssetCache
 
 app = Flask(__name__)
 
@@ -49,6 +53,9 @@ STREAMS_JSON = os.path.join(BASE_DIR, "streams.json")
 
 STREAM_IMAGES_DIR = os.path.join(BASE_DIR, "stream-images")
 
+# frames RGB565 precalculados para el LCD del reproductor
+lcd_assets = AssetCache()
+
 
 # listar imagenes disponibles
 def list_stream_images():
@@ -388,6 +395,9 @@ def edit_streams():
 
         with open(STREAMS_JSON, "w", encoding="utf-8") as f:
             json.dump(streams, f, indent=2)
+
+        # dejar listas las imagenes elegidas para que el reproductor no decodifique al cambiar
+        lcd_assets.warm(os.path.join(STREAM_IMAGES_DIR, s["image"]) for s in streams)
         return redirect(url_for('index'))
 
     try:
@@ -592,6 +602,9 @@ def upload_file(path):
             file.save(dest_path)
             update_m3u_on_add(current_path, os.path.basename(safe_path))  # Actualiza M3U al añadir
 
+            if os.path.dirname(os.path.abspath(dest_path)) == STREAM_IMAGES_DIR:
+                lcd_assets.warm([dest_path])
+
     return redirect(url_for('file_manager', path=path))
 
 